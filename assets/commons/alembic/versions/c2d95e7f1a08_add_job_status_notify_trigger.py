@@ -0,0 +1,51 @@
+"""
+DO NOT EDIT! THIS IS AN AUTOGENERATED FILE!!!!!
+"""
+
+"""add job status notify trigger
+
+Revision ID: c2d95e7f1a08
+Revises: a61f3c8e2b45
+Create Date: 2026-10-18 13:15:42.381905
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2d95e7f1a08'
+down_revision = 'a61f3c8e2b45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Wakes up the clients waiting on GET /job/{id}/wait
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_job_status() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('job_status', json_build_object(
+                'id', NEW.id,
+                'status', NEW.status,
+                'old_status', OLD.status,
+                'parent_job_id', NEW.parent_job_id,
+                'project_id', NEW.project_id,
+                'batch_id', NEW.batch_id
+            )::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER job_status_notify
+        AFTER UPDATE OF status ON job
+        FOR EACH ROW
+        WHEN (OLD.status IS DISTINCT FROM NEW.status)
+        EXECUTE FUNCTION notify_job_status()
+    """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS job_status_notify ON job")
+    op.execute("DROP FUNCTION IF EXISTS notify_job_status()")
\ No newline at end of file
@@ -3,17 +3,23 @@ DO NOT EDIT! THIS IS AN AUTOGENERATED FILE!!!!!
 """
 
 
+import base64
+import binascii
+import hashlib
 import json
 import boto3
 import pytz
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, Type, Any
 
 from fastapi import Depends, HTTPException
 from pydantic import create_model
-from sqlalchemy import inspect
+from sqlalchemy import inspect, bindparam, cast, func, select, update, tuple_, String, JSON, ARRAY
+from sqlalchemy.dialects.postgresql import insert
 
 from . import T, PYDANTIC_SCHEMA, PAGINATION
+from utils.sqs import send_message_batch, push_event
 
 
 class AttrDict(dict):  # type: ignore
@@ -87,10 +93,73 @@ def pagination_factory(max_limit: Optional[int] = None) -> Any:
     return Depends(pagination)
 
 
+def encode_cursor(values: list) -> str:
+    """
+    Opaque keyset pagination cursor holding the key of the last row of a page
+    """
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor: str, field: str = "after") -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, binascii.Error):
+        values = None
+    if not isinstance(values, list):
+        raise create_query_validation_exception(field=field, msg="invalid cursor")
+    return values
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Weak ETag of a response from the values it depends on. Weak, the compression
+    middleware changes the bytes but not the content.
+    """
+    digest = hashlib.blake2b(json.dumps(parts, default=str).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match holds etag (weak comparison) or "*"
+    """
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+# Clients are created on first use and shared, creating one takes tens of milliseconds
+
+@lru_cache(maxsize=None)
 def get_sqs_client():
     return boto3.client("sqs")
 
 
+@lru_cache(maxsize=None)
+def get_s3_client():
+    return boto3.client("s3")
+
+
+def create_presigned_post(s3_client, bucket, key, content_type=None, max_size=5 * 1024 ** 3, expires_in=3600):
+    """
+    Creates a presigned POST so clients upload directly to S3 instead of through the API
+    """
+    fields = {}
+    conditions = [["content-length-range", 1, max_size]]
+    if content_type:
+        fields["Content-Type"] = content_type
+        conditions.append({"Content-Type": content_type})
+
+    return s3_client.generate_presigned_post(
+        Bucket=bucket,
+        Key=key,
+        Fields=fields,
+        Conditions=conditions,
+        ExpiresIn=expires_in
+    )
+
+
 def object_as_dict(obj):
     return {c.key: getattr(obj, c.key)
             for c in inspect(obj).mapper.column_attrs}
@@ -107,55 +176,101 @@ def to_json(obj):
         default=str
     )
 
-def bulk_create_or_update(session, model, data, do_update_on_id, unique_fields=None):
-    if unique_fields is None:
-        unique_fields = []
-
-    entries = []
-    order_dict = {}
-    order_upserts = []
-
-    for idx, (record, update_on_id) in enumerate(zip(data, do_update_on_id)):
-        if update_on_id is True:
-            instance = session.query(model).get(record.get("id"))
-
-            not_unique_data = {k: v for k, v in record.items() if k not in unique_fields}
-            for k, v in not_unique_data.items():
-                if hasattr(instance, k):
-                    setattr(instance, k, v)
-            setattr(instance, "modified_on", get_modified_on())
-            session.commit()
-            session.refresh(instance)
-            order_dict[idx] = instance
-            continue
-
-
-        order_upserts.append(idx)
-        if len(unique_fields) == 0:
-            entries.append(model(**record))
-            continue
-
-        if "id" in record.keys():
-            del record["id"]
-
-        unique_data = {k: v for k, v in record.items() if k in unique_fields}
-        instance = session.query(model).filter_by(**unique_data).first()
-        if instance:
-            not_unique_data = {k: v for k, v in record.items() if k not in unique_fields}
-            for k, v in not_unique_data.items():
-                if hasattr(instance, k):
-                    setattr(instance, k, v)
-            setattr(instance, "modified_on", get_modified_on())
-            entries.append(instance)
+def unnest_rows(model, columns, records):
+    """
+    Select of the records, sent as one array per column so the number of bind parameters
+    does not grow with the number of records. Has an extra `ordinality` column with the
+    position of the record.
+    """
+    table = model.__table__
+    arrays = []
+    for name in columns:
+        column_type = table.c[name].type
+        values = [record.get(name) for record in records]
+        if isinstance(column_type, JSON):
+            # Sent as json text, cast back below
+            values = [None if v is None else to_json(v) for v in values]
+            arrays.append(bindparam(f"{name}_values", values, type_=ARRAY(String)))
         else:
-            new_entry = model(**record)
-            setattr(new_entry, "modified_on", get_modified_on())
-            entries.append(new_entry)
-    session.bulk_save_objects(entries, return_defaults=True)
-    session.commit()
+            arrays.append(bindparam(f"{name}_values", values, type_=ARRAY(column_type)))
+    rows = func.unnest(*arrays).table_valued(*columns, with_ordinality="ordinality").render_derived()
+    return select(
+        *[cast(rows.c[name], table.c[name].type).label(name) for name in columns],
+        rows.c.ordinality,
+    ).subquery("input_rows")
 
-    for entry, idx in zip(entries,order_upserts):
-        order_dict[idx] = entry
-    all_instances = [order_dict[i] for i in sorted(order_dict)]
 
-    return all_instances
+def upsert_all(session, model, data, do_update_on_id, unique_fields=None):
+    """
+    Set based create or update: one INSERT ... ON CONFLICT (unique_fields) DO UPDATE
+    for all records, or without unique fields one INSERT for the new records and one
+    UPDATE for the records with an id. Returns the rows in the order of the records.
+    """
+    table = model.__table__
+    onupdate = getattr(model, "_set_onupdate", {})
+    columns = [name for name in table.columns.keys() if any(name in record for record in data)]
+    results = [None] * len(data)
+
+    if unique_fields:
+        columns = [name for name in columns if name != "id"]
+        # A key occurring twice can not be upserted in one statement, the last record wins
+        positions = {}
+        for idx, record in enumerate(data):
+            positions.setdefault(tuple(record.get(k) for k in unique_fields), []).append(idx)
+        records = [data[idxs[-1]] for idxs in positions.values()]
+
+        input_rows = unnest_rows(model, columns, records)
+        stmt = insert(model).from_select(
+            columns, select(*[input_rows.c[name] for name in columns]).order_by(input_rows.c.ordinality)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=unique_fields,
+            set_={
+                **onupdate,
+                **{name: stmt.excluded[name] for name in columns if name not in unique_fields},
+            },
+        ).returning(*table.columns)
+        for row in session.execute(stmt).mappings():
+            for idx in positions[tuple(row[k] for k in unique_fields)]:
+                results[idx] = dict(row)
+        return results
+
+    new = [idx for idx, update_on_id in enumerate(do_update_on_id) if not update_on_id]
+    existing = [idx for idx, update_on_id in enumerate(do_update_on_id) if update_on_id]
+
+    if new:
+        # The ids are taken from the sequence up front and inserted with the records, so
+        # every returned row maps back to its record by id
+        ids = session.scalars(
+            select(func.nextval(func.pg_get_serial_sequence(table.name, "id")))
+            .select_from(func.generate_series(1, len(new)))
+        ).all()
+        insert_columns = ["id", *[name for name in columns if name != "id"]]
+        input_rows = unnest_rows(model, insert_columns, [{**data[idx], "id": id} for idx, id in zip(new, ids)])
+        stmt = insert(model).from_select(
+            insert_columns,
+            select(*[input_rows.c[name] for name in insert_columns]),
+        ).returning(*table.columns)
+        rows = {row["id"]: dict(row) for row in session.execute(stmt).mappings()}
+        for idx, id in zip(new, ids):
+            results[idx] = rows[id]
+
+    if existing:
+        input_rows = unnest_rows(model, columns, [data[idx] for idx in existing])
+        stmt = (
+            update(model)
+            .where(table.c.id == input_rows.c.id)
+            .values(
+                **onupdate,
+                **{name: input_rows.c[name] for name in columns if name != "id"},
+            )
+            .returning(*table.columns)
+        )
+        rows = {row["id"]: dict(row) for row in session.execute(stmt).mappings()}
+        missing = [data[idx]["id"] for idx in existing if data[idx]["id"] not in rows]
+        if missing:
+            raise HTTPException(404, f"Items not found: {', '.join(str(i) for i in missing)}")
+        for idx in existing:
+            results[idx] = rows[data[idx]["id"]]
+
+    return results
@@ -1,10 +1,13 @@
 import json
 from dataclasses import dataclass, field
-from typing import Dict, List, Union
-#from ..security import keycloak_openid, oauth2_scheme
+from functools import lru_cache
+from typing import Dict, List, Optional, Union
 from dacite import from_dict
 from fastapi import HTTPException, Depends
-from keycloak import KeycloakGetError
+
+from ...config.Settings import settings
+from ..security import keycloak_openid, oauth2_scheme
+from .tokens import InvalidTokenError, TokenVerifier
 
 
 @dataclass
@@ -36,41 +39,40 @@ class KeycloakTokenData:
 
 
 
-class SentoAuth:
+def realm_url() -> str:
+    # The server url of KeycloakOpenID, joined the same way (realms/<realm>)
+    return f"{settings.KEYCLOAK_HOST.rstrip('/')}/realms/{settings.INDEXING_KEYCLOAK_REALM}"
+
 
-    # Store instance of keycloak_openid as static class variable
-    #_keycloak = keycloak_openid
+@lru_cache(maxsize=None)
+def token_verifier() -> TokenVerifier:
+    return TokenVerifier(keycloak_openid, mode=settings.TOKEN_VERIFICATION, issuer=realm_url())
 
-    def __init__(self):
-        pass
 
-    # def __init__(self, token: str = Depends(oauth2_scheme)):
-    #     self._token = token
-    #     self.__introspect_token(token)
+def to_token_data(claims: dict) -> KeycloakTokenData:
+    return from_dict(data_class=KeycloakTokenData, data=claims)
+
+
+class SentoAuth:
+    """
+    Token of the request, verified with token_verifier(). Authentication is disabled
+    without settings.KEYCLOAK_HOST, the token info is then empty (not active).
+    """
+
+    def __init__(self, token: Optional[str] = Depends(oauth2_scheme)):
+        self._token = token
+        self.__token_info = KeycloakTokenData()
+        if settings.AUTH_ENABLED:
+            if token is None:
+                raise HTTPException(401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+            self.__introspect_token(token)
 
     def __introspect_token(self, token):
         try:
-            # # Decode Token
-            # KEYCLOAK_PUBLIC_KEY = "-----BEGIN PUBLIC KEY-----\n" + self._keycloak.public_key() + "\n-----END PUBLIC KEY-----"
-            # options = {"verify_signature": True, "verify_aud": False, "verify_exp": True}
-            # try:
-            #     token_info = self._keycloak.decode_token(token, key=KEYCLOAK_PUBLIC_KEY, options=options)
-            #     token_info["active"] = True
-            # except Exception as e:
-            #     print(e)
-            #     token_info = {'active': False}
-            token_info = self._keycloak.introspect(token)
-        except KeycloakGetError as e:
-            raise HTTPException(401, detail=f"Token is not valid: {str(e)}")
-
-        token_info = from_dict(
-            data_class=KeycloakTokenData,
-            data=token_info
-        )
-        if not token_info.active:
-            raise HTTPException(401, detail="Token is not active. Try to refresh token")
-
-        self.__token_info = token_info
+            # Verified tokens are cached, only unknown or expired tokens are verified again
+            self.__token_info = token_verifier().verify(token, to_token_data)
+        except InvalidTokenError as e:
+            raise HTTPException(401, detail=f"Token is not valid: {str(e)}", headers={"WWW-Authenticate": "Bearer"})
 
     def get_client_roles(self, client=None) -> List:
         if not self.__token_info.active:
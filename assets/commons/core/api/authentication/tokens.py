@@ -0,0 +1,169 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from jose import jwk, jwt
+from jose.exceptions import JOSEError
+
+# Verified tokens are trusted for at most CLAIMS_CACHE_TTL seconds (and never past their exp),
+# after that they are verified again. A revoked session is noticed within this time when
+# TOKEN_VERIFICATION is introspect, local verification only checks the signature and exp.
+CLAIMS_CACHE_TTL = int(os.environ.get("AUTH_CLAIMS_CACHE_TTL", 60))
+CLAIMS_CACHE_SIZE = int(os.environ.get("AUTH_CLAIMS_CACHE_SIZE", 1024))
+# Minimum seconds between two fetches of the JWKS for an unknown key id, so tokens with a
+# made up kid can not make every request fetch the keys
+JWKS_REFRESH_INTERVAL = int(os.environ.get("AUTH_JWKS_REFRESH_INTERVAL", 30))
+# Signing algorithms accepted for the keys of the realm. A token is verified with the
+# algorithm of its key, never with the alg of its (unverified) header
+TOKEN_ALGORITHMS = os.environ.get("AUTH_TOKEN_ALGORITHMS", "RS256").split(",")
+
+
+class InvalidTokenError(Exception):
+    pass
+
+
+def token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+class ClaimsCache:
+    """
+    LRU cache of verified tokens (keyed by token_key), every entry expires at its own time
+    """
+
+    def __init__(self, maxsize: int = CLAIMS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: bytes, value: Any, expires_at: float):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class JWKS:
+    """
+    Public keys of the realm and their algorithm by key id. The keys are fetched again when
+    a token is signed with an unknown key, which is how a key rotation of the realm is
+    picked up.
+    """
+
+    def __init__(self, fetch: Callable[[], dict]):
+        self._fetch = fetch
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        keys = {}
+        for key in self._fetch().get("keys", []):
+            if key.get("use", "sig") != "sig" or "kid" not in key:
+                continue
+            # RSA keys of Keycloak do not always state their algorithm
+            alg = key.get("alg") or ("RS256" if key.get("kty") == "RSA" else None)
+            if alg not in TOKEN_ALGORITHMS:
+                continue  # Tokens signed with it are rejected
+            try:
+                keys[key["kid"]] = (jwk.construct(key, alg), alg)
+            except JOSEError:
+                continue
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    def get(self, kid: str) -> tuple:
+        """
+        Returns the key and its algorithm
+        """
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        with self._lock:
+            if kid not in self._keys and time.monotonic() - self._fetched_at >= JWKS_REFRESH_INTERVAL:
+                self._refresh()
+        key = self._keys.get(kid)
+        if key is None:
+            raise InvalidTokenError(f"Token is signed with an unknown key {kid!r}")
+        return key
+
+
+class TokenVerifier:
+    """
+    Verifies tokens locally against the JWKS of the realm (mode local) or with the
+    introspection endpoint of Keycloak (mode introspect), and caches the result per token
+    so only unknown or expired tokens are verified.
+    """
+
+    def __init__(self, keycloak_openid: Callable[[], Any], mode: str = "local", issuer: Optional[str] = None):
+        if mode not in ("local", "introspect"):
+            raise ValueError(f"Unknown token verification {mode!r}, use local or introspect")
+        self.mode = mode
+        # URL of the realm, the iss of its tokens
+        self.issuer = issuer
+        self._keycloak_openid = keycloak_openid
+        self.jwks = JWKS(lambda: self._keycloak_openid().certs())
+        self.cache = ClaimsCache()
+
+    def decode(self, token: str) -> dict:
+        # Imported here, keycloak is only needed once a token is verified
+        from keycloak import KeycloakError
+
+        try:
+            header = jwt.get_unverified_header(token)
+            key, alg = self.jwks.get(header.get("kid"))
+            claims = jwt.decode(
+                token, key, algorithms=[alg], issuer=self.issuer, options={"verify_aud": False}
+            )
+        except (JOSEError, KeycloakError) as e:
+            raise InvalidTokenError(str(e)) from e
+        claims["active"] = True
+        return claims
+
+    def introspect(self, token: str) -> dict:
+        from keycloak import KeycloakError
+
+        try:
+            return self._keycloak_openid().introspect(token)
+        except KeycloakError as e:
+            raise InvalidTokenError(str(e)) from e
+
+    def verify(self, token: str, convert: Callable[[dict], Any] = dict) -> Any:
+        """
+        Returns convert(claims) of a valid token, from the cache if the token was verified
+        before. Raises InvalidTokenError for invalid, expired or inactive tokens.
+        """
+        key = token_key(token)
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+
+        claims = self.decode(token) if self.mode == "local" else self.introspect(token)
+        if not claims.get("active"):
+            raise InvalidTokenError("Token is not active. Try to refresh token")
+        value = convert(claims)
+        expires_at = min(time.time() + CLAIMS_CACHE_TTL, claims.get("exp") or float("inf"))
+        self.cache.put(key, value, expires_at)
+        return value
@@ -1,10 +1,19 @@
-# from fastapi.security import OAuth2PasswordBearer
-# from keycloak import KeycloakOpenID, KeycloakAuthenticationError
-# from ..config.Settings import Settings
-#
-# keycloak_openid = KeycloakOpenID(server_url=Settings.KEYCLOAK_HOST,
-#                                  realm_name=Settings.INDEXING_KEYCLOAK_REALM,
-#                                  client_id=Settings.INDEXING_KEYCLOAK_CLIENT_ID,
-#                                  client_secret_key=Settings.INDEXING_KEYCLOAK_CLIENT_SECRET_KEY)
-#
-# oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+from functools import lru_cache
+
+from fastapi.security import OAuth2PasswordBearer
+
+from ..config.Settings import settings
+
+# Without an Authorization header the token is None instead of a 401, so the routes stay
+# open while authentication is disabled (see SentoAuth)
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+
+@lru_cache(maxsize=None)
+def keycloak_openid():
+    from keycloak import KeycloakOpenID
+
+    return KeycloakOpenID(server_url=settings.KEYCLOAK_HOST,
+                          realm_name=settings.INDEXING_KEYCLOAK_REALM,
+                          client_id=settings.INDEXING_KEYCLOAK_CLIENT_ID,
+                          client_secret_key=settings.INDEXING_KEYCLOAK_CLIENT_SECRET_KEY)
@@ -2,14 +2,15 @@
 DO NOT EDIT! THIS IS AN AUTOGENERATED FILE!!!!!
 """
 
-import os
-from typing import Type, List, Optional, Callable, Any, Union, Generator
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from typing import Type, List, Optional, Callable, Any, Union, Generator, AsyncGenerator
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request, Response
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 
-from sqlalchemy import inspect
+from sqlalchemy import inspect, tuple_, select, delete, func
 from .authentication import SentoAuth
+from . import streaming
+from utils.filters import FilterBuilder
 #from .security import keycloak_openid
 from ..logging.logger import logger
 from . import (
@@ -35,9 +36,40 @@ else:
     sqlalchemy_installed = True
     Session = Callable[..., Generator[Session, Any, None]]
 
+try:
+    # Requires greenlet
+    from sqlalchemy.ext.asyncio import AsyncSession
+except ImportError as e:
+    AsyncSession = None
+else:
+    AsyncSession = Callable[..., AsyncGenerator[AsyncSession, None]]
+
 CALLABLE = Callable[..., Model]
 CALLABLE_LIST = Callable[..., List[Model]]
 
+# Response header of the list endpoints holding the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+GET_ALL_DESCRIPTION = """
+With a limit, the cursor of the next page is returned in the X-Next-Cursor
+header. Passing it as `after` continues after the last row of the page
+without the cost of an offset.
+
+`fields` is a comma separated list of the columns to return, only those
+are selected. Send Accept: application/msgpack or
+application/vnd.apache.arrow.stream for a binary response.
+"""
+
+ETAG_DESCRIPTION = """
+The ETag of the response changes when a row matching the filters is
+inserted, updated or deleted. Send it as If-None-Match to get an empty
+304 Not Modified response while the rows did not change.
+"""
+
+# Browsers and clients cache the responses of the routes with etag, but revalidate them
+# (If-None-Match) before every use
+ETAG_CACHE_CONTROL = "private, no-cache"
+
 
 class SentoRouter(APIRouter):
     _base_path: str = "/"
@@ -68,10 +100,14 @@ class SentoRouter(APIRouter):
                  delete_all_callback=False,
                  update_one_callback=False,
                  unique_fields=None,
+                 cursor_key: Optional[List[str]] = None,
+                 fast_read: bool = False,
+                 async_db: Optional["AsyncSession"] = None,
+                 async_read_db: Optional["AsyncSession"] = None,
+                 etag: bool = False,
                  **kwargs) -> None:
 
         self.logger = logger
-        self._sqs_client = _utils.get_sqs_client()
 
         self.schema = schema
         self.db_model = db_model
@@ -80,8 +116,25 @@ class SentoRouter(APIRouter):
             unique_fields = []
         self.unique_fields = unique_fields
         self.db_func = db
+        # With async_db the routes are async and use the async engine, the read only
+        # routes use async_read_db (the read replica) when given
+        self.async_db_func = async_db
+        self.async_read_db_func = async_read_db or async_db
         self._pk: str = db_model.__table__.primary_key.columns.keys()[0]
         self._pk_type: type = _utils.get_pk_type(schema, self._pk)
+        # Columns the list endpoint is ordered and paginated on, must be unique
+        self.cursor_key = cursor_key if cursor_key else [self._pk]
+        # With fast_read the read routes select the columns of the schema and serialize the
+        # rows with orjson, skipping the ORM objects and the response model validation.
+        # The response model still documents the routes.
+        self.fast_read = fast_read
+        self._read_columns = [self.db_cols[name] for name in schema.model_fields if name in self.db_cols]
+        # With etag the read routes return an ETag derived from modified_on and answer a
+        # matching If-None-Match with 304, lists check it with an aggregate query before
+        # selecting the rows
+        if etag and ("modified_on" not in self.db_cols or "modified_on" not in schema.model_fields):
+            raise ValueError(f"etag requires a modified_on column in {db_model.__name__} and its schema")
+        self.etag = etag
 
         self.pagination = _utils.pagination_factory(max_limit=paginate)
 
@@ -106,6 +159,7 @@ class SentoRouter(APIRouter):
 
             self._get_all_filter_function = params
         self.get_all_filter_meta = get_all_filter_meta
+        self._get_all_filters = FilterBuilder(self.db_model, get_all_filter_meta)
 
         if get_one_filter_function:
             self._get_one_filter_function = get_one_filter_function
@@ -135,7 +189,7 @@ class SentoRouter(APIRouter):
         if get_all_route:
             self._add_api_route(
                 "",
-                self._get_all(),
+                self._route("_get_all"),
                 methods=["GET"],
                 response_model=Optional[List[self.schema]],  # type: ignore
                 summary="Get All",
@@ -146,7 +200,7 @@ class SentoRouter(APIRouter):
         if get_one_route:
             self._add_api_route(
                 "/{id}",
-                self._get_one(),
+                self._route("_get_one"),
                 methods=["GET"],
                 response_model=self.schema,
                 summary="Get One",
@@ -156,7 +210,7 @@ class SentoRouter(APIRouter):
         if create_one_route:
             self._add_api_route(
                 "",
-                self._create(),
+                self._route("_create"),
                 methods=["POST"],
                 response_model=self.schema,
                 summary="Create One",
@@ -166,7 +220,7 @@ class SentoRouter(APIRouter):
         if create_all_route:
             self._add_api_route(
                 "/all",
-                self._create_all(),
+                self._route("_create_all"),
                 methods=["POST"],
                 response_model=List[self.schema],
                 summary="Create All",
@@ -176,7 +230,7 @@ class SentoRouter(APIRouter):
         if update_one_route:
             self._add_api_route(
                 "/{id}",
-                self._update(),
+                self._route("_update"),
                 methods=["PUT"],
                 response_model=self.schema,
                 summary="Update One",
@@ -186,7 +240,7 @@ class SentoRouter(APIRouter):
         if delete_one_route:
             self._add_api_route(
                 "/{id}",
-                self._delete_one(),
+                self._route("_delete_one"),
                 methods=["DELETE"],
                 response_model=self.schema,
                 summary="Delete One",
@@ -200,7 +254,7 @@ class SentoRouter(APIRouter):
 
             self._add_api_route(
                 "",
-                self._delete_all(),
+                self._route("_delete_all"),
                 methods=["DELETE"],
                 summary="Delete All",
                 response_model=DeleteAll,
@@ -228,59 +282,234 @@ class SentoRouter(APIRouter):
             path, endpoint, dependencies=dependencies, responses=responses, **kwargs
         )
 
+    def _route(self, name: str) -> Callable[..., Any]:
+        """
+        Endpoint of a generated route, the async variant when an async session is configured
+        """
+        if self.async_db_func is not None:
+            name = "_async" + name
+        return getattr(self, name)()
+
     def __push_callback_event(self, event):
-        try:
-            self._sqs_client.send_message(
-                QueueUrl=os.getenv("SQS_EVENT_QUEUE_URL"),
-                MessageBody=_utils.to_json(event)
+        _utils.push_event(_utils.get_sqs_client(), event)
+
+    def _projection(self, fields: str) -> List[Any]:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.db_cols]
+        if unknown:
+            raise _utils.create_query_validation_exception(
+                field="fields", msg=f"unknown fields: {', '.join(unknown)}"
+            )
+        # The cursor key is always returned, the cursor of the next page is built from it
+        names = list(dict.fromkeys([*self.cursor_key, *names]))
+        return [self.db_cols[name] for name in names]
+
+    def _read_format(self, request: Request, fields: Optional[str]):
+        """
+        Response format and selected columns of a read. Without columns ORM models are
+        returned and serialized with the response model.
+        """
+        format = streaming.negotiate_format(request.headers.get("accept"))
+        columns = self._projection(fields) if fields else None
+        if columns is None and (format != "json" or self.fast_read):
+            columns = self._read_columns
+        return format, columns
+
+    def _select_all(self, args: dict, pagination: PAGINATION, after: Optional[str], columns: Optional[List[Any]]):
+        skip, limit = pagination.get("skip"), pagination.get("limit")
+        stmt = select(self.db_model) if columns is None else select(*columns)
+
+        stmt = stmt.where(*self._get_all_filters(args))
+        cursor_columns = [getattr(self.db_model, column) for column in self.cursor_key]
+        if after is not None:
+            if skip:
+                raise _utils.create_query_validation_exception(
+                    field="skip", msg="skip can not be combined with after"
+                )
+            values = _utils.decode_cursor(after)
+            if len(values) != len(cursor_columns):
+                raise _utils.create_query_validation_exception(field="after", msg="invalid cursor")
+            stmt = stmt.where(tuple_(*cursor_columns) > tuple_(*values))
+
+        return stmt.order_by(*cursor_columns).limit(limit).offset(skip)
+
+    def _list_response(self, db_models: List[Any], columns: Optional[List[Any]], format: str,
+                       pagination: PAGINATION, response: Response, etag: Optional[str] = None):
+        limit = pagination.get("limit")
+        if columns is not None:
+            # Rows instead of models, serialized without the response model
+            response = streaming.rows_response(
+                [row._asdict() for row in db_models], columns, format
             )
-        except Exception as e:
-            print(e)
+        if etag is not None:
+            self._set_etag(response, etag)
+        if limit is not None and len(db_models) == limit:
+            last = db_models[-1]
+            response.headers[NEXT_CURSOR_HEADER] = _utils.encode_cursor(
+                [getattr(last, column) for column in self.cursor_key]
+            )
+        return db_models if columns is None else response
+
+    def _select_one(self, id: int):
+        return select(*self._read_columns).where(getattr(self.db_model, self._pk) == id)
+
+    def _select_version(self, args: dict):
+        """
+        Version of the rows matching the filters. Inserts and deletes change the count,
+        updates the max and the sum of modified_on (the sum also catches an update that
+        commits with an older modified_on than the max).
+        """
+        modified_on = self.db_cols["modified_on"]
+        return select(
+            func.count(), func.max(modified_on), func.sum(func.extract("epoch", modified_on))
+        ).where(*self._get_all_filters(args))
+
+    def _list_etag(self, request: Request, version) -> str:
+        # The query (filters, pagination, fields) and the format select the rows and
+        # their representation
+        return _utils.make_etag(
+            self.prefix, str(request.query_params), request.headers.get("accept"), *version
+        )
+
+    def _one_etag(self, id: int, modified_on) -> str:
+        return _utils.make_etag(self.prefix, id, modified_on)
+
+    @staticmethod
+    def _set_etag(response: Response, etag: str):
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = ETAG_CACHE_CONTROL
+
+    def _not_modified(self, request: Request, etag: str) -> Optional[Response]:
+        """
+        304 response when the If-None-Match of the request matches etag
+        """
+        if not _utils.etag_matches(request.headers.get("if-none-match"), etag):
+            return None
+        response = Response(status_code=304)
+        self._set_etag(response, etag)
+        return response
 
     def _get_all(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
         def route(
+                request: Request,
+                response: Response,
                 args=Depends(self._get_all_filter_function),
                 pagination: PAGINATION = self.pagination,
+                after: Optional[str] = None,
+                fields: Optional[str] = None,
                 db: Session = Depends(self.db_func),
                 auth: SentoAuth = Depends(SentoAuth)
         ) -> List[Model]:
-            skip, limit = pagination.get("skip"), pagination.get("limit")
-            query = db.query(self.db_model)
-
-            for k, v in args.items():
-                filter_meta = self.get_all_filter_meta.get(k, {})
-                if v is not None:
-                    if filter_meta.get('condition', '==') == "in":
-                        v_split = v.split(",")
-                        filter = f"self.db_cols['{filter_meta.get('column', '==')}'].in_(v_split)"
-                    else:
-                        filter = f"self.db_cols['{filter_meta.get('column', '==')}'] {filter_meta.get('condition', '==')} v"
-                    query = query.filter(
-                        eval(
-                            filter
-                        )
-                    )
-            db_models: List[Model] = (
-                query
-                    .order_by(getattr(self.db_model, self._pk))
-                    .limit(limit)
-                    .offset(skip)
-                    .all()
-            )
-            return db_models
+            format, columns = self._read_format(request, fields)
+            etag = None
+            if self.etag:
+                etag = self._list_etag(request, (db.execute(self._select_version(args))).one())
+                not_modified = self._not_modified(request, etag)
+                if not_modified is not None:
+                    return not_modified
+            stmt = self._select_all(args, pagination, after, columns)
+            result = db.execute(stmt)
+            db_models = result.scalars().all() if columns is None else result.all()
+            return self._list_response(db_models, columns, format, pagination, response, etag)
+
+        route.__doc__ = GET_ALL_DESCRIPTION + (ETAG_DESCRIPTION if self.etag else "")
+        return route
 
+    def _async_get_all(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
+        async def route(
+                request: Request,
+                response: Response,
+                args=Depends(self._get_all_filter_function),
+                pagination: PAGINATION = self.pagination,
+                after: Optional[str] = None,
+                fields: Optional[str] = None,
+                db: AsyncSession = Depends(self.async_read_db_func),
+                auth: SentoAuth = Depends(SentoAuth)
+        ) -> List[Model]:
+            format, columns = self._read_format(request, fields)
+            etag = None
+            if self.etag:
+                etag = self._list_etag(request, (await db.execute(self._select_version(args))).one())
+                not_modified = self._not_modified(request, etag)
+                if not_modified is not None:
+                    return not_modified
+            stmt = self._select_all(args, pagination, after, columns)
+            result = await db.execute(stmt)
+            db_models = result.scalars().all() if columns is None else result.all()
+            return self._list_response(db_models, columns, format, pagination, response, etag)
+
+        route.__doc__ = GET_ALL_DESCRIPTION + (ETAG_DESCRIPTION if self.etag else "")
         return route
 
+    def _fetch_one(self, db, id: int) -> Model:
+        # The model itself, _get_one returns a response with fast_read
+        model: Model = db.get(self.db_model, id)
+        if model is None:
+            raise NOT_FOUND from None
+        return model
+
+    def _one_response(self, request: Request, id: int, row, response: Optional[Response] = None):
+        """
+        Result of the get one routes. A fast_read row is serialized here, a model is
+        returned as is with the headers set on response. The row is a primary key lookup,
+        so it is fetched before its ETag is checked.
+        """
+        etag = None
+        if self.etag:
+            etag = self._one_etag(id, row.modified_on)
+            not_modified = self._not_modified(request, etag)
+            if not_modified is not None:
+                return not_modified
+
+        if response is None:
+            result = response = streaming.rows_response([row._asdict()], self._read_columns, "json", one=True)
+        else:
+            result = row
+        if etag is not None:
+            self._set_etag(response, etag)
+        return result
+
     def _get_one(self, *args: Any, **kwargs: Any) -> CALLABLE:
 
         def route(
                 id: int,
+                request: Request,
+                response: Response,
                 db: Session = Depends(self.db_func),
                 auth: SentoAuth = Depends(SentoAuth)
         ) -> Model:
+            if self.fast_read:
+                row = db.execute(self._select_one(id)).first()
+                if row is None:
+                    raise NOT_FOUND from None
+                return self._one_response(request, id, row)
+
             model: Model = db.query(self.db_model).get(id)
             if model:
-                return model
+                return self._one_response(request, id, model, response)
+            else:
+                raise NOT_FOUND from None
+
+        return route
+
+    def _async_get_one(self, *args: Any, **kwargs: Any) -> CALLABLE:
+
+        async def route(
+                id: int,
+                request: Request,
+                response: Response,
+                db: AsyncSession = Depends(self.async_read_db_func),
+                auth: SentoAuth = Depends(SentoAuth)
+        ) -> Model:
+            if self.fast_read:
+                row = (await db.execute(self._select_one(id))).first()
+                if row is None:
+                    raise NOT_FOUND from None
+                return self._one_response(request, id, row)
+
+            model: Model = await db.get(self.db_model, id)
+            if model:
+                return self._one_response(request, id, model, response)
             else:
                 raise NOT_FOUND from None
 
@@ -328,6 +557,38 @@ class SentoRouter(APIRouter):
 
         return route
 
+    def _async_create(self, *args: Any, **kwargs: Any) -> CALLABLE:
+        schema = self.create_schema
+
+        async def route(
+                model: schema,
+                background_task: BackgroundTasks,
+                db: AsyncSession = Depends(self.async_db_func),
+                auth: SentoAuth = Depends(SentoAuth)
+        ) -> Model:
+            try:
+                db_model: Model = self.db_model(**model.dict())
+                setattr(db_model, "modified_on", _utils.get_modified_on())
+                db.add(db_model)
+                await db.commit()
+                await db.refresh(db_model)
+
+                if self.create_one_callback:
+                    background_task.add_task(
+                        self.__push_create_one_callback_event,
+                        _utils.object_as_dict(db_model)
+                    )
+                return db_model
+            except IntegrityError as e:
+                print(e)
+                await db.rollback()
+                raise HTTPException(422, "Key already exists") from None
+            except Exception as e:
+                print(e)
+                raise HTTPException(500, str(e)) from None
+
+        return route
+
     # TODO: implement callback event
     def _create_all(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
         schema = self.upsert_schema
@@ -339,37 +600,65 @@ class SentoRouter(APIRouter):
                 auth: SentoAuth = Depends(SentoAuth)
         ) -> List[Model]:
             try:
-                model_dicts = []
-                update_on_id = []
-
-                for model in models:
-                    do_update_on_id = False
-                    model_dict = model.dict()
-                    if len(self.unique_fields) == 0 and "id" in model_dict.keys():
-                        id = model_dict.get("id")
-                        if id is None:
-                            del model_dict["id"]
-                        elif id > 0:
-                            do_update_on_id = True
-
-                    update_on_id.append(do_update_on_id)
-                    model_dicts.append(model_dict)
-
-                instances = _utils.bulk_create_or_update(
-                    session=db,
-                    model=self.db_model,
-                    data=model_dicts,
-                    unique_fields=self.unique_fields,
-                    do_update_on_id=update_on_id
-                )
+                instances = self._upsert_all(db, models)
                 db.commit()
                 return instances
+            except HTTPException:
+                db.rollback()
+                raise
             except Exception as e:
                 db.rollback()
                 raise HTTPException(500, e) from None
 
         return route
 
+    def _async_create_all(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
+        schema = self.upsert_schema
+
+        async def route(
+                models: List[schema],
+                background_task: BackgroundTasks,
+                db: AsyncSession = Depends(self.async_db_func),
+                auth: SentoAuth = Depends(SentoAuth)
+        ) -> List[Model]:
+            try:
+                instances = await db.run_sync(self._upsert_all, models)
+                await db.commit()
+                return instances
+            except HTTPException:
+                await db.rollback()
+                raise
+            except Exception as e:
+                await db.rollback()
+                raise HTTPException(500, e) from None
+
+        return route
+
+    def _upsert_all(self, db, models: List[SCHEMA]) -> List[Model]:
+        model_dicts = []
+        update_on_id = []
+
+        for model in models:
+            do_update_on_id = False
+            model_dict = model.dict()
+            if len(self.unique_fields) == 0 and "id" in model_dict.keys():
+                id = model_dict.get("id")
+                if id is None:
+                    del model_dict["id"]
+                elif id > 0:
+                    do_update_on_id = True
+
+            update_on_id.append(do_update_on_id)
+            model_dicts.append(model_dict)
+
+        return _utils.upsert_all(
+            session=db,
+            model=self.db_model,
+            data=model_dicts,
+            unique_fields=self.unique_fields,
+            do_update_on_id=update_on_id
+        )
+
     def __push_update_one_callback_event(self, old_model: dict, new_model: dict):
         event = {
             "type": "update-record",
@@ -391,9 +680,7 @@ class SentoRouter(APIRouter):
         ) -> Model:
 
             try:
-                db_model: Model = self._get_one()(id, db
-                , auth
-                )
+                db_model: Model = self._fetch_one(db, id)
                 old_db_model = _utils.object_as_dict(db_model)
                 for key, value in model.dict(exclude={self._pk}).items():
                     if hasattr(db_model, key):
@@ -420,6 +707,43 @@ class SentoRouter(APIRouter):
 
         return route
 
+    def _async_update(self, *args: Any, **kwargs: Any) -> CALLABLE:
+        schema = self.update_schema
+
+        async def route(
+                id: int,
+                model: schema,  # type: ignore
+                background_task: BackgroundTasks,
+                db: AsyncSession = Depends(self.async_db_func),
+                auth: SentoAuth = Depends(SentoAuth)
+        ) -> Model:
+            db_model: Model = await db.get(self.db_model, id)
+            if db_model is None:
+                raise NOT_FOUND from None
+            try:
+                old_db_model = _utils.object_as_dict(db_model)
+                for key, value in model.dict(exclude={self._pk}).items():
+                    if hasattr(db_model, key):
+                        setattr(db_model, key, value)
+                setattr(db_model, "modified_on", _utils.get_modified_on())
+
+                await db.commit()
+                await db.refresh(db_model)
+            except IntegrityError as e:
+                print(e)
+                await db.rollback()
+                raise HTTPException(422, ", ".join(e.args))
+
+            if self.update_one_callback:
+                background_task.add_task(
+                    self.__push_update_one_callback_event,
+                    old_db_model,
+                    _utils.object_as_dict(db_model)
+                )
+            return db_model
+
+        return route
+
     def __push_delete_all_callback_event(self, models: List[dict]):
         event = {
             "type": "delete-records",
@@ -437,19 +761,7 @@ class SentoRouter(APIRouter):
         ) -> List[Model]:
             query = db.query(self.db_model)
 
-            for k, v in args.items():
-                filter_meta = self.get_all_filter_meta.get(k, {})
-                if v is not None:
-                    if filter_meta.get('condition', '==') == "in":
-                        v_split = v.split(",")
-                        filter = f"self.db_cols['{filter_meta.get('column', '==')}'].in_(v_split)"
-                    else:
-                        filter = f"self.db_cols['{filter_meta.get('column', '==')}'] {filter_meta.get('condition', '==')} v"
-                    query = query.filter(
-                        eval(
-                            filter
-                        )
-                    )
+            query = query.filter(*self._get_all_filters(args))
             if self.delete_all_callback:
                 all_models = query.all()
                 background_task.add_task(
@@ -463,6 +775,29 @@ class SentoRouter(APIRouter):
 
         return route
 
+    def _async_delete_all(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
+        async def route(
+                background_task: BackgroundTasks,
+                args=Depends(self._get_all_filter_function),
+                db: AsyncSession = Depends(self.async_db_func),
+                auth: SentoAuth = Depends(SentoAuth)
+        ) -> List[Model]:
+            filters = self._get_all_filters(args)
+            if self.delete_all_callback:
+                all_models = (await db.execute(select(self.db_model).where(*filters))).scalars().all()
+                background_task.add_task(
+                    self.__push_delete_all_callback_event,
+                    [_utils.object_as_dict(r) for r in all_models]
+                )
+            await db.execute(
+                delete(self.db_model).where(*filters).execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+            return {"status": "ok"}
+
+        return route
+
     def __push_delete_one_callback_event(self, model: Type[SCHEMA]):
         event = {
             "type": "delete-record",
@@ -478,7 +813,7 @@ class SentoRouter(APIRouter):
                 db: Session = Depends(self.db_func),
                 auth: SentoAuth = Depends(SentoAuth)
         ) -> Model:
-            db_model: Model = self._get_one()(id, db,auth)
+            db_model: Model = self._fetch_one(db, id)
             db.delete(db_model)
 
             if self.delete_one_callback:
@@ -492,6 +827,29 @@ class SentoRouter(APIRouter):
 
         return route
 
+    def _async_delete_one(self, *args: Any, **kwargs: Any) -> CALLABLE:
+        async def route(
+                id: int,
+                background_task: BackgroundTasks,
+                db: AsyncSession = Depends(self.async_db_func),
+                auth: SentoAuth = Depends(SentoAuth)
+        ) -> Model:
+            db_model: Model = await db.get(self.db_model, id)
+            if db_model is None:
+                raise NOT_FOUND from None
+            await db.delete(db_model)
+
+            if self.delete_one_callback:
+                background_task.add_task(
+                    self.__push_delete_one_callback_event,
+                    _utils.object_as_dict(db_model)
+                )
+            await db.commit()
+
+            return db_model
+
+        return route
+
     def _raise(self, e: Exception, status_code: int = 422) -> HTTPException:
         print(e)
         raise HTTPException(status_code, ", ".join(e.args)) from e
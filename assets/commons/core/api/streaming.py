@@ -0,0 +1,162 @@
+import io
+from typing import Iterable, Iterator, List, Mapping, Optional
+
+import orjson
+from fastapi import Response
+from sqlalchemy import Boolean, DateTime, Float, Integer, BigInteger, String
+from sqlalchemy.sql import ColumnElement, Select
+
+from ..database.db import Session
+
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Binary formats of the list endpoints, by the media types that request them
+RESPONSE_FORMATS = {
+    "msgpack": (MSGPACK_MEDIA_TYPE, "application/x-msgpack"),
+    "arrow": (ARROW_STREAM_MEDIA_TYPE,),
+}
+
+Partitions = Iterable[List[Mapping]]
+
+
+def stream_partitions(stmt: Select, partition_size: int = 1000) -> Iterator[List[Mapping]]:
+    """
+    Runs stmt on a server side cursor and yields the rows in partitions, so only one
+    partition is held in memory. Uses its own session, since the session of the request
+    is closed before a streaming response is sent.
+    """
+    with Session() as session:
+        result = session.execute(stmt.execution_options(stream_results=True, yield_per=partition_size))
+        for partition in result.mappings().partitions():
+            yield partition
+
+
+def ndjson_stream(partitions: Partitions) -> Iterator[bytes]:
+    """
+    Newline delimited json, one chunk per partition
+    """
+    for rows in partitions:
+        yield b"".join(orjson.dumps(dict(row)) + b"\n" for row in rows)
+
+
+def arrow_type(column: ColumnElement):
+    import pyarrow as pa
+
+    if isinstance(column.type, (Integer, BigInteger)):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us", tz="UTC" if column.type.timezone else None)
+    # Strings, and json columns serialized as json text
+    return pa.string()
+
+
+def arrow_stream(partitions: Partitions, columns: List[ColumnElement]) -> Iterator[bytes]:
+    """
+    Arrow IPC stream, one record batch per partition. `columns` are the selected columns,
+    json columns are sent as json text.
+    """
+    # Imported here, pyarrow is only needed for arrow responses
+    import pyarrow as pa
+
+    schema = pa.schema([(column.key, arrow_type(column)) for column in columns])
+    json_columns = [
+        column.key for column in columns
+        if not isinstance(column.type, (Integer, BigInteger, Float, Boolean, DateTime, String))
+    ]
+
+    def encode(row):
+        row = dict(row)
+        for key in json_columns:
+            if row[key] is not None:
+                row[key] = orjson.dumps(row[key]).decode()
+        return row
+
+    def stream():
+        sink = io.BytesIO()
+
+        def drain():
+            data = sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+            return data
+
+        with pa.ipc.new_stream(sink, schema) as writer:
+            for rows in partitions:
+                writer.write_batch(pa.RecordBatch.from_pylist([encode(row) for row in rows], schema=schema))
+                yield drain()
+        # End of stream marker
+        yield drain()
+
+    return stream()
+
+
+# Minimum size of the parts of a multipart upload (but the last)
+S3_PART_SIZE = 8 * 1024 ** 2
+
+
+def upload_stream(s3_client, bucket: str, key: str, chunks: Iterable[bytes], content_type: str):
+    """
+    Uploads the chunks to S3 as multipart upload, so only one part is held in memory
+    """
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)["UploadId"]
+    parts = []
+    part = io.BytesIO()
+
+    def flush():
+        response = s3_client.upload_part(
+            Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=len(parts) + 1, Body=part.getvalue()
+        )
+        parts.append({"ETag": response["ETag"], "PartNumber": len(parts) + 1})
+        part.seek(0)
+        part.truncate()
+
+    try:
+        for chunk in chunks:
+            part.write(chunk)
+            if part.tell() >= S3_PART_SIZE:
+                flush()
+        # An empty export is still a part
+        if part.tell() or not parts:
+            flush()
+        s3_client.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+    except Exception:
+        s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """
+    Response format for an Accept header: msgpack, arrow or json (the default)
+    """
+    if accept:
+        for media_range in accept.split(","):
+            media_type = media_range.split(";")[0].strip().lower()
+            for format, media_types in RESPONSE_FORMATS.items():
+                if media_type in media_types:
+                    return format
+    return "json"
+
+
+def rows_response(rows: List[Mapping], columns: List[ColumnElement], format: str, one: bool = False) -> Response:
+    """
+    Serializes the rows without building pydantic models. With one, the single row
+    is returned as object instead of a list (json and msgpack only).
+    """
+    if format == "arrow":
+        return Response(b"".join(arrow_stream([rows], columns)), media_type=ARROW_STREAM_MEDIA_TYPE)
+    content = dict(rows[0]) if one else [dict(row) for row in rows]
+    if format == "msgpack":
+        # Imported here, msgpack is only needed for msgpack responses
+        import msgpack
+
+        return Response(msgpack.packb(content, default=str), media_type=MSGPACK_MEDIA_TYPE)
+    return Response(orjson.dumps(content), media_type=JSON_MEDIA_TYPE)
@@ -2,47 +2,215 @@
 DO NOT EDIT! THIS IS AN AUTOGENERATED FILE!!!!!
 """
 import os
-import boto3
 import json
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
 
+# Remote values (Secrets Manager, SSM) are fetched on first use and cached for SETTINGS_TTL
+# seconds, so warm containers do not fetch them again but still pick up rotated credentials.
+SETTINGS_TTL = int(os.environ.get("SETTINGS_TTL", 900))
+# json file with setting overrides, e.g. {"POSTGRES_SERVER": "localhost", "API_URL": "..."},
+# for running offline. Environment variables take precedence over the file.
+SETTINGS_FILE = os.environ.get("SETTINGS_FILE")
+
+
+@lru_cache(maxsize=None)
+def get_client(service: str):
+    # boto3 is imported on first use, it is slow to import and not needed when all
+    # settings are overridden
+    import boto3
+
+    return boto3.client(service, use_ssl=True)
+
+
+class TTLCache:
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._values: Dict[Any, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, fetch: Callable[[], Any]):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return entry[0]
+            value = fetch()
+            self._values[key] = (value, time.monotonic() + self.ttl)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+_remote_values = TTLCache(SETTINGS_TTL)
 
 
 def get_ssm_parameter(path: str, with_decryption: bool = False) -> str:
-    ssm_client = boto3.client(
-        "ssm",
-        # region_name="eu-west-1",
-        use_ssl=True
-    )
+    def fetch():
+        params = {"Name": path}
+        if with_decryption:
+            params["WithDecryption"] = True
+        return get_client("ssm").get_parameter(**params)["Parameter"]["Value"]
 
-    params = {"Name": path}
-    if with_decryption:
-        params["WithDecryption"] = True
+    return _remote_values.get(("ssm", path, with_decryption), fetch)
 
-    parameter = ssm_client.get_parameter(
-        **params
-    )["Parameter"]["Value"]
 
-    return parameter
+def get_secret(secret_arn: str) -> dict:
+    def fetch():
+        secret_value = get_client("secretsmanager").get_secret_value(SecretId=secret_arn)
+        return json.loads(secret_value["SecretString"])
+
+    return _remote_values.get(("secret", secret_arn), fetch)
+
+
+@lru_cache(maxsize=None)
+def local_settings() -> dict:
+    if not SETTINGS_FILE:
+        return {}
+    with open(SETTINGS_FILE) as f:
+        return json.load(f)
+
 
 class Settings:
-    client = boto3.client("secretsmanager")
-    secret_arn = os.environ.get("DB_SECRET_ARN","arn:aws:secretsmanager:eu-west-1:643553455790:secret:PIDDBConstructPostgresInsta-0xhzYgm9Otmr-4s2xrh")
-    secret_value = client.get_secret_value(SecretId=secret_arn)
+    """
+    Settings are resolved when they are first read: from the environment, the
+    SETTINGS_FILE, or else Secrets Manager (the database credentials) and SSM.
+    """
+
+    def value(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        if name in os.environ:
+            return os.environ[name]
+        return local_settings().get(name, default)
+
+    def credential(self, name: str, key: str, default: Any = None) -> Any:
+        value = self.value(name)
+        if value is None:
+            value = self.credentials.get(key, default)
+        return value
+
+    @property
+    def secret_arn(self) -> str:
+        return self.value("DB_SECRET_ARN", "arn:aws:secretsmanager:eu-west-1:643553455790:secret:PIDDBConstructPostgresInsta-0xhzYgm9Otmr-4s2xrh")
+
+    @property
+    def credentials(self) -> dict:
+        return get_secret(self.secret_arn)
+
+    @property
+    def POSTGRES_USER(self) -> str:
+        return self.credential("POSTGRES_USER", "username")
+
+    @property
+    def POSTGRES_PASSWORD(self) -> str:
+        return self.credential("POSTGRES_PASSWORD", "password")
 
-    credentials = json.loads(secret_value["SecretString"])
-    print(credentials)
-    POSTGRES_USER = credentials["username"]
-    POSTGRES_PASSWORD = credentials["password"]
-    POSTGRES_SERVER = credentials["host"]
-    POSTGRES_PORT: int = int(credentials.get("port", 5432))
+    @property
+    def POSTGRES_SERVER(self) -> str:
+        return self.credential("POSTGRES_SERVER", "host")
 
-    PID_PROCESSING_QUEUE_URL = os.environ.get("PID_PROCESSING_QUEUE_URL")
+    @property
+    def POSTGRES_PORT(self) -> int:
+        return int(self.credential("POSTGRES_PORT", "port", 5432))
 
-    API_URL = get_ssm_parameter(f"/micro-services/api/url")
-    API_USERNAME =""
-    API_PASSWORD = ""
+    @property
+    def PID_PROCESSING_QUEUE_URL(self) -> Optional[str]:
+        return self.value("PID_PROCESSING_QUEUE_URL")
 
-    POSTGRES_DB: str = os.getenv("POSTGRES_DB", "pid")
-    DATABASE_URL: str = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    @property
+    def S3_BUCKET(self) -> str:
+        return self.value("S3_BUCKET", "643553455790-eu-west-1-files")
+
+    @property
+    def JOB_QUEUE_BACKEND(self) -> str:
+        return self.value("JOB_QUEUE_BACKEND", "sqs")  # sqs or postgres
+
+    @property
+    def API_URL(self) -> str:
+        value = self.value("API_URL")
+        return value if value is not None else get_ssm_parameter(f"/micro-services/api/url")
+
+    @property
+    def API_USERNAME(self) -> str:
+        return self.value("API_USERNAME", "")
+
+    @property
+    def API_PASSWORD(self) -> str:
+        return self.value("API_PASSWORD", "")
+
+    @property
+    def POSTGRES_DB(self) -> str:
+        return self.value("POSTGRES_DB", "pid")
+
+    @property
+    def DATABASE_URL(self) -> str:
+        return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+
+    # Keycloak of the API, authentication is disabled without KEYCLOAK_HOST
+    @property
+    def KEYCLOAK_HOST(self) -> Optional[str]:
+        return self.value("KEYCLOAK_HOST")
+
+    @property
+    def INDEXING_KEYCLOAK_REALM(self) -> Optional[str]:
+        return self.value("INDEXING_KEYCLOAK_REALM")
+
+    @property
+    def INDEXING_KEYCLOAK_CLIENT_ID(self) -> Optional[str]:
+        return self.value("INDEXING_KEYCLOAK_CLIENT_ID")
+
+    @property
+    def INDEXING_KEYCLOAK_CLIENT_SECRET_KEY(self) -> Optional[str]:
+        return self.value("INDEXING_KEYCLOAK_CLIENT_SECRET_KEY")
+
+    @property
+    def TOKEN_VERIFICATION(self) -> str:
+        return self.value("TOKEN_VERIFICATION", "local")  # local (JWKS) or introspect
+
+    @property
+    def AUTH_ENABLED(self) -> bool:
+        return bool(self.KEYCLOAK_HOST)
+
+    # Hosts of the async engines (utils.async_db), the read only routes go to the replica.
+    # Without a replica both point to the primary.
+    @property
+    def POSTGRES_REPLICA_SERVER(self) -> str:
+        return self.value("POSTGRES_REPLICA_SERVER") or self.POSTGRES_SERVER
+
+    @property
+    def DATABASE_HOST(self) -> str:
+        return f"{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}"
+
+    @property
+    def DATABASE_REPLICA_HOST(self) -> str:
+        return f"{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_REPLICA_SERVER}:{self.POSTGRES_PORT}"
+
+    def connect_params(self, driver: str = "psycopg2", replica: bool = False) -> dict:
+        """
+        Connection arguments of the DBAPI driver, read at connect time so an engine can
+        be created without fetching the credentials (see use_settings_credentials)
+        """
+        return {
+            "host": self.POSTGRES_REPLICA_SERVER if replica else self.POSTGRES_SERVER,
+            "port": self.POSTGRES_PORT,
+            "user": self.POSTGRES_USER,
+            "password": self.POSTGRES_PASSWORD,
+            "database" if driver == "asyncpg" else "dbname": self.POSTGRES_DB,
+        }
 
 settings = Settings()
+
+
+def use_settings_credentials(engine, driver: str = "psycopg2", replica: bool = False):
+    """
+    Connects engine (created without host and credentials) with the connect_params of
+    the settings. New connections use the current, possibly rotated, credentials.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "do_connect")
+    def provide_credentials(dialect, conn_rec, cargs, cparams):
+        cparams.update(settings.connect_params(driver, replica))
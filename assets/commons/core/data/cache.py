@@ -0,0 +1,172 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.inspection import inspect
+from sqlalchemy.orm import Session
+
+# Set READ_CACHE_TTL=0 to disable the read caches of the data classes
+READ_CACHE_TTL = float(os.environ.get("READ_CACHE_TTL", 60))
+READ_CACHE_SIZE = int(os.environ.get("READ_CACHE_SIZE", 1024))
+
+# Caches by table name, cleared by the bulk statements executed on their table
+_caches: Dict[str, "ReadCache"] = {}
+
+
+class ReadCache:
+    """
+    Bounded (LRU) cache of the from_id and get results of a data class, entries expire after
+    ttl seconds. Entries are keyed by ("id", id) or ("get", filters) and remember the id of
+    the row, so a write of the row invalidates both.
+
+    Writes through the ORM in this process invalidate the entries of the row, bulk
+    statements (insert, update, delete) on the table clear the cache. Writes by other
+    processes are seen after at most ttl seconds, except for get(**filters) lookups with
+    the filters of the data class: lookup() checks them against the count and latest
+    modified_on of the matching rows, so a row written or added by another process (a new
+    equipment list of the project) is seen right away.
+    """
+
+    def __init__(
+        self,
+        orm: type,
+        ttl: float = READ_CACHE_TTL,
+        maxsize: int = READ_CACHE_SIZE,
+        filters: Optional[Callable[[dict], list]] = None,
+    ):
+        self.orm = orm
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pk = inspect(orm).primary_key[0].name
+        self._filters = filters if "modified_on" in orm.__table__.c else None
+        _caches[orm.__table__.name] = self
+        event.listen(orm, "after_update", self._row_written)
+        event.listen(orm, "after_delete", self._row_written)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @staticmethod
+    def query_key(filters: Dict[str, Any]) -> Optional[Hashable]:
+        """
+        Key of get(**filters), None if the filters can not be cached (e.g. a limit or db)
+        """
+        if not filters or any(k in filters for k in ("db", "adb", "limit")):
+            return None
+        try:
+            key = ("get", frozenset(filters.items()))
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def version_statement(self, key: Optional[Hashable]):
+        """
+        Count and latest modified_on of the rows of a get(**filters) key, None if the
+        entries of the key are not versioned
+        """
+        if self._filters is None or key is None or key[0] != "get" or not self.enabled:
+            return None
+        return select(func.count(), func.max(self.orm.modified_on)).where(*self._filters(dict(key[1])))
+
+    def lookup(self, key: Optional[Hashable]) -> tuple:
+        """
+        get() of a key, checked against the version of its rows. Returns the cached copy
+        (None if not cached or stale) and the version to put a new value with.
+        """
+        stmt = self.version_statement(key)
+        if stmt is None:
+            return self.get(key), None
+        # Imported here, only versioned lookups need the engines
+        from ..database.db import Session
+
+        with Session() as session:
+            version = tuple(session.execute(stmt).one())
+        return self.get(key, version), version
+
+    async def async_lookup(self, key: Optional[Hashable]) -> tuple:
+        stmt = self.version_statement(key)
+        if stmt is None:
+            return self.get(key), None
+        from utils.async_db import indexingAsyncSession
+
+        async with indexingAsyncSession() as adb:
+            version = tuple((await adb.execute(stmt)).one())
+        return self.get(key, version), version
+
+    def get(self, key: Optional[Hashable], version: Optional[tuple] = None):
+        """
+        Copy of the cached data class, None if it is not cached or was cached with
+        another version
+        """
+        if key is None or not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[2] <= time.monotonic() or entry[3] != version):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+        # Callers modify and save the data classes they get, they get their own copy
+        return copy.deepcopy(entry[0])
+
+    def put(self, key: Optional[Hashable], value: Any, version: Optional[tuple] = None):
+        if key is None or value is None or not self.enabled:
+            return
+        entry = (copy.deepcopy(value), getattr(value, self._pk), time.monotonic() + self.ttl, version)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, id: Any):
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[1] == id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _row_written(self, mapper, connection, target):
+        self.invalidate(getattr(target, self._pk))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+def read_cache_stats() -> Dict[str, dict]:
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _clear_on_bulk_write(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    cache = _caches.get(getattr(table, "name", None))
+    if cache is not None:
+        cache.clear()
@@ -2,10 +2,12 @@ from utils.db_args import engine_args
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from ..config.Settings import settings
+from ..config.Settings import use_settings_credentials
 
 
-engine = create_engine(settings.DATABASE_URL, **engine_args())
+# Host and credentials are read from the settings when the first connection is made
+engine = create_engine("postgresql+psycopg2://", **engine_args(driver="psycopg2"))
+use_settings_credentials(engine, driver="psycopg2")
 Session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 
@@ -0,0 +1,42 @@
+import json
+from contextlib import asynccontextmanager
+
+import psycopg
+
+from utils.db_args import pool_profile
+from ..config.Settings import settings
+
+# Notified by the job_status_notify trigger on every status change of a job
+JOB_STATUS_CHANNEL = "job_status"
+
+
+def listen_supported() -> bool:
+    # PgBouncer in transaction mode runs every transaction on another server connection,
+    # the notifications of a LISTEN never arrive
+    return pool_profile() != "pgbouncer"
+
+
+@asynccontextmanager
+async def listen(channel: str):
+    """
+    LISTENs on channel on a dedicated connection straight to postgres, outside of the pools.
+    Yields a coroutine function that waits at most `timeout` seconds for notifications and
+    returns their json payloads.
+    """
+    if not listen_supported():
+        raise RuntimeError("LISTEN needs a direct connection to postgres, not available with the pgbouncer pool profile")
+
+    # LISTEN only takes effect once committed
+    connection = await psycopg.AsyncConnection.connect(autocommit=True, **settings.connect_params("psycopg_async"))
+
+    async def wait(timeout: float):
+        return [
+            json.loads(n.payload)
+            async for n in connection.notifies(timeout=max(timeout, 0), stop_after=1)
+        ]
+
+    try:
+        await connection.execute(f'LISTEN "{channel}"')
+        yield wait
+    finally:
+        await connection.close()
@@ -0,0 +1 @@
+from .job_queue import JobQueue, QueueMessage, SqsJobQueue, PostgresJobQueue, get_job_queue
\ No newline at end of file
@@ -0,0 +1,362 @@
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import boto3
+from sqlalchemy import select, update, func, and_
+
+from utils.logger import makeCustomLogger
+from utils.sqs import send_message_batch, to_json
+from ..config.Settings import settings
+
+# Seconds a received job is hidden from other workers. Workers extend it while they
+# process the job (JobQueue.heartbeat), so it only expires when the worker died.
+JOB_QUEUE_VISIBILITY_TIMEOUT = int(os.getenv("JOB_QUEUE_VISIBILITY_TIMEOUT", 300))
+# Seconds before a failed job is retried, times the number of attempts
+JOB_QUEUE_RETRY_DELAY = int(os.getenv("JOB_QUEUE_RETRY_DELAY", 10))
+
+
+@dataclass
+class QueueMessage:
+    id: str
+    body: dict
+    attempts: int = 1
+    receipt_handle: Optional[str] = None
+
+    def to_record(self) -> dict:
+        """
+        Shape of an SQS record as received by a Lambda, so both backends can drive
+        process_record
+        """
+        return {"messageId": self.id, "body": json.dumps(self.body)}
+
+
+class JobQueue(ABC):
+    """
+    Queue of the processing jobs. Messages are dicts containing at least a job_id.
+    """
+    _logger = makeCustomLogger("job_queue")
+
+    @abstractmethod
+    def send_messages(self, messages: List[dict]) -> List[int]:
+        """
+        Queues the messages. Returns the indexes of the messages that could not be queued.
+        """
+        pass
+
+    @abstractmethod
+    def receive_messages(self, max_messages: int = 1) -> List[QueueMessage]:
+        pass
+
+    @abstractmethod
+    def complete(self, message: QueueMessage):
+        pass
+
+    @abstractmethod
+    def fail(self, message: QueueMessage, error: str = None):
+        pass
+
+    @abstractmethod
+    def extend_visibility(self, message: QueueMessage):
+        """
+        Hides the message for another visibility_timeout seconds from now
+        """
+        pass
+
+    @contextmanager
+    def heartbeat(self, messages: List[QueueMessage]):
+        """
+        Extends the visibility of the messages every third of the visibility timeout while
+        the block runs, so long running jobs are not received again by another worker.
+        Remove a message from messages once it is completed or failed.
+        """
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.visibility_timeout / 3):
+                for message in list(messages):
+                    try:
+                        self.extend_visibility(message)
+                    except Exception:
+                        self._logger.exception(f"Extending the visibility of job {message.id} failed")
+
+        thread = threading.Thread(target=beat, name="job-queue-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+
+class SqsJobQueue(JobQueue):
+
+    def __init__(self, queue_url: str = None, visibility_timeout: int = None, retry_delay: int = None):
+        self._sqs_client = boto3.client("sqs")
+        self.queue_url = queue_url or settings.PID_PROCESSING_QUEUE_URL
+        self.visibility_timeout = visibility_timeout or JOB_QUEUE_VISIBILITY_TIMEOUT
+        self.retry_delay = retry_delay or JOB_QUEUE_RETRY_DELAY
+
+    def send_messages(self, messages: List[dict]) -> List[int]:
+        return send_message_batch(self._sqs_client, self.queue_url, messages)
+
+    def receive_messages(self, max_messages: int = 1) -> List[QueueMessage]:
+        params = dict(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=min(max_messages, 10),
+            WaitTimeSeconds=20,
+            AttributeNames=["ApproximateReceiveCount"],
+            VisibilityTimeout=self.visibility_timeout,
+        )
+        response = self._sqs_client.receive_message(**params)
+        return [
+            QueueMessage(
+                id=m["MessageId"],
+                body=json.loads(m["Body"]),
+                attempts=int(m.get("Attributes", {}).get("ApproximateReceiveCount", 1)),
+                receipt_handle=m["ReceiptHandle"],
+            )
+            for m in response.get("Messages", [])
+        ]
+
+    def complete(self, message: QueueMessage):
+        self._sqs_client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=message.receipt_handle)
+
+    def fail(self, message: QueueMessage, error: str = None):
+        # Visible again after the retry delay instead of the rest of the visibility
+        # timeout, the redrive policy moves it to the dead-letter queue
+        self._sqs_client.change_message_visibility(
+            QueueUrl=self.queue_url,
+            ReceiptHandle=message.receipt_handle,
+            VisibilityTimeout=self.retry_delay * message.attempts,
+        )
+
+    def extend_visibility(self, message: QueueMessage):
+        self._sqs_client.change_message_visibility(
+            QueueUrl=self.queue_url,
+            ReceiptHandle=message.receipt_handle,
+            VisibilityTimeout=self.visibility_timeout,
+        )
+
+
+class PostgresJobQueue(JobQueue):
+    """
+    Uses the job table as queue. Workers claim QUEUED jobs with
+    SELECT ... FOR UPDATE SKIP LOCKED, which hides them for visibility_timeout
+    seconds. Jobs whose worker died become visible again after the timeout, failed
+    jobs are retried until max_attempts is reached.
+
+    Jobs are handed out round robin over the projects, so a large backfill of one
+    project does not starve the others. A project never has more than
+    max_jobs_per_project jobs in flight. Within a project small documents go first;
+    every aging_seconds a job waits counts as one page less, so large documents are
+    not postponed forever.
+    """
+
+    # Key of the advisory locks of the claims, the second key is the project id. A
+    # project is claimed by one worker at a time, so concurrent workers cannot exceed its
+    # cap, while claims of other projects go ahead
+    CLAIM_LOCK_ID = 7342001
+
+    def __init__(
+        self,
+        visibility_timeout: int = None,
+        max_attempts: int = None,
+        retry_delay: int = None,
+        max_jobs_per_project: int = None,
+        aging_seconds: int = None,
+    ):
+        # Imported here, so using the sqs backend does not require a database engine
+        from ..database.db import Session
+        from models import job as ORMjob
+
+        self._session = Session
+        self._orm = ORMjob
+        self.visibility_timeout = visibility_timeout or JOB_QUEUE_VISIBILITY_TIMEOUT
+        self.max_attempts = max_attempts or int(os.getenv("JOB_QUEUE_MAX_ATTEMPTS", 3))
+        self.retry_delay = retry_delay or JOB_QUEUE_RETRY_DELAY
+        self.max_jobs_per_project = max_jobs_per_project or int(os.getenv("JOB_QUEUE_MAX_JOBS_PER_PROJECT", 8))
+        self.aging_seconds = aging_seconds or int(os.getenv("JOB_QUEUE_AGING_SECONDS", 60))
+
+    def send_messages(self, messages: List[dict]) -> List[int]:
+        ORMjob = self._orm
+        failed = [idx for idx, m in enumerate(messages) if m.get("job_id") is None]
+        now = datetime.now(timezone.utc)
+        rows = [
+            dict(
+                id=m["job_id"],
+                payload=json.loads(to_json(m)),
+                status="QUEUED",
+                attempts=0,
+                visible_at=now,
+            )
+            for m in messages
+            if m.get("job_id") is not None
+        ]
+        if rows:
+            with self._session() as session:
+                # ORM bulk update by primary key
+                session.execute(update(ORMjob), rows)
+                session.commit()
+        return failed
+
+    def claimable(self):
+        ORMjob = self._orm
+        return and_(
+            ORMjob.status.in_(["QUEUED", "PROCESSING"]),
+            ORMjob.visible_at <= func.now(),
+        )
+
+    def lock_projects(self, session) -> List[int]:
+        """
+        Locks the projects with claimable jobs that no other worker is claiming from
+        """
+        ORMjob = self._orm
+        projects = (
+            select(ORMjob.project_id)
+            .where(self.claimable(), func.coalesce(ORMjob.attempts, 0) < self.max_attempts)
+            .group_by(ORMjob.project_id)
+            .subquery()
+        )
+        return session.scalars(
+            select(projects.c.project_id).where(
+                func.pg_try_advisory_xact_lock(self.CLAIM_LOCK_ID, projects.c.project_id)
+            )
+        ).all()
+
+    def scheduled(self, max_messages: int, project_ids: List[int]):
+        """
+        Ids of the next max_messages jobs of project_ids to hand out, locked for update
+        """
+        ORMjob = self._orm
+        in_flight = (
+            select(ORMjob.project_id, func.count().label("in_flight"))
+            .where(ORMjob.status == "PROCESSING", ORMjob.visible_at > func.now())
+            .group_by(ORMjob.project_id)
+            .subquery()
+        )
+        # Unknown page count means the file was never processed, usually a fresh upload
+        # someone is waiting for, so it is treated as small
+        waited = func.extract("epoch", func.now() - func.coalesce(ORMjob.created_at, ORMjob.visible_at))
+        priority = func.coalesce(ORMjob.page_count, 0) - waited / self.aging_seconds
+        # turn n of a project: the project gets its n-th job in round n
+        turn = func.coalesce(in_flight.c.in_flight, 0) + func.row_number().over(
+            partition_by=ORMjob.project_id,
+            order_by=(priority, ORMjob.id),
+        )
+        candidates = (
+            select(ORMjob.id, turn.label("turn"), priority.label("priority"))
+            .outerjoin(in_flight, in_flight.c.project_id == ORMjob.project_id)
+            .where(
+                self.claimable(),
+                func.coalesce(ORMjob.attempts, 0) < self.max_attempts,
+                ORMjob.project_id.in_(project_ids),
+            )
+            .subquery()
+        )
+        return (
+            select(ORMjob.id)
+            .join(candidates, candidates.c.id == ORMjob.id)
+            .where(candidates.c.turn <= self.max_jobs_per_project)
+            .order_by(candidates.c.turn, candidates.c.priority, ORMjob.id)
+            .limit(max_messages)
+            .with_for_update(of=ORMjob, skip_locked=True)
+            .scalar_subquery()
+        )
+
+    def receive_messages(self, max_messages: int = 1) -> List[QueueMessage]:
+        ORMjob = self._orm
+        with self._session() as session:
+            # Jobs that kept timing out are dead-lettered
+            session.execute(
+                update(ORMjob)
+                .where(self.claimable(), func.coalesce(ORMjob.attempts, 0) >= self.max_attempts)
+                .values(
+                    status="FAILED",
+                    error_message="Visibility timeout expired too many times",
+                    visible_at=None,
+                )
+            )
+
+            # Locked in a statement of its own, the claim below then sees the jobs in flight
+            # committed by the worker that held the lock before
+            project_ids = self.lock_projects(session)
+            if not project_ids:
+                session.commit()
+                return []
+
+            rows = session.execute(
+                update(ORMjob)
+                .where(ORMjob.id.in_(self.scheduled(max_messages, project_ids)))
+                .values(
+                    # Counts towards the in flight jobs of the project right away
+                    status="PROCESSING",
+                    attempts=func.coalesce(ORMjob.attempts, 0) + 1,
+                    visible_at=func.now() + timedelta(seconds=self.visibility_timeout),
+                )
+                .returning(ORMjob.id, ORMjob.payload, ORMjob.attempts)
+            ).all()
+            session.commit()
+
+        return [
+            QueueMessage(id=str(job_id), body=payload, attempts=attempts)
+            for job_id, payload, attempts in rows
+        ]
+
+    def complete(self, message: QueueMessage):
+        ORMjob = self._orm
+        with self._session() as session:
+            session.execute(
+                update(ORMjob)
+                .where(ORMjob.id == int(message.id))
+                .values(visible_at=None)
+            )
+            session.commit()
+
+    def extend_visibility(self, message: QueueMessage):
+        ORMjob = self._orm
+        with self._session() as session:
+            # A job that completed or failed in the meantime stays as it is
+            session.execute(
+                update(ORMjob)
+                .where(ORMjob.id == int(message.id), ORMjob.status == "PROCESSING")
+                .values(visible_at=func.now() + timedelta(seconds=self.visibility_timeout))
+            )
+            session.commit()
+
+    def fail(self, message: QueueMessage, error: str = None):
+        ORMjob = self._orm
+        with self._session() as session:
+            if message.attempts < self.max_attempts:
+                values = dict(
+                    status="QUEUED",
+                    visible_at=func.now() + timedelta(seconds=self.retry_delay * message.attempts),
+                )
+            else:
+                values = dict(status="FAILED", visible_at=None)
+                self._logger.warning(f"Job {message.id} failed {message.attempts} times, giving up")
+            if error is not None:
+                values["error_message"] = error
+            session.execute(update(ORMjob).where(ORMjob.id == int(message.id)).values(**values))
+            session.commit()
+
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Returns the job queue of the configured JOB_QUEUE_BACKEND (sqs or postgres)
+    """
+    global _job_queue
+    if _job_queue is None:
+        if settings.JOB_QUEUE_BACKEND == "postgres":
+            _job_queue = PostgresJobQueue()
+        else:
+            _job_queue = SqsJobQueue()
+    return _job_queue
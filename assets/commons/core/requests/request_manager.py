@@ -1,17 +1,51 @@
 """
 DO NOT EDIT! THIS IS AN AUTOGENERATED FILE!!!!!
 """
+import asyncio
+import functools
 import requests
-import json
 import os
 import logging
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+import orjson
+from requests.adapters import HTTPAdapter
 from retry import retry
 from datetime import datetime, timedelta
-from ..config.Settings import Settings
+from ..config.Settings import settings
 
-API_URL = Settings.API_URL
 logger = logging.getLogger()
 
+# Connections kept open per host, at least the number of chunks in flight
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 16))
+# Chunks of a create_all that are sent concurrently
+CREATE_ALL_MAX_IN_FLIGHT = int(os.getenv("CREATE_ALL_MAX_IN_FLIGHT", 4))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 60))
+
+
+def async_retry(tries=5, delay=1, backoff=2, max_delay=30):
+    """
+    retry for coroutines, with the same arguments
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        async def wrapper(*args, **kwargs):
+            wait = delay
+            for attempt in range(1, tries + 1):
+                try:
+                    return await f(*args, **kwargs)
+                except Exception as e:
+                    if attempt == tries:
+                        raise
+                    logger.warning(f"{e}, retrying in {wait} seconds...")
+                    await asyncio.sleep(wait)
+                    wait = min(wait * backoff, max_delay)
+        return wrapper
+    return decorator
+
 
 class SentoRequest:
 
@@ -25,11 +59,19 @@ class SentoRequest:
 
         self.API_URL = url
 
+        # Keep-alive connections, reused by all calls
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_MAXSIZE, pool_maxsize=HTTP_POOL_MAXSIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # httpx clients of the async calls, one per event loop
+        self.__async_clients = weakref.WeakKeyDictionary()
+
     def build_url(self, path):
         if self.API_URL:
             url = self.API_URL
         else:
-            url = API_URL
+            url = settings.API_URL
         if path[0] == "/":
             url = url + path
         else:
@@ -39,12 +81,12 @@ class SentoRequest:
     def __retrieve_token(self):
         return ""
         if not self.__username:
-            username = Settings.API_USERNAME
+            username = settings.API_USERNAME
         else:
             username = self.__username
 
         if not self.__password:
-            password = Settings.API_PASSWORD
+            password = settings.API_PASSWORD
         else:
             password = self.__password
 
@@ -131,16 +173,18 @@ class SentoRequest:
 
     @retry(tries=5, backoff=2, delay=1, max_delay=30, logger=logger)
     def get(self, path, allow_none=False, allowed_status_codes=None):
-        result = requests.get(
+        result = self.session.get(
             url=self.build_url(path),
+            timeout=HTTP_TIMEOUT,
             headers=self.__get_headers()
         )
         return self.unwrap_result(result, allow_none=allow_none, allowed_status_codes=allowed_status_codes)
 
     @retry(tries=5, backoff=2, delay=1, max_delay=30, logger=logger)
     def post(self, path, data, allow_none=False, allowed_status_codes=None):
-        result = requests.post(
+        result = self.session.post(
             url=self.build_url(path),
+            timeout=HTTP_TIMEOUT,
             headers=self.__get_headers(),
             data=self.to_json(data)
         )
@@ -148,8 +192,9 @@ class SentoRequest:
 
     @retry(tries=5, backoff=2, delay=1, max_delay=30, logger=logger)
     def put(self, path, data, allow_none=False, allowed_status_codes=None):
-        result = requests.put(
+        result = self.session.put(
             url=self.build_url(path),
+            timeout=HTTP_TIMEOUT,
             headers=self.__get_headers(),
             data=self.to_json(data)
         )
@@ -157,24 +202,107 @@ class SentoRequest:
 
     @retry(tries=5, backoff=2, delay=1, max_delay=30, logger=logger)
     def delete(self, path, allow_none=True, allowed_status_codes=None):
-        result = requests.delete(
+        result = self.session.delete(
+            url=self.build_url(path),
+            timeout=HTTP_TIMEOUT,
+            headers=self.__get_headers()
+        )
+        return self.unwrap_result(result, allow_none=allow_none, allowed_status_codes=allowed_status_codes)
+
+    def post_chunks(self, path, chunks: Iterable[list], max_in_flight=None) -> list:
+        """
+        Posts the chunks with at most max_in_flight requests at the same time and returns
+        the concatenated results, in the order of the chunks
+        """
+        max_in_flight = max_in_flight or CREATE_ALL_MAX_IN_FLIGHT
+        results = []
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            in_flight = deque()
+            for chunk in chunks:
+                if len(in_flight) >= max_in_flight:
+                    results.extend(in_flight.popleft().result())
+                in_flight.append(executor.submit(self.post, path=path, data=chunk))
+            while in_flight:
+                results.extend(in_flight.popleft().result())
+        return results
+
+    @property
+    def async_client(self):
+        """
+        httpx client of the running event loop. httpx is only needed for the async calls.
+        """
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        client = self.__async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=HTTP_TIMEOUT,
+                limits=httpx.Limits(max_connections=HTTP_POOL_MAXSIZE, max_keepalive_connections=HTTP_POOL_MAXSIZE),
+            )
+            self.__async_clients[loop] = client
+        return client
+
+    @async_retry(tries=5, backoff=2, delay=1, max_delay=30)
+    async def async_get(self, path, allow_none=False, allowed_status_codes=None):
+        result = await self.async_client.get(
             url=self.build_url(path),
             headers=self.__get_headers()
         )
         return self.unwrap_result(result, allow_none=allow_none, allowed_status_codes=allowed_status_codes)
 
+    @async_retry(tries=5, backoff=2, delay=1, max_delay=30)
+    async def async_post(self, path, data, allow_none=False, allowed_status_codes=None):
+        result = await self.async_client.post(
+            url=self.build_url(path),
+            headers=self.__get_headers(),
+            content=self.to_json(data)
+        )
+        return self.unwrap_result(result, allow_none=allow_none, allowed_status_codes=allowed_status_codes)
+
+    @async_retry(tries=5, backoff=2, delay=1, max_delay=30)
+    async def async_put(self, path, data, allow_none=False, allowed_status_codes=None):
+        result = await self.async_client.put(
+            url=self.build_url(path),
+            headers=self.__get_headers(),
+            content=self.to_json(data)
+        )
+        return self.unwrap_result(result, allow_none=allow_none, allowed_status_codes=allowed_status_codes)
+
+    @async_retry(tries=5, backoff=2, delay=1, max_delay=30)
+    async def async_delete(self, path, allow_none=True, allowed_status_codes=None):
+        result = await self.async_client.delete(
+            url=self.build_url(path),
+            headers=self.__get_headers()
+        )
+        return self.unwrap_result(result, allow_none=allow_none, allowed_status_codes=allowed_status_codes)
+
+    async def async_post_chunks(self, path, chunks: Iterable[list], max_in_flight=None) -> list:
+        """
+        post_chunks on the event loop
+        """
+        semaphore = asyncio.Semaphore(max_in_flight or CREATE_ALL_MAX_IN_FLIGHT)
+
+        async def post(chunk):
+            async with semaphore:
+                return await self.async_post(path=path, data=chunk)
+
+        results = []
+        for chunk_results in await asyncio.gather(*(post(chunk) for chunk in chunks)):
+            results.extend(chunk_results)
+        return results
+
     def to_json(self, data):
         if type(data) == list:
             new_data = [self.__clean_data(item) for item in data]
         else:
             new_data = self.__clean_data(data)
 
-        json_data = json.dumps(
+        return orjson.dumps(
             new_data,
-            sort_keys=True,
-            default=str
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
         )
-        return json_data
 
     def __clean_data(self, data):
         new_data = {}
@@ -12,8 +12,6 @@ from contextlib import nullcontext
 from datetime import datetime, timezone
 from typing import Dict, List, Self, Any
 
-import numpy as np
-import pandas as pd
 from utils.logger import makeCustomLogger, logging_tqdm
 from sqlalchemy.schema import Column
 from sqlalchemy.sql import (
@@ -36,6 +34,7 @@ from core.data.SentoBase import SentoBaseData, split, request_manager
 from core.database.db import Session as indexingSession
 from utils.async_db import indexingAsyncSession
 from utils.enums import *
+from utils.filters import FilterBuilder
 from models import equipment_list_item as ORMequipment_list_item
 
 
@@ -47,6 +46,7 @@ class equipment_list_item(SentoBaseData):
         "column_id": {"condition": "==", "column": "column_id"},
         "field": {"condition": "==", "column": "field"},
     }
+    _get_all_filters = FilterBuilder(ORMequipment_list_item, _get_all_filter_meta)
     _fields: list[str] = [
         "id",
         "equipment_list_id",
@@ -170,16 +170,7 @@ class equipment_list_item(SentoBaseData):
     @classmethod
     def get_all(cls, limit=None, db=None, **kwargs):
         try:
-            filters = []
-            for k, v in kwargs.items():
-                filter_meta = cls._get_all_filter_meta.get(k, {})
-                if v is not None:
-                    if filter_meta.get("condition", "==") == "in":
-                        v_split = v.split(",")
-                        filter = f"ORMequipment_list_item.{filter_meta.get('column', '==')}.in_(v_split)"
-                    else:
-                        filter = f"ORMequipment_list_item.{filter_meta.get('column', '==')} {filter_meta.get('condition', '==')} v"
-                    filters.append(eval(filter))
+            filters = cls._get_all_filters(kwargs)
             with indexingSession() if db is None else nullcontext(db) as db:
                 # items = db.query(ORMequipment_list_item).filter(
                 #     *(getattr(ORMequipment_list_item, k) == v for k, v in kwargs.items())
@@ -195,16 +186,7 @@ class equipment_list_item(SentoBaseData):
     @classmethod
     async def async_get_all(cls, limit=None, adb=None, **kwargs):
         try:
-            filters = []
-            for k, v in kwargs.items():
-                filter_meta = cls._get_all_filter_meta.get(k, {})
-                if v is not None:
-                    if filter_meta.get("condition", "==") == "in":
-                        v_split = v.split(",")
-                        filter = f"ORMequipment_list_item.{filter_meta.get('column', '==')}.in_(v_split)"
-                    else:
-                        filter = f"ORMequipment_list_item.{filter_meta.get('column', '==')} {filter_meta.get('condition', '==')} v"
-                    filters.append(eval(filter))
+            filters = cls._get_all_filters(kwargs)
             async with (
                 indexingAsyncSession() if adb is None else nullcontext(adb)
             ) as adb:
@@ -563,31 +545,34 @@ class equipment_list_item(SentoBaseData):
         )
         return res
 
+    @staticmethod
+    def _to_create_chunk(chunk, fk_column=None, fk_id=None):
+        chunk_items = [item.to_create_dict() for item in chunk]
+        if fk_id is not None:
+            for item in chunk_items:
+                item[fk_column] = fk_id
+        return chunk_items
+
     @classmethod
     def create_all(cls, items, fk_column=None, fk_id=None):
         path = f"/equipment/all"
         all_data = []
         try:
-            for chunk in logging_tqdm(
-                iterable=split(items, 100),
-                desc="saving to equipment_list_item",
-                mininterval=10,
-                total=1 + (len(items) - 1) // 100,
-                leave=False,
-                logger=cls._logger,
-            ):
-                chunk_items = [item.to_create_dict() for item in chunk]
-                if fk_id is not None:
-
-                    def set_fk_id(item, column, id):
-                        item[column] = id
-                        return item
-
-                    chunk_items = [
-                        set_fk_id(item, fk_column, fk_id) for item in chunk_items
-                    ]
-                chunk_data = request_manager.post(path=path, data=chunk_items)
-                all_data = all_data + chunk_data
+            # Chunks are sent concurrently, with a bounded number of requests in flight
+            all_data = request_manager.post_chunks(
+                path=path,
+                chunks=(
+                    cls._to_create_chunk(chunk, fk_column, fk_id)
+                    for chunk in logging_tqdm(
+                        iterable=split(items, 100),
+                        desc="saving to equipment_list_item",
+                        mininterval=10,
+                        total=1 + (len(items) - 1) // 100,
+                        leave=False,
+                        logger=cls._logger,
+                    )
+                ),
+            )
 
             for idx, (saved_item, item) in logging_tqdm(
                 enumerate(zip(all_data, items)),
@@ -605,6 +590,18 @@ class equipment_list_item(SentoBaseData):
             raise e
         return all_data
 
+    @classmethod
+    async def async_create_all(cls, items, fk_column=None, fk_id=None):
+        path = f"/equipment/all"
+        try:
+            return await request_manager.async_post_chunks(
+                path=path,
+                chunks=[cls._to_create_chunk(chunk, fk_column, fk_id) for chunk in split(items, 100)],
+            )
+        except Exception as e:
+            cls._logger.exception(f"Error creating all ({cls.__name__})")
+            raise e
+
     def delete(self, db=None):
         if not self.__id:
             self.__set_id()
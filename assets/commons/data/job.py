@@ -12,8 +12,6 @@ from contextlib import nullcontext
 from datetime import datetime, timezone
 from typing import Dict, List, Self, Any
 
-import numpy as np
-import pandas as pd
 from utils.logger import makeCustomLogger, logging_tqdm
 from sqlalchemy.schema import Column
 from sqlalchemy.sql import (
@@ -36,14 +34,17 @@ from core.data.SentoBase import SentoBaseData, split, request_manager
 from core.database.db import Session as indexingSession
 from utils.async_db import indexingAsyncSession
 from utils.enums import *
+from utils.filters import FilterBuilder
 from models import job as ORMjob
 
 
 class job(SentoBaseData):
     _logger = makeCustomLogger("job")
     _get_all_filter_meta: dict[str, dict] = {
-        "project_id": {"condition": "==", "column": "project_id"}
+        "project_id": {"condition": "==", "column": "project_id"},
+        "batch_id": {"condition": "==", "column": "batch_id"},
     }
+    _get_all_filters = FilterBuilder(ORMjob, _get_all_filter_meta)
     _fields: list[str] = [
         "id",
         "name",
@@ -54,28 +55,67 @@ class job(SentoBaseData):
         "created_at",
         "completed_at",
         "error_message",
+        "batch_id",
+        "parent_job_id",
+        "payload",
+        "attempts",
+        "visible_at",
+        "page_count",
+        "started_at",
+        "queue_wait_seconds",
+        "s3_fetch_seconds",
+        "pdf_open_seconds",
+        "processing_seconds",
+        "persist_seconds",
+        "token_count",
     ]
     _primary_keys: list[str] = ["id"]
     _unique_fields: list[str] = []
     _non_unique_fields: list[str] = [
+        "attempts",
+        "batch_id",
         "completed_at",
         "created_at",
         "error_message",
         "file_id",
         "name",
+        "page_count",
+        "parent_job_id",
+        "payload",
+        "pdf_open_seconds",
+        "persist_seconds",
+        "processing_seconds",
         "project_id",
+        "queue_wait_seconds",
+        "s3_fetch_seconds",
+        "started_at",
         "status",
+        "token_count",
         "type",
+        "visible_at",
     ]
     # Only use set when ordering is not important. (Is important for bulk insert)
     _nullable_fields: set[str] = set(
         {
+            "attempts",
+            "batch_id",
             "completed_at",
             "created_at",
             "error_message",
             "file_id",
             "id",
+            "page_count",
+            "parent_job_id",
+            "payload",
+            "pdf_open_seconds",
+            "persist_seconds",
+            "processing_seconds",
             "project_id",
+            "queue_wait_seconds",
+            "s3_fetch_seconds",
+            "started_at",
+            "token_count",
+            "visible_at",
         }
     )
     _orm: type[ORMjob] = ORMjob
@@ -91,6 +131,19 @@ class job(SentoBaseData):
         created_at: datetime = None,
         completed_at: datetime = None,
         error_message: str = None,
+        batch_id: str = None,
+        parent_job_id: int = None,
+        payload: dict = None,
+        attempts: int = None,
+        visible_at: datetime = None,
+        page_count: int = None,
+        started_at: datetime = None,
+        queue_wait_seconds: float = None,
+        s3_fetch_seconds: float = None,
+        pdf_open_seconds: float = None,
+        processing_seconds: float = None,
+        persist_seconds: float = None,
+        token_count: int = None,
         *args,
         **kwargs,
     ):
@@ -132,6 +185,58 @@ class job(SentoBaseData):
             self.__error_message = None
         else:
             self.error_message = error_message
+        if batch_id is None:
+            self.__batch_id = None
+        else:
+            self.batch_id = batch_id
+        if parent_job_id is None:
+            self.__parent_job_id = None
+        else:
+            self.parent_job_id = parent_job_id
+        if payload is None:
+            self.__payload = None
+        else:
+            self.payload = payload
+        if attempts is None:
+            self.__attempts = None
+        else:
+            self.attempts = attempts
+        if visible_at is None:
+            self.__visible_at = None
+        else:
+            self.visible_at = visible_at
+        if page_count is None:
+            self.__page_count = None
+        else:
+            self.page_count = page_count
+        if started_at is None:
+            self.__started_at = None
+        else:
+            self.started_at = started_at
+        if queue_wait_seconds is None:
+            self.__queue_wait_seconds = None
+        else:
+            self.queue_wait_seconds = queue_wait_seconds
+        if s3_fetch_seconds is None:
+            self.__s3_fetch_seconds = None
+        else:
+            self.s3_fetch_seconds = s3_fetch_seconds
+        if pdf_open_seconds is None:
+            self.__pdf_open_seconds = None
+        else:
+            self.pdf_open_seconds = pdf_open_seconds
+        if processing_seconds is None:
+            self.__processing_seconds = None
+        else:
+            self.processing_seconds = processing_seconds
+        if persist_seconds is None:
+            self.__persist_seconds = None
+        else:
+            self.persist_seconds = persist_seconds
+        if token_count is None:
+            self.__token_count = None
+        else:
+            self.token_count = token_count
 
     @property
     def id(self):
@@ -195,10 +300,13 @@ class job(SentoBaseData):
 
     @created_at.setter
     def created_at(self, new_created_at):
+        if new_created_at is None:
+            self.__created_at = None
+            return
         if not hasattr(self, "__created_at") or new_created_at is not None:
             if isinstance(new_created_at, str):
                 new_created_at = datetime.fromisoformat(new_created_at)
-            elif isinstance(new_created_at, pd.Timestamp):
+            elif hasattr(new_created_at, "to_pydatetime"):
                 new_created_at = new_created_at.to_pydatetime()
             if new_created_at.tzinfo is None:
                 new_created_at = new_created_at.replace(tzinfo=timezone.utc)
@@ -210,10 +318,13 @@ class job(SentoBaseData):
 
     @completed_at.setter
     def completed_at(self, new_completed_at):
+        if new_completed_at is None:
+            self.__completed_at = None
+            return
         if not hasattr(self, "__completed_at") or new_completed_at is not None:
             if isinstance(new_completed_at, str):
                 new_completed_at = datetime.fromisoformat(new_completed_at)
-            elif isinstance(new_completed_at, pd.Timestamp):
+            elif hasattr(new_completed_at, "to_pydatetime"):
                 new_completed_at = new_completed_at.to_pydatetime()
             if new_completed_at.tzinfo is None:
                 new_completed_at = new_completed_at.replace(tzinfo=timezone.utc)
@@ -228,21 +339,145 @@ class job(SentoBaseData):
         if not hasattr(self, "__error_message") or new_error_message is not None:
             self.__error_message = new_error_message
 
+    @property
+    def batch_id(self):
+        return self.__batch_id
+
+    @batch_id.setter
+    def batch_id(self, new_batch_id):
+        if not hasattr(self, "__batch_id") or new_batch_id is not None:
+            self.__batch_id = new_batch_id
+
+    @property
+    def parent_job_id(self):
+        return self.__parent_job_id
+
+    @parent_job_id.setter
+    def parent_job_id(self, new_parent_job_id):
+        if not hasattr(self, "__parent_job_id") or new_parent_job_id is not None:
+            self.__parent_job_id = int(new_parent_job_id) if new_parent_job_id is not None else None
+
+    @property
+    def payload(self):
+        return self.__payload
+
+    @payload.setter
+    def payload(self, new_payload):
+        if not hasattr(self, "__payload") or new_payload is not None:
+            self.__payload = new_payload
+
+    @property
+    def attempts(self):
+        return self.__attempts
+
+    @attempts.setter
+    def attempts(self, new_attempts):
+        if not hasattr(self, "__attempts") or new_attempts is not None:
+            self.__attempts = int(new_attempts) if new_attempts is not None else None
+
+    @property
+    def visible_at(self):
+        return self.__visible_at
+
+    @visible_at.setter
+    def visible_at(self, new_visible_at):
+        if new_visible_at is None:
+            self.__visible_at = None
+            return
+        if not hasattr(self, "__visible_at") or new_visible_at is not None:
+            if isinstance(new_visible_at, str):
+                new_visible_at = datetime.fromisoformat(new_visible_at)
+            elif hasattr(new_visible_at, "to_pydatetime"):
+                new_visible_at = new_visible_at.to_pydatetime()
+            if new_visible_at.tzinfo is None:
+                new_visible_at = new_visible_at.replace(tzinfo=timezone.utc)
+            self.__visible_at = new_visible_at
+
+    @property
+    def page_count(self):
+        return self.__page_count
+
+    @page_count.setter
+    def page_count(self, new_page_count):
+        if not hasattr(self, "__page_count") or new_page_count is not None:
+            self.__page_count = int(new_page_count) if new_page_count is not None else None
+
+    @property
+    def started_at(self):
+        return self.__started_at
+
+    @started_at.setter
+    def started_at(self, new_started_at):
+        if new_started_at is None:
+            self.__started_at = None
+            return
+        if not hasattr(self, "__started_at") or new_started_at is not None:
+            if isinstance(new_started_at, str):
+                new_started_at = datetime.fromisoformat(new_started_at)
+            elif hasattr(new_started_at, "to_pydatetime"):
+                new_started_at = new_started_at.to_pydatetime()
+            if new_started_at.tzinfo is None:
+                new_started_at = new_started_at.replace(tzinfo=timezone.utc)
+            self.__started_at = new_started_at
+
+    @property
+    def queue_wait_seconds(self):
+        return self.__queue_wait_seconds
+
+    @queue_wait_seconds.setter
+    def queue_wait_seconds(self, new_queue_wait_seconds):
+        if not hasattr(self, "__queue_wait_seconds") or new_queue_wait_seconds is not None:
+            self.__queue_wait_seconds = float(new_queue_wait_seconds) if new_queue_wait_seconds is not None else None
+
+    @property
+    def s3_fetch_seconds(self):
+        return self.__s3_fetch_seconds
+
+    @s3_fetch_seconds.setter
+    def s3_fetch_seconds(self, new_s3_fetch_seconds):
+        if not hasattr(self, "__s3_fetch_seconds") or new_s3_fetch_seconds is not None:
+            self.__s3_fetch_seconds = float(new_s3_fetch_seconds) if new_s3_fetch_seconds is not None else None
+
+    @property
+    def pdf_open_seconds(self):
+        return self.__pdf_open_seconds
+
+    @pdf_open_seconds.setter
+    def pdf_open_seconds(self, new_pdf_open_seconds):
+        if not hasattr(self, "__pdf_open_seconds") or new_pdf_open_seconds is not None:
+            self.__pdf_open_seconds = float(new_pdf_open_seconds) if new_pdf_open_seconds is not None else None
+
+    @property
+    def processing_seconds(self):
+        return self.__processing_seconds
+
+    @processing_seconds.setter
+    def processing_seconds(self, new_processing_seconds):
+        if not hasattr(self, "__processing_seconds") or new_processing_seconds is not None:
+            self.__processing_seconds = float(new_processing_seconds) if new_processing_seconds is not None else None
+
+    @property
+    def persist_seconds(self):
+        return self.__persist_seconds
+
+    @persist_seconds.setter
+    def persist_seconds(self, new_persist_seconds):
+        if not hasattr(self, "__persist_seconds") or new_persist_seconds is not None:
+            self.__persist_seconds = float(new_persist_seconds) if new_persist_seconds is not None else None
+
+    @property
+    def token_count(self):
+        return self.__token_count
+
+    @token_count.setter
+    def token_count(self, new_token_count):
+        if not hasattr(self, "__token_count") or new_token_count is not None:
+            self.__token_count = int(new_token_count) if new_token_count is not None else None
+
     @classmethod
     def get_all(cls, limit=None, db=None, **kwargs):
         try:
-            filters = []
-            for k, v in kwargs.items():
-                filter_meta = cls._get_all_filter_meta.get(k, {})
-                if v is not None:
-                    if filter_meta.get("condition", "==") == "in":
-                        v_split = v.split(",")
-                        filter = (
-                            f"ORMjob.{filter_meta.get('column', '==')}.in_(v_split)"
-                        )
-                    else:
-                        filter = f"ORMjob.{filter_meta.get('column', '==')} {filter_meta.get('condition', '==')} v"
-                    filters.append(eval(filter))
+            filters = cls._get_all_filters(kwargs)
             with indexingSession() if db is None else nullcontext(db) as db:
                 # items = db.query(ORMjob).filter(
                 #     *(getattr(ORMjob, k) == v for k, v in kwargs.items())
@@ -256,18 +491,7 @@ class job(SentoBaseData):
     @classmethod
     async def async_get_all(cls, limit=None, adb=None, **kwargs):
         try:
-            filters = []
-            for k, v in kwargs.items():
-                filter_meta = cls._get_all_filter_meta.get(k, {})
-                if v is not None:
-                    if filter_meta.get("condition", "==") == "in":
-                        v_split = v.split(",")
-                        filter = (
-                            f"ORMjob.{filter_meta.get('column', '==')}.in_(v_split)"
-                        )
-                    else:
-                        filter = f"ORMjob.{filter_meta.get('column', '==')} {filter_meta.get('condition', '==')} v"
-                    filters.append(eval(filter))
+            filters = cls._get_all_filters(kwargs)
             async with (
                 indexingAsyncSession() if adb is None else nullcontext(adb)
             ) as adb:
@@ -612,31 +836,34 @@ class job(SentoBaseData):
         )
         return res
 
+    @staticmethod
+    def _to_create_chunk(chunk, fk_column=None, fk_id=None):
+        chunk_items = [item.to_create_dict() for item in chunk]
+        if fk_id is not None:
+            for item in chunk_items:
+                item[fk_column] = fk_id
+        return chunk_items
+
     @classmethod
     def create_all(cls, items, fk_column=None, fk_id=None):
         path = f"/job/all"
         all_data = []
         try:
-            for chunk in logging_tqdm(
-                iterable=split(items, 100),
-                desc="saving to job",
-                mininterval=10,
-                total=1 + (len(items) - 1) // 100,
-                leave=False,
-                logger=cls._logger,
-            ):
-                chunk_items = [item.to_create_dict() for item in chunk]
-                if fk_id is not None:
-
-                    def set_fk_id(item, column, id):
-                        item[column] = id
-                        return item
-
-                    chunk_items = [
-                        set_fk_id(item, fk_column, fk_id) for item in chunk_items
-                    ]
-                chunk_data = request_manager.post(path=path, data=chunk_items)
-                all_data = all_data + chunk_data
+            # Chunks are sent concurrently, with a bounded number of requests in flight
+            all_data = request_manager.post_chunks(
+                path=path,
+                chunks=(
+                    cls._to_create_chunk(chunk, fk_column, fk_id)
+                    for chunk in logging_tqdm(
+                        iterable=split(items, 100),
+                        desc="saving to job",
+                        mininterval=10,
+                        total=1 + (len(items) - 1) // 100,
+                        leave=False,
+                        logger=cls._logger,
+                    )
+                ),
+            )
 
             for idx, (saved_item, item) in logging_tqdm(
                 enumerate(zip(all_data, items)),
@@ -654,6 +881,18 @@ class job(SentoBaseData):
             raise e
         return all_data
 
+    @classmethod
+    async def async_create_all(cls, items, fk_column=None, fk_id=None):
+        path = f"/job/all"
+        try:
+            return await request_manager.async_post_chunks(
+                path=path,
+                chunks=[cls._to_create_chunk(chunk, fk_column, fk_id) for chunk in split(items, 100)],
+            )
+        except Exception as e:
+            cls._logger.exception(f"Error creating all ({cls.__name__})")
+            raise e
+
     def delete(self, db=None):
         if not self.__id:
             self.__set_id()
@@ -699,6 +938,19 @@ class job(SentoBaseData):
             created_at=self.__created_at,
             completed_at=self.__completed_at,
             error_message=self.__error_message,
+            batch_id=self.__batch_id,
+            parent_job_id=self.__parent_job_id,
+            payload=self.__payload,
+            attempts=self.__attempts,
+            visible_at=self.__visible_at,
+            page_count=self.__page_count,
+            started_at=self.__started_at,
+            queue_wait_seconds=self.__queue_wait_seconds,
+            s3_fetch_seconds=self.__s3_fetch_seconds,
+            pdf_open_seconds=self.__pdf_open_seconds,
+            processing_seconds=self.__processing_seconds,
+            persist_seconds=self.__persist_seconds,
+            token_count=self.__token_count,
         )
 
     def to_create_dict(self):
@@ -712,6 +964,19 @@ class job(SentoBaseData):
             created_at=self.__created_at,
             completed_at=self.__completed_at,
             error_message=self.__error_message,
+            batch_id=self.__batch_id,
+            parent_job_id=self.__parent_job_id,
+            payload=self.__payload,
+            attempts=self.__attempts,
+            visible_at=self.__visible_at,
+            page_count=self.__page_count,
+            started_at=self.__started_at,
+            queue_wait_seconds=self.__queue_wait_seconds,
+            s3_fetch_seconds=self.__s3_fetch_seconds,
+            pdf_open_seconds=self.__pdf_open_seconds,
+            processing_seconds=self.__processing_seconds,
+            persist_seconds=self.__persist_seconds,
+            token_count=self.__token_count,
             modified_on=datetime.now(),
         )
 
@@ -725,5 +990,18 @@ class job(SentoBaseData):
             created_at=self.__created_at,
             completed_at=self.__completed_at,
             error_message=self.__error_message,
+            batch_id=self.__batch_id,
+            parent_job_id=self.__parent_job_id,
+            payload=self.__payload,
+            attempts=self.__attempts,
+            visible_at=self.__visible_at,
+            page_count=self.__page_count,
+            started_at=self.__started_at,
+            queue_wait_seconds=self.__queue_wait_seconds,
+            s3_fetch_seconds=self.__s3_fetch_seconds,
+            pdf_open_seconds=self.__pdf_open_seconds,
+            processing_seconds=self.__processing_seconds,
+            persist_seconds=self.__persist_seconds,
+            token_count=self.__token_count,
             modified_on=datetime.now(),
         )
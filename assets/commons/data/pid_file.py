@@ -12,8 +12,6 @@ from contextlib import nullcontext
 from datetime import datetime, timezone
 from typing import Dict, List, Self, Any
 
-import numpy as np
-import pandas as pd
 from utils.logger import makeCustomLogger, logging_tqdm
 from sqlalchemy.schema import Column
 from sqlalchemy.sql import (
@@ -36,6 +34,7 @@ from core.data.SentoBase import SentoBaseData, split, request_manager
 from core.database.db import Session as indexingSession
 from utils.async_db import indexingAsyncSession
 from utils.enums import *
+from utils.filters import FilterBuilder
 from models import pid_file as ORMpid_file
 
 
@@ -45,6 +44,7 @@ class pid_file(SentoBaseData):
         "file_uuid": {"condition": "==", "column": "file_uuid"},
         "project_id": {"condition": "==", "column": "project_id"},
     }
+    _get_all_filters = FilterBuilder(ORMpid_file, _get_all_filter_meta)
     _fields: list[str] = [
         "id",
         "project_id",
@@ -53,11 +53,13 @@ class pid_file(SentoBaseData):
         "file_uuid",
         "technical_name",
         "s3_key",
+        "page_count",
     ]
     _primary_keys: list[str] = ["id"]
     _unique_fields: list[str] = ["file_uuid"]
     _non_unique_fields: list[str] = [
         "file_name",
+        "page_count",
         "project_id",
         "s3_key",
         "technical_name",
@@ -69,6 +71,7 @@ class pid_file(SentoBaseData):
             "file_name",
             "file_uuid",
             "id",
+            "page_count",
             "project_id",
             "s3_key",
             "technical_name",
@@ -86,6 +89,7 @@ class pid_file(SentoBaseData):
         file_uuid: str = None,
         technical_name: str = None,
         s3_key: str = None,
+        page_count: int = None,
         *args,
         **kwargs,
     ):
@@ -119,6 +123,10 @@ class pid_file(SentoBaseData):
             self.__s3_key = None
         else:
             self.s3_key = s3_key
+        if page_count is None:
+            self.__page_count = None
+        else:
+            self.page_count = page_count
 
     @property
     def id(self):
@@ -185,19 +193,19 @@ class pid_file(SentoBaseData):
         if not hasattr(self, "__s3_key") or new_s3_key is not None:
             self.__s3_key = new_s3_key
 
+    @property
+    def page_count(self):
+        return self.__page_count
+
+    @page_count.setter
+    def page_count(self, new_page_count):
+        if not hasattr(self, "__page_count") or new_page_count is not None:
+            self.__page_count = int(new_page_count) if new_page_count is not None else None
+
     @classmethod
     def get_all(cls, limit=None, db=None, **kwargs):
         try:
-            filters = []
-            for k, v in kwargs.items():
-                filter_meta = cls._get_all_filter_meta.get(k, {})
-                if v is not None:
-                    if filter_meta.get("condition", "==") == "in":
-                        v_split = v.split(",")
-                        filter = f"ORMpid_file.{filter_meta.get('column', '==')}.in_(v_split)"
-                    else:
-                        filter = f"ORMpid_file.{filter_meta.get('column', '==')} {filter_meta.get('condition', '==')} v"
-                    filters.append(eval(filter))
+            filters = cls._get_all_filters(kwargs)
             with indexingSession() if db is None else nullcontext(db) as db:
                 # items = db.query(ORMpid_file).filter(
                 #     *(getattr(ORMpid_file, k) == v for k, v in kwargs.items())
@@ -211,16 +219,7 @@ class pid_file(SentoBaseData):
     @classmethod
     async def async_get_all(cls, limit=None, adb=None, **kwargs):
         try:
-            filters = []
-            for k, v in kwargs.items():
-                filter_meta = cls._get_all_filter_meta.get(k, {})
-                if v is not None:
-                    if filter_meta.get("condition", "==") == "in":
-                        v_split = v.split(",")
-                        filter = f"ORMpid_file.{filter_meta.get('column', '==')}.in_(v_split)"
-                    else:
-                        filter = f"ORMpid_file.{filter_meta.get('column', '==')} {filter_meta.get('condition', '==')} v"
-                    filters.append(eval(filter))
+            filters = cls._get_all_filters(kwargs)
             async with (
                 indexingAsyncSession() if adb is None else nullcontext(adb)
             ) as adb:
@@ -565,31 +564,34 @@ class pid_file(SentoBaseData):
         )
         return res
 
+    @staticmethod
+    def _to_create_chunk(chunk, fk_column=None, fk_id=None):
+        chunk_items = [item.to_create_dict() for item in chunk]
+        if fk_id is not None:
+            for item in chunk_items:
+                item[fk_column] = fk_id
+        return chunk_items
+
     @classmethod
     def create_all(cls, items, fk_column=None, fk_id=None):
         path = f"/pid_file/all"
         all_data = []
         try:
-            for chunk in logging_tqdm(
-                iterable=split(items, 100),
-                desc="saving to pid_file",
-                mininterval=10,
-                total=1 + (len(items) - 1) // 100,
-                leave=False,
-                logger=cls._logger,
-            ):
-                chunk_items = [item.to_create_dict() for item in chunk]
-                if fk_id is not None:
-
-                    def set_fk_id(item, column, id):
-                        item[column] = id
-                        return item
-
-                    chunk_items = [
-                        set_fk_id(item, fk_column, fk_id) for item in chunk_items
-                    ]
-                chunk_data = request_manager.post(path=path, data=chunk_items)
-                all_data = all_data + chunk_data
+            # Chunks are sent concurrently, with a bounded number of requests in flight
+            all_data = request_manager.post_chunks(
+                path=path,
+                chunks=(
+                    cls._to_create_chunk(chunk, fk_column, fk_id)
+                    for chunk in logging_tqdm(
+                        iterable=split(items, 100),
+                        desc="saving to pid_file",
+                        mininterval=10,
+                        total=1 + (len(items) - 1) // 100,
+                        leave=False,
+                        logger=cls._logger,
+                    )
+                ),
+            )
 
             for idx, (saved_item, item) in logging_tqdm(
                 enumerate(zip(all_data, items)),
@@ -607,6 +609,18 @@ class pid_file(SentoBaseData):
             raise e
         return all_data
 
+    @classmethod
+    async def async_create_all(cls, items, fk_column=None, fk_id=None):
+        path = f"/pid_file/all"
+        try:
+            return await request_manager.async_post_chunks(
+                path=path,
+                chunks=[cls._to_create_chunk(chunk, fk_column, fk_id) for chunk in split(items, 100)],
+            )
+        except Exception as e:
+            cls._logger.exception(f"Error creating all ({cls.__name__})")
+            raise e
+
     def delete(self, db=None):
         if not self.__id:
             self.__set_id()
@@ -650,6 +664,7 @@ class pid_file(SentoBaseData):
             file_uuid=self.__file_uuid,
             technical_name=self.__technical_name,
             s3_key=self.__s3_key,
+            page_count=self.__page_count,
         )
 
     def to_create_dict(self):
@@ -661,6 +676,7 @@ class pid_file(SentoBaseData):
             file_uuid=self.__file_uuid,
             technical_name=self.__technical_name,
             s3_key=self.__s3_key,
+            page_count=self.__page_count,
             modified_on=datetime.now(),
         )
 
@@ -671,5 +687,6 @@ class pid_file(SentoBaseData):
             file_name=self.__file_name,
             technical_name=self.__technical_name,
             s3_key=self.__s3_key,
+            page_count=self.__page_count,
             modified_on=datetime.now(),
         )
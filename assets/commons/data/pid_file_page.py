@@ -12,8 +12,6 @@ from contextlib import nullcontext
 from datetime import datetime, timezone
 from typing import Dict, List, Self, Any
 
-import numpy as np
-import pandas as pd
 from utils.logger import makeCustomLogger, logging_tqdm
 from sqlalchemy.schema import Column
 from sqlalchemy.sql import (
@@ -33,9 +31,11 @@ from sqlalchemy.inspection import inspect
 
 
 from core.data.SentoBase import SentoBaseData, split, request_manager
+from core.data.cache import ReadCache
 from core.database.db import Session as indexingSession
 from utils.async_db import indexingAsyncSession
 from utils.enums import *
+from utils.filters import FilterBuilder
 from models import pid_file_page as ORMpid_file_page
 
 
@@ -45,6 +45,7 @@ class pid_file_page(SentoBaseData):
         "pid_file_id": {"condition": "==", "column": "pid_file_id"},
         "page_number": {"condition": "==", "column": "page_number"},
     }
+    _get_all_filters = FilterBuilder(ORMpid_file_page, _get_all_filter_meta)
     _fields: list[str] = [
         "id",
         "pid_file_id",
@@ -68,6 +69,8 @@ class pid_file_page(SentoBaseData):
         }
     )
     _orm: type[ORMpid_file_page] = ORMpid_file_page
+    # from_id and get are cached, see core/data/cache.py
+    _read_cache: ReadCache = ReadCache(ORMpid_file_page, filters=_get_all_filters)
 
     def __init__(
         self,
@@ -182,16 +185,7 @@ class pid_file_page(SentoBaseData):
     @classmethod
     def get_all(cls, limit=None, db=None, **kwargs):
         try:
-            filters = []
-            for k, v in kwargs.items():
-                filter_meta = cls._get_all_filter_meta.get(k, {})
-                if v is not None:
-                    if filter_meta.get("condition", "==") == "in":
-                        v_split = v.split(",")
-                        filter = f"ORMpid_file_page.{filter_meta.get('column', '==')}.in_(v_split)"
-                    else:
-                        filter = f"ORMpid_file_page.{filter_meta.get('column', '==')} {filter_meta.get('condition', '==')} v"
-                    filters.append(eval(filter))
+            filters = cls._get_all_filters(kwargs)
             with indexingSession() if db is None else nullcontext(db) as db:
                 # items = db.query(ORMpid_file_page).filter(
                 #     *(getattr(ORMpid_file_page, k) == v for k, v in kwargs.items())
@@ -205,16 +199,7 @@ class pid_file_page(SentoBaseData):
     @classmethod
     async def async_get_all(cls, limit=None, adb=None, **kwargs):
         try:
-            filters = []
-            for k, v in kwargs.items():
-                filter_meta = cls._get_all_filter_meta.get(k, {})
-                if v is not None:
-                    if filter_meta.get("condition", "==") == "in":
-                        v_split = v.split(",")
-                        filter = f"ORMpid_file_page.{filter_meta.get('column', '==')}.in_(v_split)"
-                    else:
-                        filter = f"ORMpid_file_page.{filter_meta.get('column', '==')} {filter_meta.get('condition', '==')} v"
-                    filters.append(eval(filter))
+            filters = cls._get_all_filters(kwargs)
             async with (
                 indexingAsyncSession() if adb is None else nullcontext(adb)
             ) as adb:
@@ -230,24 +215,34 @@ class pid_file_page(SentoBaseData):
 
     @classmethod
     def get(cls, **kwargs):
+        key = cls._read_cache.query_key(kwargs)
+        cached, version = cls._read_cache.lookup(key)
+        if cached is not None:
+            return cached
         data = cls.get_all(**kwargs)
         if len(data) > 0:
             if len(data) > 1:
                 cls._logger.warning(
                     "More than one result found, only returning the first.."
                 )
+            cls._read_cache.put(key, data[0], version)
             return data[0]
         else:
             return None
 
     @classmethod
     async def async_get(cls, **kwargs):
+        key = cls._read_cache.query_key(kwargs)
+        cached, version = await cls._read_cache.async_lookup(key)
+        if cached is not None:
+            return cached
         data = await cls.async_get_all(**kwargs)
         if len(data) > 0:
             if len(data) > 1:
                 cls._logger.warning(
                     "More than one result found, only returning the first.."
                 )
+            cls._read_cache.put(key, data[0], version)
             return data[0]
         else:
             return None
@@ -262,11 +257,18 @@ class pid_file_page(SentoBaseData):
 
     @classmethod
     def from_id(cls, id: int, db=None):
+        # Not cached within the session of the caller, it sees its own pending changes
+        key = ("id", id) if db is None else None
+        cached = cls._read_cache.get(key)
+        if cached is not None:
+            return cached
         try:
             with indexingSession() if db is None else nullcontext(db) as db:
                 data = db.get(ORMpid_file_page, id)
             if data:
-                return cls.from_orm(data)
+                item = cls.from_orm(data)
+                cls._read_cache.put(key, item)
+                return item
             else:
                 return None
         except Exception as e:
@@ -275,13 +277,19 @@ class pid_file_page(SentoBaseData):
 
     @classmethod
     async def async_from_id(cls, id: int, adb=None):
+        key = ("id", id) if adb is None else None
+        cached = cls._read_cache.get(key)
+        if cached is not None:
+            return cached
         try:
             async with (
                 indexingAsyncSession() if adb is None else nullcontext(adb)
             ) as adb:
                 data = await adb.get(ORMpid_file_page, id)
             if data:
-                return cls.from_orm(data)
+                item = cls.from_orm(data)
+                cls._read_cache.put(key, item)
+                return item
             else:
                 return None
         except Exception as e:
@@ -563,31 +571,35 @@ class pid_file_page(SentoBaseData):
         )
         return res
 
+    @staticmethod
+    def _to_create_chunk(chunk, fk_column=None, fk_id=None):
+        chunk_items = [item.to_create_dict() for item in chunk]
+        if fk_id is not None:
+            for item in chunk_items:
+                item[fk_column] = fk_id
+        return chunk_items
+
     @classmethod
     def create_all(cls, items, fk_column=None, fk_id=None):
         path = f"/pid_file_page/all"
         all_data = []
+        cls._read_cache.clear()
         try:
-            for chunk in logging_tqdm(
-                iterable=split(items, 100),
-                desc="saving to pid_file_page",
-                mininterval=10,
-                total=1 + (len(items) - 1) // 100,
-                leave=False,
-                logger=cls._logger,
-            ):
-                chunk_items = [item.to_create_dict() for item in chunk]
-                if fk_id is not None:
-
-                    def set_fk_id(item, column, id):
-                        item[column] = id
-                        return item
-
-                    chunk_items = [
-                        set_fk_id(item, fk_column, fk_id) for item in chunk_items
-                    ]
-                chunk_data = request_manager.post(path=path, data=chunk_items)
-                all_data = all_data + chunk_data
+            # Chunks are sent concurrently, with a bounded number of requests in flight
+            all_data = request_manager.post_chunks(
+                path=path,
+                chunks=(
+                    cls._to_create_chunk(chunk, fk_column, fk_id)
+                    for chunk in logging_tqdm(
+                        iterable=split(items, 100),
+                        desc="saving to pid_file_page",
+                        mininterval=10,
+                        total=1 + (len(items) - 1) // 100,
+                        leave=False,
+                        logger=cls._logger,
+                    )
+                ),
+            )
 
             for idx, (saved_item, item) in logging_tqdm(
                 enumerate(zip(all_data, items)),
@@ -605,6 +617,19 @@ class pid_file_page(SentoBaseData):
             raise e
         return all_data
 
+    @classmethod
+    async def async_create_all(cls, items, fk_column=None, fk_id=None):
+        path = f"/pid_file_page/all"
+        cls._read_cache.clear()
+        try:
+            return await request_manager.async_post_chunks(
+                path=path,
+                chunks=[cls._to_create_chunk(chunk, fk_column, fk_id) for chunk in split(items, 100)],
+            )
+        except Exception as e:
+            cls._logger.exception(f"Error creating all ({cls.__name__})")
+            raise e
+
     def delete(self, db=None):
         if not self.__id:
             self.__set_id()
@@ -38,6 +38,8 @@ class equipment_list(Base):
     file_name: Mapped[str] = mapped_column(String, nullable=False)
     type: Mapped[str] = mapped_column(String, nullable=False)
     s3_key: Mapped[str] = mapped_column(String, nullable=True)
+    # Set once the file is in S3, repeated /complete calls are no-ops
+    uploaded_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
     modified_on: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
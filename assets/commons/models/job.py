@@ -36,7 +36,6 @@ class job(Base):
         Integer,
         ForeignKey("project.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
     file_id: Mapped[int] = mapped_column(Integer, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -44,9 +43,37 @@ class job(Base):
         DateTime(timezone=True), nullable=True
     )
     error_message: Mapped[str] = mapped_column(String, nullable=True)
+    batch_id: Mapped[str] = mapped_column(String, nullable=True, index=True)
+    parent_job_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("job.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
+    )
+    # Message of the postgres job queue backend (see core/queue), page jobs also keep their
+    # page range in it
+    payload: Mapped[dict] = mapped_column(JSONB(none_as_null=True), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=True, server_default=text("0"))
+    visible_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Used by the scheduler to favour small documents
+    page_count: Mapped[int] = mapped_column(Integer, nullable=True)
+    # Timing breakdown of the last run, set by the processing worker
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    queue_wait_seconds: Mapped[float] = mapped_column(Float, nullable=True)
+    s3_fetch_seconds: Mapped[float] = mapped_column(Float, nullable=True)
+    pdf_open_seconds: Mapped[float] = mapped_column(Float, nullable=True)
+    processing_seconds: Mapped[float] = mapped_column(Float, nullable=True)
+    persist_seconds: Mapped[float] = mapped_column(Float, nullable=True)
+    token_count: Mapped[int] = mapped_column(Integer, nullable=True)
     modified_on: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
+    __table_args__ = (
+        Index("job_queue_ix", "status", "visible_at"),
+        Index("job_completed_at_ix", "completed_at"),
+        # Keyset pagination over (project_id, id), also serves the project_id lookups
+        Index("job_project_id_id_ix", "project_id", "id"),
+    )
 
 
 # Probably want to implement a trigger dealing with this at the DB level instead.
@@ -40,6 +40,9 @@ class pid_file(Base):
     file_uuid: Mapped[str] = mapped_column(String, nullable=True)
     technical_name: Mapped[str] = mapped_column(String, nullable=True)
     s3_key: Mapped[str] = mapped_column(String, nullable=True)
+    page_count: Mapped[int] = mapped_column(Integer, nullable=True)
+    # Set once the file is in S3, repeated /complete calls are no-ops
+    uploaded_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
     modified_on: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
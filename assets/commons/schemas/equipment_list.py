@@ -15,6 +15,7 @@ class equipment_list(BaseModel):
      file_name: str
      type: str
      s3_key: Optional[str]
+     uploaded_at: Optional[datetime] = None
      modified_on: Optional[datetime]
      class Config:
         from_attributes = True
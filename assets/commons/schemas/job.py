@@ -19,6 +19,19 @@ class job(BaseModel):
      created_at: Optional[datetime]
      completed_at: Optional[datetime]
      error_message: Optional[str]
+     batch_id: Optional[str] = None
+     parent_job_id: Optional[int] = None
+     payload: Optional[dict] = None
+     attempts: Optional[int] = None
+     visible_at: Optional[datetime] = None
+     page_count: Optional[int] = None
+     started_at: Optional[datetime] = None
+     queue_wait_seconds: Optional[float] = None
+     s3_fetch_seconds: Optional[float] = None
+     pdf_open_seconds: Optional[float] = None
+     processing_seconds: Optional[float] = None
+     persist_seconds: Optional[float] = None
+     token_count: Optional[int] = None
      modified_on: Optional[datetime]
      class Config:
         from_attributes = True
@@ -33,6 +46,16 @@ class jobCreate(BaseModel):
     created_at: Optional[datetime]
     completed_at: Optional[datetime]
     error_message: Optional[str]
+    batch_id: Optional[str] = None
+    parent_job_id: Optional[int] = None
+    page_count: Optional[int] = None
+    started_at: Optional[datetime] = None
+    queue_wait_seconds: Optional[float] = None
+    s3_fetch_seconds: Optional[float] = None
+    pdf_open_seconds: Optional[float] = None
+    processing_seconds: Optional[float] = None
+    persist_seconds: Optional[float] = None
+    token_count: Optional[int] = None
     class Config:
         from_attributes = True
 
@@ -45,6 +68,16 @@ class jobUpdate(BaseModel):
     created_at: Optional[datetime]
     completed_at: Optional[datetime]
     error_message: Optional[str]
+    batch_id: Optional[str] = None
+    parent_job_id: Optional[int] = None
+    page_count: Optional[int] = None
+    started_at: Optional[datetime] = None
+    queue_wait_seconds: Optional[float] = None
+    s3_fetch_seconds: Optional[float] = None
+    pdf_open_seconds: Optional[float] = None
+    processing_seconds: Optional[float] = None
+    persist_seconds: Optional[float] = None
+    token_count: Optional[int] = None
     class Config:
         from_attributes = True
 
@@ -59,5 +92,15 @@ class jobUpsert(BaseModel):
     created_at: Optional[datetime]
     completed_at: Optional[datetime]
     error_message: Optional[str]
+    batch_id: Optional[str] = None
+    parent_job_id: Optional[int] = None
+    page_count: Optional[int] = None
+    started_at: Optional[datetime] = None
+    queue_wait_seconds: Optional[float] = None
+    s3_fetch_seconds: Optional[float] = None
+    pdf_open_seconds: Optional[float] = None
+    processing_seconds: Optional[float] = None
+    persist_seconds: Optional[float] = None
+    token_count: Optional[int] = None
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -17,6 +17,8 @@ class pid_file(BaseModel):
      file_uuid: Optional[str]
      technical_name: Optional[str]
      s3_key: Optional[str]
+     page_count: Optional[int] = None
+     uploaded_at: Optional[datetime] = None
      modified_on: Optional[datetime]
      class Config:
         from_attributes = True
@@ -29,6 +31,7 @@ class pid_fileCreate(BaseModel):
     file_uuid: Optional[str]
     technical_name: Optional[str]
     s3_key: Optional[str]
+    page_count: Optional[int] = None
     class Config:
         from_attributes = True
 
@@ -38,6 +41,7 @@ class pid_fileUpdate(BaseModel):
     file_name: Optional[str]
     technical_name: Optional[str]
     s3_key: Optional[str]
+    page_count: Optional[int] = None
     class Config:
         from_attributes = True
 
@@ -50,5 +54,6 @@ class pid_fileUpsert(BaseModel):
     file_uuid: Optional[str]
     technical_name: Optional[str]
     s3_key: Optional[str]
+    page_count: Optional[int] = None
     class Config:
         from_attributes = True
\ No newline at end of file
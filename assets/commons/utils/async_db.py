@@ -6,7 +6,7 @@ import orjson
 from contextlib import asynccontextmanager
 from typing import Literal
 
-from .db_args import connection_string, engine_args
+from .db_args import connection_string, engine_args, pool_profile
 from .logger import makeCustomLogger
 from sqlalchemy import AsyncAdaptedQueuePool, inspect, text
 from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
@@ -29,7 +29,7 @@ def orjson_serializer(obj):
     # return orjson.dumps(obj).decode()
 
 
-from core.config.Settings import settings
+from core.config.Settings import settings, use_settings_credentials
 
 indexingAsyncSession = async_sessionmaker(autoflush=False, expire_on_commit=False)
 
@@ -82,25 +82,24 @@ async def use_async_engine(
 ) -> AsyncEngine:
     global indexingAsyncSession
     args = engine_args(driver=driver, async_=True, **kwargs)
+    if pool_warmer and pool_profile() != "server":
+        # Keeping connections warm needs a long lived process with a pool
+        _logger.info(f"Pool warmer disabled for the {pool_profile()} pool profile.")
+        pool_warmer = False
     if pool_warmer:
         assert (
             args.get("pool_use_lifo") is not True
         ), "Pool warmer requires FIFO queue, set pool_use_lifo=False"
-    asyncEngine = create_async_engine(
-        connection_string(settings.DATABASE_HOST, db="indexing", driver=driver),
-        **args,
-    )
+    # Host and credentials are read from the settings when the first connection is made
+    asyncEngine = create_async_engine(f"postgresql+{driver}://", **args)
+    use_settings_credentials(asyncEngine.sync_engine, driver=driver)
     replica_args = args.copy()
     if "execution_options" not in replica_args:
         replica_args["execution_options"] = {}
     replica_args["execution_options"]["postgresql_readonly"] = True
-    replicaAsyncEngine = create_async_engine(
-        connection_string(settings.DATABASE_REPLICA_HOST, db="indexing", driver=driver),
-        **replica_args,
-    )
-    _logger.info(
-        f"Created async engine (write: {asyncEngine.url.host}, read: {replicaAsyncEngine.url.host}). {asyncEngine.pool.status()}"
-    )
+    replicaAsyncEngine = create_async_engine(f"postgresql+{driver}://", **replica_args)
+    use_settings_credentials(replicaAsyncEngine.sync_engine, driver=driver, replica=True)
+    _logger.info(f"Created async engines. {asyncEngine.pool.status()}")
     if global_sessionmaker is True or global_sessionmaker == "overwrite":
         if indexingAsyncSession.kw.get("bind") and global_sessionmaker != "overwrite":
             raise ValueError("Global sessionmaker already bound to an engine.")
@@ -145,6 +144,14 @@ async def get_async_db():
         yield db
 
 
+async def get_async_read_db():
+    """
+    Session on the read replica, for routes that only read
+    """
+    async with readOnlyIndexingAsyncSession() as db:
+        yield db
+
+
 
 async def analyze_all(driver="psycopg_async"):
     ## Useful after blue/green deployment
@@ -157,7 +164,7 @@ async def analyze_all(driver="psycopg_async"):
     args = engine_args(driver=driver, async_=True, isolation_level="AUTOCOMMIT")
     print(args)
     engine = create_async_engine(
-        connection_string(settings.DATABASE_HOST_REPLICA, db="indexing", driver=driver),
+        connection_string(settings.DATABASE_REPLICA_HOST, db=settings.POSTGRES_DB, driver=driver),
         **args,
     )
     try:
@@ -3,6 +3,7 @@ from typing import Protocol
 from collections import deque
 
 import orjson
+from sqlalchemy.pool import NullPool
 
 from enum import Enum
 from types import GeneratorType
@@ -77,7 +78,68 @@ def asyncpg_connect_args(appname: str) -> dict:
     }
 
 
-def default_engine_args(connections_multiplier: float | None = None):
+# Pooling strategy of the engines by deployment profile (DB_POOL_PROFILE):
+#   server     long lived process, pool of 10 * CONCURRENCY_MULTIPLIER connections
+#   lambda     small pool (DB_POOL_SIZE, default 1) kept across warm invocations. Connections
+#              are checked before use, the container may have been frozen for a long time
+#   nullpool   no pool, a connection per checkout
+#   pgbouncer  connects through PgBouncer in transaction mode: PgBouncer pools, so no pool in
+#              the process, and no server side prepared statements
+# Defaults to lambda on Lambda and to server elsewhere.
+POOL_PROFILES = ("server", "lambda", "nullpool", "pgbouncer")
+
+
+def pool_profile() -> str:
+    profile = os.getenv("DB_POOL_PROFILE")
+    if not profile:
+        profile = "lambda" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "server"
+    if profile not in POOL_PROFILES:
+        raise ValueError(f"Unknown DB_POOL_PROFILE {profile!r}, expected one of {', '.join(POOL_PROFILES)}")
+    return profile
+
+
+def pool_args(profile: str, effective_multiplier: float) -> dict:
+    if profile in ("nullpool", "pgbouncer"):
+        return {"poolclass": NullPool}
+    if profile == "lambda":
+        return {
+            "pool_pre_ping": True,
+            # Below the idle timeouts of RDS and the NAT, a stale connection is replaced
+            # before it is used
+            "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 300)),
+            "pool_use_lifo": True,
+            "pool_size": int(os.getenv("DB_POOL_SIZE", 1)),
+            "pool_timeout": 10,
+            # Overflow connections are closed when returned, they do not stay idle
+            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 2)),
+        }
+    return {
+        "pool_pre_ping": False,
+        "pool_recycle": 3600,
+        "pool_use_lifo": True,
+        "pool_size": int(10 * effective_multiplier),
+        "pool_timeout": 60,
+        "max_overflow": 0,  # No overflow (creating connections isn't free)
+    }
+
+
+def profile_connect_args(profile: str, driver: str) -> dict:
+    args = {}
+    if profile != "server":
+        # Fail fast and reconnect instead of hanging a short invocation
+        args["connect_timeout" if "psycopg" in driver else "timeout"] = int(os.getenv("DB_CONNECT_TIMEOUT", 5))
+    if profile == "pgbouncer":
+        # Prepared statements live on a server connection, PgBouncer hands out another
+        # one for the next transaction. psycopg2 does not prepare statements.
+        if driver in ("psycopg", "psycopg_async"):
+            args["prepare_threshold"] = None
+        elif driver == "asyncpg":
+            args["statement_cache_size"] = 0
+            args["prepared_statement_cache_size"] = 0
+    return args
+
+
+def default_engine_args(connections_multiplier: float | None = None, profile: str | None = None):
     if connections_multiplier is None:
         connections_multiplier = 1
     effective_multiplier = (
@@ -86,12 +148,7 @@ def default_engine_args(connections_multiplier: float | None = None):
     return {
         "json_serializer": orjson_serializer,
         "json_deserializer": orjson.loads,
-        "pool_pre_ping": False,
-        "pool_recycle": 3600,
-        "pool_use_lifo": True,
-        "pool_size": 10 * effective_multiplier,
-        "pool_timeout": 60,
-        "max_overflow": 0,  # No overflow (creating connections isn't free)
+        **pool_args(profile or pool_profile(), effective_multiplier),
     }
 
 
@@ -103,19 +160,21 @@ def engine_args(
     appname=None,
     **kwargs,
 ) -> dict:
+    profile = pool_profile()
     if appname is None:
         appname = default_application_name
         if async_:
             appname = "async-" + appname
     if connect_args is None:
         connect_args = {}
+    connect_args = {**profile_connect_args(profile, driver), **connect_args}
     if "psycopg" in driver:
         connect_args = {**psycopg_connect_args(appname), **connect_args}
     else:
         connect_args = {**asyncpg_connect_args(appname), **connect_args}
 
     return {
-        **default_engine_args(connections_multiplier),
+        **default_engine_args(connections_multiplier, profile),
         "connect_args": connect_args,
         **kwargs,
     }
\ No newline at end of file
@@ -0,0 +1,67 @@
+from typing import Any, Callable, Dict, List, Optional
+
+
+def split_values(value) -> list:
+    return value.split(",") if isinstance(value, str) else list(value)
+
+
+def range_filter(column, value):
+    """
+    value is "low,high", either bound may be left empty. Both bounds are inclusive.
+    """
+    low, high = (split_values(value) + [None, None])[:2]
+    expressions = []
+    if low not in (None, ""):
+        expressions.append(column >= low)
+    if high not in (None, ""):
+        expressions.append(column <= high)
+    return expressions
+
+
+OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    "==": lambda column, value: column == value,
+    "!=": lambda column, value: column != value,
+    ">": lambda column, value: column > value,
+    ">=": lambda column, value: column >= value,
+    "<": lambda column, value: column < value,
+    "<=": lambda column, value: column <= value,
+    "in": lambda column, value: column.in_(split_values(value)),
+    "range": range_filter,
+    "prefix": lambda column, value: column.startswith(value, autoescape=True),
+}
+
+
+class FilterBuilder:
+    """
+    Compiled get_all_filter_meta ({param: {"condition": ..., "column": ...}}). Called with
+    the filter params of a request, returns the SQLAlchemy expressions of the params that
+    are set. Params without meta filter on equality of the column with the same name.
+    """
+
+    def __init__(self, model, filter_meta: Optional[Dict[str, dict]] = None):
+        self.model = model
+        self._builders: Dict[str, Callable[[Any], Any]] = {}
+        for param, meta in (filter_meta or {}).items():
+            self._builders[param] = self._compile(param, meta.get("condition", "=="), meta.get("column", param))
+
+    def _compile(self, param: str, condition: str, column_name: str) -> Callable[[Any], Any]:
+        if condition not in OPERATORS:
+            raise ValueError(f"Unsupported filter condition {condition!r} for {param}")
+        column = getattr(self.model, column_name)
+        operator = OPERATORS[condition]
+        return lambda value: operator(column, value)
+
+    def __call__(self, params: Dict[str, Any]) -> List[Any]:
+        expressions = []
+        for param, value in params.items():
+            if value is None:
+                continue
+            builder = self._builders.get(param)
+            if builder is None:
+                builder = self._builders[param] = self._compile(param, "==", param)
+            expression = builder(value)
+            if isinstance(expression, list):
+                expressions.extend(expression)
+            else:
+                expressions.append(expression)
+        return expressions
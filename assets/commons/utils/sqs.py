@@ -0,0 +1,43 @@
+import json
+import os
+
+
+def to_json(obj):
+    return json.dumps(
+        obj,
+        sort_keys=True,
+        default=str
+    )
+
+
+def send_message_batch(sqs_client, queue_url, message_bodies):
+    """
+    Sends the messages in batches of 10 (the SQS maximum).
+    Returns the indexes of the messages that could not be queued.
+    """
+    failed = []
+    for start in range(0, len(message_bodies), 10):
+        batch = message_bodies[start:start + 10]
+        response = sqs_client.send_message_batch(
+            QueueUrl=queue_url,
+            Entries=[
+                {"Id": str(start + idx), "MessageBody": to_json(body)}
+                for idx, body in enumerate(batch)
+            ]
+        )
+        failed.extend(int(f["Id"]) for f in response.get("Failed", []))
+    return failed
+
+
+def push_event(sqs_client, event, queue_url=None):
+    """
+    Pushes a callback event (create-record, update-record, ...) on the event queue.
+    Does nothing when no event queue is configured.
+    """
+    queue_url = queue_url or os.getenv("SQS_EVENT_QUEUE_URL")
+    if not queue_url:
+        return
+    try:
+        sqs_client.send_message(QueueUrl=queue_url, MessageBody=to_json(event))
+    except Exception as e:
+        print(e)
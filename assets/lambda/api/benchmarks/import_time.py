@@ -0,0 +1,100 @@
+"""
+Import time of the handler modules of both Lambdas, from `python -X importtime`. This is
+the part of a cold start spent in our code and its dependencies.
+
+For every target the total import time and the slowest packages (summed self time of
+their modules) and modules (cumulative time) are reported. The imports run in a fresh
+interpreter with offline settings, so no AWS calls are made.
+
+Run from the repository root:
+
+    python assets/lambda/api/benchmarks/import_time.py --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+ASSETS = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+# (source directory, handler module)
+TARGETS: Dict[str, Tuple[str, str]] = {
+    "api": (os.path.join(ASSETS, "lambda", "api", "src"), "app"),
+    "worker": (os.path.join(ASSETS, "lambda", "process_pid_pdf", "src"), "index"),
+}
+
+# Settings that would otherwise be fetched from Secrets Manager and SSM on first use
+OFFLINE_ENV = {
+    "AWS_DEFAULT_REGION": "eu-west-1",
+    "POSTGRES_USER": "postgres",
+    "POSTGRES_PASSWORD": "postgres",
+    "POSTGRES_SERVER": "localhost",
+    "API_URL": "http://localhost:8000",
+}
+
+
+@dataclass
+class ImportProfile:
+    target: str
+    total_us: int
+    # (self us, cumulative us, module), in import order
+    modules: List[Tuple[int, int, str]]
+
+    @property
+    def imported(self) -> set:
+        return {name for _, _, name in self.modules}
+
+    def packages(self) -> Counter:
+        times = Counter()
+        for self_us, _, name in self.modules:
+            times[name.split(".")[0]] += self_us
+        return times
+
+
+def profile_import(target: str) -> ImportProfile:
+    source, module = TARGETS[target]
+    env = {**os.environ, **OFFLINE_ENV}
+    env.pop("AWS_LAMBDA_FUNCTION_NAME", None)
+    env["PYTHONPATH"] = os.pathsep.join([source, os.path.join(ASSETS, "commons")])
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=source, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((int(self_us), int(cumulative_us), name.strip()))
+    total_us = next(cumulative_us for _, cumulative_us, name in reversed(modules) if name == module)
+    return ImportProfile(target, total_us, modules)
+
+
+def report(profile: ImportProfile, top: int):
+    print(f"{profile.target}: {profile.total_us / 1000:.0f} ms")
+    print("  slowest packages (self time)")
+    for package, self_us in profile.packages().most_common(top):
+        print(f"    {self_us / 1000:8.1f} ms  {package}")
+    print("  slowest modules (cumulative)")
+    for _, cumulative_us, name in sorted(profile.modules, key=lambda m: -m[1])[1:top + 1]:
+        print(f"    {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", default=",".join(TARGETS))
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    for target in args.targets.split(","):
+        report(profile_import(target), args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,24 @@
+import asyncio
 import os
 import typing
+from contextlib import asynccontextmanager
+
 import orjson
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
 from mangum import Mangum
-from fastapi_sqlalchemy import DBSessionMiddleware
 from starlette.responses import JSONResponse
 from endpoints.api_router import api_router
-from core.config.Settings import settings
+from utils.async_db import use_async_engine
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
 
 ROOT_PATH = os.getenv("ROOT_PATH", "/prod")
+# Responses smaller than this are not worth compressing
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024))
 
 
 class ORJSONResponse(JSONResponse):
@@ -18,23 +28,29 @@ class ORJSONResponse(JSONResponse):
         return orjson.dumps(content)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Binds indexingAsyncSession and readOnlyIndexingAsyncSession of the async routes,
+    # the engines are disposed on shutdown
+    async with use_async_engine(global_sessionmaker="overwrite"):
+        yield
+
+
 app = FastAPI(
     title ="PID FastAPI Application",
     root_path=ROOT_PATH,  # Set the root path for API Gateway
     version="1.0.0",
     redoc_url=None,
     default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
-def orjson_serializer(obj):
-    """
-        Note that `orjson.dumps()` return byte array, while sqlalchemy expects string, thus `decode()` call.
-    """
-    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC).decode()
-
-
-app.add_middleware(DBSessionMiddleware, db_url=settings.DATABASE_URL, engine_args={'json_serializer': orjson_serializer})
 # app.add_middleware(SentryAsgiMiddleware)
+if BrotliMiddleware is not None:
+    # br when the client accepts it, gzip otherwise
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE)
 app.include_router(api_router)
 
 
@@ -42,5 +58,13 @@ app.include_router(api_router)
 def health():
     return "ok"
 
-# Mangum adapter for Lambda
-handler = Mangum(app, api_gateway_base_path=ROOT_PATH)
\ No newline at end of file
+
+# Mangum adapter for Lambda. Mangum would run the lifespan around every invocation,
+# creating and disposing the engines per request. It is entered once per container
+# instead, on the loop Mangum runs the invocations on, so warm invocations reuse the
+# connections of the pool.
+handler = Mangum(app, api_gateway_base_path=ROOT_PATH, lifespan="off")
+if os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(app.router.lifespan_context(app).__aenter__())
\ No newline at end of file
@@ -3,14 +3,14 @@ DO NOT EDIT! THIS IS AN AUTOGENERATED FILE!!!!!
 """
 import io
 import uuid
-from typing import Optional
+from typing import Optional, Dict
 
-import s3fs
 from fastapi import UploadFile, File, Depends, HTTPException
-import pandas as pd
+from pydantic import BaseModel
 from utils.enums import *
 from core.api.sento_router import SentoRouter
 from core.database.db import get_db
+from utils.async_db import get_async_db, get_async_read_db
 from schemas.equipment_list import equipment_list as Schemaequipment_list
 from schemas.equipment_list import equipment_listCreate as Schemaequipment_listCreate
 from schemas.equipment_list import equipment_listUpdate as Schemaequipment_listUpdate
@@ -18,6 +18,7 @@ from schemas.equipment_list import equipment_listUpsert as Schemaequipment_listU
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.declarative import DeclarativeMeta as Model
 from core.api import _utils
+from core.config import settings
 
 from data.equipment_list_item import equipment_list_item as data_equipment_list_item
 
@@ -25,6 +26,8 @@ from datetime import datetime
 
 from models.equipment_list import equipment_list as Modelequipment_list
 
+EXCEL_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
 def get_all_filter_function(project_id:Optional[int]=None):
 	return {"project_id":project_id}
 
@@ -35,6 +38,8 @@ get_all_filter_meta = {'project_id': {'condition': '==', 'column': 'project_id'}
 model_router = SentoRouter(
                     schema=Schemaequipment_list,
                     db = get_db,
+                    async_db = get_async_db,
+                    async_read_db = get_async_read_db,
                     prefix="equipment",
                     db_model=Modelequipment_list,
                     create_schema = Schemaequipment_listCreate,
@@ -49,16 +54,47 @@ model_router = SentoRouter(
                     unique_fields=[]
                 )
 
+
+class UploadTarget(BaseModel):
+    url: str
+    fields: Dict[str, str]
+    equipment_list: Schemaequipment_list
+
+
+def import_equipment_list_items(db: Session, equipment_list_id: int, contents: bytes):
+    # Imported here, pandas and openpyxl are only needed for equipment list uploads
+    import pandas as pd
+
+    df = pd.read_excel(io.BytesIO(contents), engine="openpyxl")
+
+    df_reset = df.reset_index()
+
+    for row_idx, row in df_reset.iterrows():
+        for col_idx, col_name in enumerate(df.columns):
+            cell_item = data_equipment_list_item(
+                equipment_list_id=equipment_list_id,
+                row_id = row_idx +1,
+                column_id= col_idx +1,
+                field = col_name,
+                value= str(row[col_name])
+            )
+            cell_item.save(db)
+
+    db.commit()
+
+
 @model_router.post("/upload")
 async def upload(project_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
     file_name = file.filename
-    bucket_name = "643553455790-eu-west-1-files"
+    bucket_name = settings.S3_BUCKET
     file_uuid = str(uuid.uuid4())
 
     print(file.content_type)
 
     s3_key = f"uploads/project_id={project_id}/equipment_lists/{file_uuid}/{file_name}"
 
+    import s3fs
+
     fs = s3fs.S3FileSystem(anon=False)
 
     try:
@@ -77,6 +113,7 @@ async def upload(project_id: int, file: UploadFile = File(...), db: Session = De
         type = file.content_type,
         #file_uuid=file_uuid,
         s3_key=s3_key,
+        uploaded_at=_utils.get_modified_on(),
         modified_on=_utils.get_modified_on()
     )
     db.add(db_model)
@@ -85,22 +122,62 @@ async def upload(project_id: int, file: UploadFile = File(...), db: Session = De
 
     await file.seek(0)
     contents = await file.read()
-    df = pd.read_excel(io.BytesIO(contents), engine="openpyxl")
+    import_equipment_list_items(db, db_model.id, contents)
 
-    df_reset = df.reset_index()
+    return db_model
 
-    for row_idx, row in df_reset.iterrows():
-        for col_idx, col_name in enumerate(df.columns):
-            cell_item = data_equipment_list_item(
-                equipment_list_id=db_model.id,
-                row_id = row_idx +1,
-                column_id= col_idx +1,
-                field = col_name,
-                value= str(row[col_name])
-            )
-            cell_item.save(db)
 
+@model_router.post("/upload_url", response_model=UploadTarget)
+def upload_url(project_id: int, file_name: str, content_type: str = EXCEL_CONTENT_TYPE, db: Session = Depends(get_db)):
+    """
+    Registers the equipment list and returns a presigned POST so the client uploads straight
+    to S3. Call /equipment/{id}/complete once the upload finished to import the items.
+    """
+    file_uuid = str(uuid.uuid4())
+    s3_key = f"uploads/project_id={project_id}/equipment_lists/{file_uuid}/{file_name}"
+
+    db_model: Model = Modelequipment_list(
+        project_id=project_id,
+        file_name=file_name,
+        type=content_type,
+        s3_key=s3_key,
+        modified_on=_utils.get_modified_on()
+    )
+    db.add(db_model)
     db.commit()
+    db.refresh(db_model)
+
+    try:
+        presigned_post = _utils.create_presigned_post(_utils.get_s3_client(), settings.S3_BUCKET, s3_key, content_type)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Creating upload url failed: {str(e)}")
+
+    return {"url": presigned_post["url"], "fields": presigned_post["fields"], "equipment_list": db_model}
+
+
+@model_router.post("/{id}/complete", response_model=Schemaequipment_list)
+def complete_upload(id: int, db: Session = Depends(get_db)):
+    """
+    Imports the items of the uploaded equipment list, repeating the call does not import them again
+    """
+    # Locked so concurrent retries wait for the first import
+    db_model = db.get(Modelequipment_list, id, with_for_update=True)
+    if not db_model:
+        raise HTTPException(status_code=404, detail="Equipment list not found")
+    if db_model.uploaded_at is not None:
+        db.commit()
+        return db_model
+
+    try:
+        response = _utils.get_s3_client().get_object(Bucket=settings.S3_BUCKET, Key=db_model.s3_key)
+    except _utils.get_s3_client().exceptions.NoSuchKey:
+        raise HTTPException(status_code=409, detail="Equipment list has not been uploaded yet")
+
+    # Equipment lists are small spreadsheets, reading them in memory is fine
+    contents = response["Body"].read()
+    # Committed together with the items
+    db_model.uploaded_at = _utils.get_modified_on()
+    import_equipment_list_items(db, db_model.id, contents)
 
     return db_model
 
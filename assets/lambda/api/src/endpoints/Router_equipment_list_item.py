@@ -6,6 +6,7 @@ from typing import Optional
 from utils.enums import *
 from core.api.sento_router import SentoRouter
 from core.database.db import get_db
+from utils.async_db import get_async_db, get_async_read_db
 from schemas.equipment_list_item import equipment_list_item as Schemaequipment_list_item
 from schemas.equipment_list_item import equipment_list_itemCreate as Schemaequipment_list_itemCreate
 from schemas.equipment_list_item import equipment_list_itemUpdate as Schemaequipment_list_itemUpdate
@@ -25,6 +26,8 @@ get_all_filter_meta = {'equipment_list_id': {'condition': '==', 'column': 'equip
 model_router = SentoRouter(
                     schema=Schemaequipment_list_item,
                     db = get_db,
+                    async_db = get_async_db,
+                    async_read_db = get_async_read_db,
                     prefix="equipment",
                     db_model=Modelequipment_list_item,
                     create_schema = Schemaequipment_list_itemCreate,
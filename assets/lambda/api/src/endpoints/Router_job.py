@@ -2,29 +2,40 @@
 DO NOT EDIT! THIS IS AN AUTOGENERATED FILE!!!!!
 """
 
-from typing import Optional
+from typing import Optional, Dict, List
+from fastapi import Depends, HTTPException
+from pydantic import BaseModel
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from utils.enums import *
 from core.api.sento_router import SentoRouter
+from core.api import _utils
 from core.database.db import get_db
+from utils.async_db import get_async_db
+from core.database.notifications import listen, listen_supported, JOB_STATUS_CHANNEL
 from schemas.job import job as Schemajob
 from schemas.job import jobCreate as SchemajobCreate
 from schemas.job import jobUpdate as SchemajobUpdate
 from schemas.job import jobUpsert as SchemajobUpsert
 
-from datetime import datetime
+import time
+from datetime import datetime, timedelta, timezone
 
 from models.job import job as Modeljob
 
-def get_all_filter_function(project_id:Optional[int]=None):
-	return {"project_id":project_id}
+def get_all_filter_function(project_id:Optional[int]=None,batch_id:Optional[str]=None):
+	return {"project_id":project_id,"batch_id":batch_id}
 
 
-get_all_filter_meta = {'project_id': {'condition': '==', 'column': 'project_id'}}
+get_all_filter_meta = {'project_id': {'condition': '==', 'column': 'project_id'}, 'batch_id': {'condition': '==', 'column': 'batch_id'}}
 
 
 model_router = SentoRouter(
                     schema=Schemajob,
                     db = get_db,
+                    # Job status is read right after it changes, replica lag would show stale states
+                    async_db = get_async_db,
                     prefix="job",
                     db_model=Modeljob,
                     create_schema = SchemajobCreate,
@@ -33,8 +44,302 @@ model_router = SentoRouter(
                     get_all_filter_function= get_all_filter_function,
                     get_all_filter_meta = get_all_filter_meta,
                     create_one_callback=False,
-                    update_one_callback=False,
+                    update_one_callback=True,
                     delete_one_callback=False,
                     delete_all_callback=False,
                     unique_fields=[]
-                )
\ No newline at end of file
+                )
+
+
+class BatchProgress(BaseModel):
+    batch_id: str
+    total: int
+    status_counts: Dict[str, int]
+
+
+@model_router.get("/batch/{batch_id}", response_model=BatchProgress)
+def batch_progress(batch_id: str, db: Session = Depends(get_db)):
+    rows = db.execute(
+        select(Modeljob.status, func.count())
+        .where(Modeljob.batch_id == batch_id)
+        .group_by(Modeljob.status)
+    ).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    status_counts = {status: count for status, count in rows}
+    return {"batch_id": batch_id, "total": sum(status_counts.values()), "status_counts": status_counts}
+
+
+
+class ProjectQueueMetrics(BaseModel):
+    project_id: Optional[int]
+    queued: int
+    processing: int
+    oldest_wait_seconds: Optional[float]
+    p50_wait_seconds: Optional[float]
+    p95_wait_seconds: Optional[float]
+
+
+@model_router.get("/queue/metrics", response_model=List[ProjectQueueMetrics])
+def queue_metrics(project_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """
+    Queue depth and wait time of the queued jobs per project
+    """
+    wait = func.extract("epoch", func.now() - Modeljob.created_at)
+    queued = Modeljob.status == "QUEUED"
+    stmt = (
+        select(
+            Modeljob.project_id,
+            func.count().filter(queued).label("queued"),
+            func.count().filter(Modeljob.status == "PROCESSING").label("processing"),
+            func.max(wait).filter(queued).label("oldest_wait_seconds"),
+            func.percentile_cont(0.5).within_group(wait).filter(queued).label("p50_wait_seconds"),
+            func.percentile_cont(0.95).within_group(wait).filter(queued).label("p95_wait_seconds"),
+        )
+        .where(Modeljob.status.in_(["QUEUED", "PROCESSING"]))
+        .group_by(Modeljob.project_id)
+        .order_by(Modeljob.project_id)
+    )
+    if project_id is not None:
+        stmt = stmt.where(Modeljob.project_id == project_id)
+
+    return [row._asdict() for row in db.execute(stmt).all()]
+
+
+TIMING_COLUMNS = [
+    "queue_wait_seconds",
+    "s3_fetch_seconds",
+    "pdf_open_seconds",
+    "processing_seconds",
+    "persist_seconds",
+]
+PERCENTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+
+
+class TimingPercentiles(BaseModel):
+    p50: Optional[float]
+    p95: Optional[float]
+    p99: Optional[float]
+
+
+class JobTimingSummary(BaseModel):
+    since: datetime
+    until: datetime
+    jobs: int
+    pages: int
+    tokens: int
+    # Pages completed per second of the window, over all workers
+    pages_per_second: float
+    # Pages per second spent processing, i.e. the speed of a single worker
+    pages_per_processing_second: Optional[float]
+    timings: Dict[str, TimingPercentiles]
+
+
+@model_router.get("/timings/summary", response_model=JobTimingSummary)
+def timing_summary(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    project_id: Optional[int] = None,
+    type: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Timing percentiles and throughput of the jobs completed between since and until
+    (the last hour by default)
+    """
+    until = until or datetime.now(timezone.utc)
+    since = since or until - timedelta(hours=1)
+    if until.tzinfo is None:
+        until = until.replace(tzinfo=timezone.utc)
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if since >= until:
+        raise HTTPException(status_code=422, detail="since must be before until")
+
+    columns = {name: getattr(Modeljob, name) for name in TIMING_COLUMNS}
+    columns["total_seconds"] = func.extract("epoch", Modeljob.completed_at - Modeljob.started_at)
+    # Fanned out jobs have no processing time of their own, their pages are counted on the page jobs
+    processed = Modeljob.processing_seconds.is_not(None)
+
+    stmt = select(
+        func.count().label("jobs"),
+        func.coalesce(func.sum(Modeljob.page_count).filter(processed), 0).label("pages"),
+        func.coalesce(func.sum(Modeljob.token_count).filter(processed), 0).label("tokens"),
+        func.sum(Modeljob.processing_seconds).label("processing_seconds"),
+        *[
+            func.percentile_cont(fraction).within_group(column).label(f"{name}_{percentile}")
+            for name, column in columns.items()
+            for percentile, fraction in PERCENTILES.items()
+        ],
+    ).where(
+        Modeljob.status == "COMPLETED",
+        Modeljob.completed_at >= since,
+        Modeljob.completed_at < until,
+    )
+    if project_id is not None:
+        stmt = stmt.where(Modeljob.project_id == project_id)
+    if type is not None:
+        stmt = stmt.where(Modeljob.type == type)
+
+    row = db.execute(stmt).one()._asdict()
+    pages = row["pages"]
+    processing_seconds = row["processing_seconds"]
+    return {
+        "since": since,
+        "until": until,
+        "jobs": row["jobs"],
+        "pages": pages,
+        "tokens": row["tokens"],
+        "pages_per_second": pages / (until - since).total_seconds(),
+        "pages_per_processing_second": pages / processing_seconds if processing_seconds else None,
+        "timings": {
+            name: {percentile: row[f"{name}_{percentile}"] for percentile in PERCENTILES}
+            for name in columns
+        },
+    }
+
+
+# Stays below the API Gateway integration timeout
+LONG_POLL_MAX_SECONDS = 25
+
+
+class JobStatusChange(BaseModel):
+    job: Schemajob
+    changed: bool
+    # Status counts of the page jobs of a fanned out job
+    progress: Optional[Dict[str, int]] = None
+
+
+async def page_job_progress(db: AsyncSession, id: int) -> Dict[str, int]:
+    rows = (await db.execute(
+        select(Modeljob.status, func.count())
+        .where(Modeljob.parent_job_id == id)
+        .group_by(Modeljob.status)
+    )).all()
+    return {status: count for status, count in rows}
+
+
+@model_router.get("/{id}/wait", response_model=JobStatusChange)
+async def wait_for_status_change(
+    id: int,
+    status: Optional[str] = None,
+    progress: bool = False,
+    timeout: int = 20,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Long poll instead of polling GET /job/{id}: returns as soon as the status of the job
+    differs from `status` (its current status when omitted), or after `timeout` seconds
+    with changed=False. With progress, it also returns when one of its page jobs changes
+    status. Needs a direct connection to postgres, not PgBouncer.
+    """
+    if not listen_supported():
+        raise HTTPException(
+            status_code=501, detail="Waiting is not available with the pgbouncer pool profile, poll GET /job/{id}"
+        )
+    job_db = await db.get(Modeljob, id)
+    if not job_db:
+        raise HTTPException(status_code=404, detail="Job not found")
+    status = status or job_db.status
+    deadline = time.monotonic() + min(max(timeout, 0), LONG_POLL_MAX_SECONDS)
+
+    async def read_job():
+        job_db = await db.get(Modeljob, id, populate_existing=True)
+        # Ends the transaction, only the LISTEN connection is held while waiting
+        await db.commit()
+        return job_db
+
+    async with listen(JOB_STATUS_CHANNEL) as wait:
+        # Read again once listening, a change in between would be missed otherwise
+        job_db = await read_job()
+        changed = job_db.status != status
+        while not changed and (remaining := deadline - time.monotonic()) > 0:
+            events = await wait(remaining)
+            if any(e.get("id") == id for e in events):
+                job_db = await read_job()
+                changed = job_db.status != status
+            if progress and any(e.get("parent_job_id") == id for e in events):
+                break
+
+    return {
+        "job": job_db,
+        "changed": changed,
+        "progress": await page_job_progress(db, id) if progress else None,
+    }
+
+
+JOB_STATUS_PAGE_MAX_LIMIT = 5000
+
+
+class JobStatusQuery(BaseModel):
+    ids: Optional[List[int]] = None
+    batch_id: Optional[str] = None
+    project_id: Optional[int] = None
+    status: Optional[str] = None
+    include_page_jobs: bool = False
+    after: Optional[str] = None
+    limit: int = 500
+
+
+class JobStatusRow(BaseModel):
+    id: int
+    project_id: int
+    file_id: Optional[int]
+    parent_job_id: Optional[int]
+    status: str
+    error_message: Optional[str]
+    modified_on: Optional[datetime]
+
+
+class JobStatusPage(BaseModel):
+    rows: List[JobStatusRow]
+    # Pass as `after` to get the next page, None on the last page
+    next_cursor: Optional[str]
+
+
+@model_router.post("/status", response_model=JobStatusPage)
+def job_statuses(query: JobStatusQuery, db: Session = Depends(get_db)):
+    """
+    Compact status rows of the given job ids and/or batch, paginated on (project_id, id)
+    """
+    if query.ids is None and query.batch_id is None and query.project_id is None:
+        raise HTTPException(status_code=422, detail="ids, batch_id or project_id is required")
+    if not 0 < query.limit <= JOB_STATUS_PAGE_MAX_LIMIT:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {JOB_STATUS_PAGE_MAX_LIMIT}")
+
+    key = tuple_(Modeljob.project_id, Modeljob.id)
+    stmt = (
+        select(
+            Modeljob.id,
+            Modeljob.project_id,
+            Modeljob.file_id,
+            Modeljob.parent_job_id,
+            Modeljob.status,
+            Modeljob.error_message,
+            Modeljob.modified_on,
+        )
+        .order_by(Modeljob.project_id, Modeljob.id)
+        .limit(query.limit)
+    )
+    if query.ids is not None:
+        stmt = stmt.where(Modeljob.id.in_(query.ids))
+    if query.batch_id is not None:
+        stmt = stmt.where(Modeljob.batch_id == query.batch_id)
+    if query.project_id is not None:
+        stmt = stmt.where(Modeljob.project_id == query.project_id)
+    if query.status is not None:
+        stmt = stmt.where(Modeljob.status == query.status)
+    if not query.include_page_jobs:
+        stmt = stmt.where(Modeljob.parent_job_id.is_(None))
+    if query.after is not None:
+        after = _utils.decode_cursor(query.after)
+        if len(after) != 2:
+            raise HTTPException(status_code=422, detail="invalid cursor")
+        stmt = stmt.where(key > tuple_(*after))
+
+    rows = [row._asdict() for row in db.execute(stmt).all()]
+    next_cursor = None
+    if len(rows) == query.limit:
+        next_cursor = _utils.encode_cursor([rows[-1]["project_id"], rows[-1]["id"]])
+    return {"rows": rows, "next_cursor": next_cursor}
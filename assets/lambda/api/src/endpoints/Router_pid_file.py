@@ -2,33 +2,39 @@
 DO NOT EDIT! THIS IS AN AUTOGENERATED FILE!!!!!
 """
 import json
+import os
 import uuid
-import s3fs
-from typing import Optional, Text
-import boto3
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+from typing import Optional, Text, Dict, List
 from datetime import datetime
+from botocore.exceptions import BotoCoreError, ClientError
+from sqlalchemy import insert, select, update
 from fastapi import UploadFile, File, Depends, HTTPException
+from pydantic import BaseModel
 
 from utils.enums import *
 from core.api.sento_router import SentoRouter
 from core.database.db import get_db
+from utils.async_db import get_async_db, get_async_read_db
 from core.config import settings
+from core.queue import get_job_queue
 from schemas.pid_file import pid_file as Schemapid_file
 from schemas.pid_file import pid_fileCreate as Schemapid_fileCreate
 from schemas.pid_file import pid_fileUpdate as Schemapid_fileUpdate
 from schemas.pid_file import pid_fileUpsert as Schemapid_fileUpsert
 from schemas.job import jobCreate as Schemajob
+from schemas.job import job as SchemajobRead
 from data.job import job
 from data.pid_file import pid_file
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.declarative import DeclarativeMeta as Model
 
 from models.pid_file import pid_file as Modelpid_file
+from models.job import job as Modeljob
 from core.api import _utils
-
-
-s3_client = boto3.client("s3")
-sqs_client = boto3.client("sqs")
+from endpoints.Router_pid_tag import tag_export_response
 
 
 def get_all_filter_function(file_uuid: str = None, project_id: Optional[int] = None):
@@ -41,6 +47,8 @@ get_all_filter_meta = {'file_uuid': {'condition': '==', 'column': 'file_uuid'},
 model_router = SentoRouter(
     schema=Schemapid_file,
     db=get_db,
+    async_db=get_async_db,
+    async_read_db=get_async_read_db,
     prefix="pid_file",
     db_model=Modelpid_file,
     create_schema=Schemapid_fileCreate,
@@ -56,7 +64,159 @@ model_router = SentoRouter(
     delete_all_route=False,
 )
 
-def create_pid_processing_job(file_id: int ,project_id: int, s3_key: Text):
+class UploadTarget(BaseModel):
+    url: str
+    fields: Dict[str, str]
+    file: Schemapid_file
+
+
+class UploadCompleted(BaseModel):
+    file: Schemapid_file
+    job: Optional[SchemajobRead] = None
+
+
+class ZipUploadTarget(BaseModel):
+    url: str
+    fields: Dict[str, str]
+    s3_key: str
+
+
+class ZipImportResult(BaseModel):
+    file_ids: List[int]
+    job_ids: List[int] = []
+
+
+# Number of files of a zip archive that are uploaded to S3 at the same time
+ZIP_UPLOAD_CONCURRENCY = int(os.getenv("ZIP_UPLOAD_CONCURRENCY", 16))
+
+
+def pid_processing_message(job_id: int, file_id: int, s3_key: Text):
+    return {
+        "action": "process_pid_files",
+        "details": "Process PID files uploaded to S3",
+        "s3_key" : s3_key,
+        "job_id": job_id,
+        "file_id": file_id
+    }
+
+
+def create_pid_processing_jobs(db: Session, files, batch_id: Optional[str] = None) -> List[int]:
+    """
+    Creates the processing jobs of all files with a single insert and queues them
+    on the job queue. Returns the job ids in the order of the files.
+    """
+    if len(files) == 0:
+        return []
+
+    created_at = datetime.now()
+    job_ids = db.scalars(
+        insert(Modeljob).returning(Modeljob.id, sort_by_parameter_order=True),
+        [
+            dict(
+                name="process_pid_file",
+                type="PROCESS_PID_FILE",
+                status="QUEUED",
+                file_id=f.id,
+                project_id=f.project_id,
+                created_at=created_at,
+                batch_id=batch_id,
+                page_count=f.page_count,
+            )
+            for f in files
+        ]
+    ).all()
+    db.commit()
+
+    messages = [pid_processing_message(job_id, f.id, f.s3_key) for job_id, f in zip(job_ids, files)]
+    try:
+        failed = get_job_queue().send_messages(messages)
+    except Exception as e:
+        print(f"Job creation failed: {e}")
+        failed = list(range(len(messages)))
+
+    if failed:
+        db.execute(
+            update(Modeljob)
+            .where(Modeljob.id.in_([job_ids[i] for i in failed]))
+            .values(status="FAILED", error_message="Job could not be queued", modified_on=_utils.get_modified_on())
+        )
+        db.commit()
+        print(f"{len(failed)} of {len(job_ids)} jobs could not be queued")
+
+    return list(job_ids)
+
+
+def import_zip(db: Session, project_id: int, fileobj, process: bool) -> ZipImportResult:
+    """
+    Extracts the PDFs of a zip archive one by one and uploads them to S3 concurrently.
+    All pid_file rows (and jobs) are created in bulk once the uploads are done.
+    """
+    files = []
+    in_flight = set()
+
+    def wait_for_uploads(return_when):
+        nonlocal in_flight
+        done, in_flight = wait(in_flight, return_when=return_when)
+        for upload in done:
+            upload.result()
+
+    try:
+        with zipfile.ZipFile(fileobj) as archive, ThreadPoolExecutor(max_workers=ZIP_UPLOAD_CONCURRENCY) as executor:
+            for info in archive.infolist():
+                file_name = os.path.basename(info.filename)
+                if info.is_dir() or info.filename.startswith("__MACOSX/") or file_name.startswith("."):
+                    continue
+                if not file_name.lower().endswith(".pdf"):
+                    continue
+
+                file_uuid = str(uuid.uuid4())
+                s3_key = f"uploads/project_id={project_id}/pid_files/{file_uuid}/{file_name}"
+
+                # Bound the number of extracted files held in memory
+                if len(in_flight) >= ZIP_UPLOAD_CONCURRENCY:
+                    wait_for_uploads(FIRST_COMPLETED)
+                in_flight.add(
+                    executor.submit(
+                        _utils.get_s3_client().put_object,
+                        Bucket=settings.S3_BUCKET,
+                        Key=s3_key,
+                        Body=archive.read(info),
+                        ContentType="application/pdf"
+                    )
+                )
+                files.append(
+                    pid_file(
+                        project_id=project_id,
+                        file_name=file_name,
+                        file_uuid=file_uuid,
+                        s3_key=s3_key,
+                    )
+                )
+            wait_for_uploads(ALL_COMPLETED)
+    except (zipfile.BadZipFile, RuntimeError, NotImplementedError, zlib.error) as e:
+        # Corrupt, encrypted or unsupported members fail when they are read
+        raise HTTPException(status_code=422, detail=f"Invalid zip archive: {str(e)}")
+    except (BotoCoreError, ClientError) as e:
+        raise HTTPException(status_code=500, detail=f"S3 upload failed: {str(e)}")
+
+    file_ids = pid_file.bulk_upsert(files, db)
+    # All objects are in S3
+    db.execute(
+        update(Modelpid_file)
+        .where(Modelpid_file.id.in_(file_ids))
+        .values(uploaded_at=_utils.get_modified_on())
+    )
+    db.commit()
+    for f, file_id in zip(files, file_ids):
+        f.id = file_id
+    print(f"Imported {len(files)} files from zip archive for project {project_id}")
+
+    job_ids = create_pid_processing_jobs(db, files) if process else []
+
+    return ZipImportResult(file_ids=file_ids, job_ids=job_ids)
+
+
+def create_pid_processing_job(file_id: int ,project_id: int, s3_key: Text, page_count: Optional[int] = None):
 
     job_db = job(
         name = "process_pid_file",
@@ -65,37 +225,29 @@ def create_pid_processing_job(file_id: int ,project_id: int, s3_key: Text):
         file_id = file_id,
         project_id = project_id,
         created_at=datetime.now(),
+        page_count=page_count,
     ).save()
 
 
-    queue_url = settings.PID_PROCESSING_QUEUE_URL
-    message_body = {
-        "action": "process_pid_files",
-        "details": "Process PID files uploaded to S3",
-        "s3_key" : s3_key,
-        "job_id": job_db.id,
-        "file_id": file_id
-    }
+    message_body = pid_processing_message(job_db.id, file_id, s3_key)
 
     try:
-        response = sqs_client.send_message(
-            QueueUrl=queue_url,
-            MessageBody=json.dumps(message_body)
-        )
-
+        failed = get_job_queue().send_messages([message_body])
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"SQS job creation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Job creation failed: {str(e)}")
+    if failed:
+        raise HTTPException(status_code=500, detail="Job creation failed: job could not be queued")
 
     return job_db
 
 
 
 @model_router.post("/upload")
-async def upload(project_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload(project_id: int, page_count: Optional[int] = None, file: UploadFile = File(...), db: Session = Depends(get_db)):
 
 
     file_name = file.filename
-    bucket_name = "643553455790-eu-west-1-files"
+    bucket_name = settings.S3_BUCKET
 
     file_uuid = str(uuid.uuid4())
     print(f"File {file_name} with UUID {file_uuid} received for project {project_id} with file_type {file.content_type} with size {file.size} bytes")
@@ -103,6 +255,8 @@ async def upload(project_id: int, file: UploadFile = File(...), db: Session = De
     s3_key = f"uploads/project_id={project_id}/pid_files/{file_uuid}/{file_name}"
 
 
+    import s3fs
+
     fs = s3fs.S3FileSystem(anon=False)
 
 
@@ -122,6 +276,8 @@ async def upload(project_id: int, file: UploadFile = File(...), db: Session = De
         file_name=file_name,
         file_uuid=file_uuid,
         s3_key=s3_key,
+        page_count=page_count,
+        uploaded_at=_utils.get_modified_on(),
         modified_on=_utils.get_modified_on()
     )
 
@@ -132,8 +288,127 @@ async def upload(project_id: int, file: UploadFile = File(...), db: Session = De
     return db_model
 
 
+@model_router.post("/upload_url", response_model=UploadTarget)
+def upload_url(
+    project_id: int,
+    file_name: str,
+    content_type: str = "application/pdf",
+    page_count: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Registers the file and returns a presigned POST so the client uploads straight to S3.
+    Call /pid_file/{id}/complete once the upload finished. The page count, if the client
+    knows it, lets the queue schedule small documents first before the file is processed.
+    """
+    file_uuid = str(uuid.uuid4())
+    s3_key = f"uploads/project_id={project_id}/pid_files/{file_uuid}/{file_name}"
+
+    db_model: Model = Modelpid_file(
+        project_id=project_id,
+        file_name=file_name,
+        file_uuid=file_uuid,
+        s3_key=s3_key,
+        page_count=page_count,
+        modified_on=_utils.get_modified_on()
+    )
+    db.add(db_model)
+    db.commit()
+    db.refresh(db_model)
+
+    try:
+        presigned_post = _utils.create_presigned_post(_utils.get_s3_client(), settings.S3_BUCKET, s3_key, content_type)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Creating upload url failed: {str(e)}")
+
+    return {"url": presigned_post["url"], "fields": presigned_post["fields"], "file": db_model}
+
+
+@model_router.post("/{id}/complete", response_model=UploadCompleted)
+def complete_upload(id: int, process: bool = False, page_count: Optional[int] = None, db: Session = Depends(get_db)):
+    """
+    Marks the file as uploaded and optionally queues it for processing.
+    Repeating the call returns the file and the job queued by the first call.
+    """
+    # Locked so concurrent retries wait for the first call instead of queueing a second job
+    db_model = db.get(Modelpid_file, id, with_for_update=True)
+    if not db_model:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    if db_model.uploaded_at is None:
+        try:
+            _utils.get_s3_client().head_object(Bucket=settings.S3_BUCKET, Key=db_model.s3_key)
+        except _utils.get_s3_client().exceptions.ClientError:
+            raise HTTPException(status_code=409, detail="File has not been uploaded yet")
+        db_model.uploaded_at = _utils.get_modified_on()
+    # A count stored by the worker is kept
+    if page_count and db_model.page_count is None:
+        db_model.page_count = page_count
+
+    job_db = db.scalars(
+        select(Modeljob)
+        .where(Modeljob.file_id == db_model.id, Modeljob.parent_job_id.is_(None))
+        .order_by(Modeljob.id.desc())
+        .limit(1)
+    ).first()
+    if process and job_db is None:
+        # Commits the uploaded_at together with the job
+        job_ids = create_pid_processing_jobs(db, [db_model])
+        job_db = db.get(Modeljob, job_ids[0])
+    else:
+        db.commit()
+
+    return {"file": db_model, "job": job_db}
+
+
+@model_router.post("/upload_zip", response_model=ZipImportResult)
+def upload_zip(project_id: int, process: bool = True, file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """
+    Imports all PDFs of a zip archive and optionally queues them for processing.
+    For archives larger than the API payload limit, use /pid_file/zip_upload_url and /pid_file/import_zip.
+    """
+    file.file.seek(0)
+    return import_zip(db, project_id, file.file, process)
+
+
+def archive_prefix(project_id: int) -> str:
+    # Archives of a project, /pid_file/import_zip only imports keys under it
+    return f"uploads/project_id={project_id}/archives/"
+
+
+@model_router.post("/zip_upload_url", response_model=ZipUploadTarget)
+def zip_upload_url(project_id: int, file_name: str):
+    s3_key = f"{archive_prefix(project_id)}{uuid.uuid4()}/{file_name}"
+    try:
+        presigned_post = _utils.create_presigned_post(_utils.get_s3_client(), settings.S3_BUCKET, s3_key, "application/zip")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Creating upload url failed: {str(e)}")
+
+    return {"url": presigned_post["url"], "fields": presigned_post["fields"], "s3_key": s3_key}
+
+
+@model_router.post("/import_zip", response_model=ZipImportResult)
+def import_zip_from_s3(project_id: int, s3_key: str, process: bool = True, db: Session = Depends(get_db)):
+    """
+    Imports an archive uploaded with /pid_file/zip_upload_url, s3_key must be an archive of the project
+    """
+    if not s3_key.startswith(archive_prefix(project_id)) or ".." in s3_key.split("/"):
+        raise HTTPException(status_code=403, detail="s3_key is not an archive of this project")
+
+    import s3fs
+
+    fs = s3fs.S3FileSystem(anon=False)
+    try:
+        # The file is read with ranged requests, so only the entries being extracted are held in memory
+        f = fs.open(f"{settings.S3_BUCKET}/{s3_key}", "rb")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Archive not found")
+    with f:
+        return import_zip(db, project_id, f, process)
+
+
 @model_router.post("/process")
-def process(file_id: int, db: Session = Depends(get_db)) :
+def process(file_id: int, page_count: Optional[int] = None, db: Session = Depends(get_db)) :
     f = pid_file.from_id(file_id, db)
     if not f:
         raise HTTPException(status_code=404, detail="File not found")
@@ -142,6 +417,19 @@ def process(file_id: int, db: Session = Depends(get_db)) :
     project_id = f.project_id
     s3_key = f.s3_key
 
-    job = create_pid_processing_job(file_id, project_id, s3_key)
+    # The count of the worker, once it opened the file, wins over the one of the client
+    job = create_pid_processing_job(file_id, project_id, s3_key, f.page_count or page_count)
+
+    return job
 
-    return job
\ No newline at end of file
+
+@model_router.get("/{id}/tags")
+def export_tags(id: int, format: str = "ndjson", s3: bool = False, db: Session = Depends(get_db)):
+    """
+    All tags of the file, streamed as NDJSON (format=ndjson) or Arrow IPC stream (format=arrow).
+    Large exports exceed the response limit of API Gateway, with s3=true the export is written
+    to S3 and a presigned url is returned.
+    """
+    if not db.get(Modelpid_file, id):
+        raise HTTPException(status_code=404, detail="File not found")
+    return tag_export_response(format, file_id=id, s3=s3)
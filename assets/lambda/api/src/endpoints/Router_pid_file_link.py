@@ -6,6 +6,7 @@ from typing import Optional
 from utils.enums import *
 from core.api.sento_router import SentoRouter
 from core.database.db import get_db
+from utils.async_db import get_async_db, get_async_read_db
 from schemas.pid_file_link import pid_file_link as Schemapid_file_link
 from schemas.pid_file_link import pid_file_linkCreate as Schemapid_file_linkCreate
 from schemas.pid_file_link import pid_file_linkUpdate as Schemapid_file_linkUpdate
@@ -25,6 +26,8 @@ get_all_filter_meta = {'pid_file_id': {'condition': '==', 'column': 'pid_file_id
 model_router = SentoRouter(
                     schema=Schemapid_file_link,
                     db = get_db,
+                    async_db = get_async_db,
+                    async_read_db = get_async_read_db,
                     prefix="pid_file_link",
                     db_model=Modelpid_file_link,
                     create_schema = Schemapid_file_linkCreate,
@@ -6,6 +6,7 @@ from typing import Optional
 from utils.enums import *
 from core.api.sento_router import SentoRouter
 from core.database.db import get_db
+from utils.async_db import get_async_db, get_async_read_db
 from schemas.pid_file_page import pid_file_page as Schemapid_file_page
 from schemas.pid_file_page import pid_file_pageCreate as Schemapid_file_pageCreate
 from schemas.pid_file_page import pid_file_pageUpdate as Schemapid_file_pageUpdate
@@ -25,6 +26,8 @@ get_all_filter_meta = {'pid_file_id': {'condition': '==', 'column': 'pid_file_id
 model_router = SentoRouter(
                     schema=Schemapid_file_page,
                     db = get_db,
+                    async_db = get_async_db,
+                    async_read_db = get_async_read_db,
                     prefix="pid_file_page",
                     db_model=Modelpid_file_page,
                     create_schema = Schemapid_file_pageCreate,
@@ -36,5 +39,6 @@ model_router = SentoRouter(
                     update_one_callback=False,
                     delete_one_callback=False,
                     delete_all_callback=False,
-                    unique_fields=['pid_file_id', 'page_number']
+                    unique_fields=['pid_file_id', 'page_number'],
+                    etag=True,
                 )
\ No newline at end of file
@@ -2,10 +2,21 @@
 DO NOT EDIT! THIS IS AN AUTOGENERATED FILE!!!!!
 """
 
+import uuid
 from typing import Optional
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import select
 from utils.enums import *
 from core.api.sento_router import SentoRouter
+from core.api.streaming import (
+    stream_partitions, ndjson_stream, arrow_stream, upload_stream, NDJSON_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE,
+)
+from core.api import _utils
+from core.config import settings
 from core.database.db import get_db
+from utils.async_db import get_async_db, get_async_read_db
 from schemas.pid_tag import pid_tag as Schemapid_tag
 from schemas.pid_tag import pid_tagCreate as Schemapid_tagCreate
 from schemas.pid_tag import pid_tagUpdate as Schemapid_tagUpdate
@@ -14,6 +25,8 @@ from schemas.pid_tag import pid_tagUpsert as Schemapid_tagUpsert
 from datetime import datetime
 
 from models.pid_tag import pid_tag as Modelpid_tag
+from models.pid_file_page import pid_file_page as Modelpid_file_page
+from models.pid_file import pid_file as Modelpid_file
 
 def get_all_filter_function(pid_file_page_id:int=None,name:str=None):
 	return {"pid_file_page_id":pid_file_page_id,"name":name}
@@ -25,6 +38,8 @@ get_all_filter_meta = {'pid_file_page_id': {'condition': '==', 'column': 'pid_fi
 model_router = SentoRouter(
                     schema=Schemapid_tag,
                     db = get_db,
+                    async_db = get_async_db,
+                    async_read_db = get_async_read_db,
                     prefix="pid_tag",
                     db_model=Modelpid_tag,
                     create_schema = Schemapid_tagCreate,
@@ -36,5 +51,62 @@ model_router = SentoRouter(
                     update_one_callback=False,
                     delete_one_callback=False,
                     delete_all_callback=False,
-                    unique_fields=['pid_file_page_id', 'name']
-                )
\ No newline at end of file
+                    unique_fields=['pid_file_page_id', 'name', 'type'],
+                    fast_read=True,
+                    etag=True,
+                )
+
+
+TAG_EXPORT_FORMATS = {"ndjson": NDJSON_MEDIA_TYPE, "arrow": ARROW_STREAM_MEDIA_TYPE}
+# Exports written to S3 expire with the lifecycle rule of the bucket
+TAG_EXPORT_PREFIX = "exports/tags/"
+TAG_EXPORT_URL_EXPIRES_IN = 3600
+
+
+class TagExport(BaseModel):
+    url: str
+    s3_key: str
+
+
+def tag_export_response(format: str, file_id: Optional[int] = None, project_id: Optional[int] = None, s3: bool = False):
+    """
+    Streams the tags of a file or a project with their page number, ordered by file,
+    page and tag id, as NDJSON or Arrow IPC stream. Behind API Gateway the response is
+    buffered by Mangum and limited to 6 MB; with s3 the export is written to S3 part by
+    part instead, and a presigned url of it is returned.
+    """
+    if format not in TAG_EXPORT_FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {', '.join(TAG_EXPORT_FORMATS)}")
+
+    columns = [
+        Modelpid_file_page.pid_file_id,
+        Modelpid_file_page.page_number,
+        *Modelpid_tag.__table__.columns,
+    ]
+    stmt = (
+        select(*columns)
+        .join(Modelpid_file_page, Modelpid_file_page.id == Modelpid_tag.pid_file_page_id)
+        .order_by(Modelpid_file_page.pid_file_id, Modelpid_file_page.page_number, Modelpid_tag.id)
+    )
+    if file_id is not None:
+        stmt = stmt.where(Modelpid_file_page.pid_file_id == file_id)
+    if project_id is not None:
+        stmt = stmt.join(Modelpid_file, Modelpid_file.id == Modelpid_file_page.pid_file_id).where(
+            Modelpid_file.project_id == project_id
+        )
+
+    partitions = stream_partitions(stmt)
+    if format == "arrow":
+        content = arrow_stream(partitions, columns)
+    else:
+        content = ndjson_stream(partitions)
+    if not s3:
+        return StreamingResponse(content, media_type=TAG_EXPORT_FORMATS[format])
+
+    s3_client = _utils.get_s3_client()
+    s3_key = f"{TAG_EXPORT_PREFIX}{uuid.uuid4()}/tags.{format}"
+    upload_stream(s3_client, settings.S3_BUCKET, s3_key, content, TAG_EXPORT_FORMATS[format])
+    url = s3_client.generate_presigned_url(
+        "get_object", Params={"Bucket": settings.S3_BUCKET, "Key": s3_key}, ExpiresIn=TAG_EXPORT_URL_EXPIRES_IN
+    )
+    return TagExport(url=url, s3_key=s3_key)
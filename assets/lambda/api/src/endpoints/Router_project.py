@@ -2,10 +2,16 @@
 DO NOT EDIT! THIS IS AN AUTOGENERATED FILE!!!!!
 """
 
-from typing import Optional
+import uuid
+from typing import Optional, List
+from fastapi import Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 from utils.enums import *
 from core.api.sento_router import SentoRouter
 from core.database.db import get_db
+from utils.async_db import get_async_db, get_async_read_db
 from schemas.project import project as Schemaproject
 from schemas.project import projectCreate as SchemaprojectCreate
 from schemas.project import projectUpdate as SchemaprojectUpdate
@@ -14,6 +20,10 @@ from schemas.project import projectUpsert as SchemaprojectUpsert
 from datetime import datetime
 
 from models.project import project as Modelproject
+from models.pid_file import pid_file as Modelpid_file
+from models.job import job as Modeljob
+from endpoints.Router_pid_file import create_pid_processing_jobs
+from endpoints.Router_pid_tag import tag_export_response
 
 def get_all_filter_function(): return {}
 
@@ -24,6 +34,8 @@ get_all_filter_meta = {}
 model_router = SentoRouter(
                     schema=Schemaproject,
                     db = get_db,
+                    async_db = get_async_db,
+                    async_read_db = get_async_read_db,
                     prefix="project",
                     db_model=Modelproject,
                     create_schema = SchemaprojectCreate,
@@ -36,4 +48,58 @@ model_router = SentoRouter(
                     delete_one_callback=False,
                     delete_all_callback=False,
                     unique_fields=[]
-                )
\ No newline at end of file
+                )
+
+
+class BatchProcessResult(BaseModel):
+    batch_id: str
+    job_ids: List[int]
+
+
+@model_router.post("/{id}/process", response_model=BatchProcessResult)
+def process(
+    id: int,
+    file_ids: Optional[List[int]] = Query(None),
+    skip_active: bool = True,
+    db: Session = Depends(get_db),
+):
+    """
+    Queues the files of the project for processing, all jobs share one batch_id.
+    file_ids (repeated, file_ids=1&file_ids=2) only processes some files.
+    With skip_active, files that already have a queued or running job are skipped.
+    Returns 400 when no file is left to process.
+    """
+    if not db.get(Modelproject, id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    query = select(Modelpid_file).where(Modelpid_file.project_id == id)
+    if file_ids:
+        query = query.where(Modelpid_file.id.in_(file_ids))
+    if skip_active:
+        active_file_ids = select(Modeljob.file_id).where(
+            Modeljob.project_id == id,
+            Modeljob.file_id.is_not(None),
+            Modeljob.status.in_(["QUEUED", "PROCESSING"]),
+        )
+        query = query.where(Modelpid_file.id.not_in(active_file_ids))
+    files = db.scalars(query.order_by(Modelpid_file.id)).all()
+    if not files:
+        # A batch without jobs could not be read back with GET /job/batch/{batch_id}
+        raise HTTPException(status_code=400, detail="No files to process, none selected or all have an active job")
+
+    batch_id = str(uuid.uuid4())
+    job_ids = create_pid_processing_jobs(db, files, batch_id=batch_id)
+
+    return {"batch_id": batch_id, "job_ids": job_ids}
+
+
+@model_router.get("/{id}/tags")
+def export_tags(id: int, format: str = "ndjson", s3: bool = False, db: Session = Depends(get_db)):
+    """
+    All tags of the project, streamed as NDJSON (format=ndjson) or Arrow IPC stream (format=arrow).
+    Large exports exceed the response limit of API Gateway, with s3=true the export is written
+    to S3 and a presigned url is returned.
+    """
+    if not db.get(Modelproject, id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return tag_export_response(format, project_id=id, s3=s3)
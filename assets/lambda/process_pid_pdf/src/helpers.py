@@ -1,14 +1,24 @@
 import itertools
+import os
 import re
 import uuid
-import yaml
 from dataclasses import dataclass, replace, field
+from functools import lru_cache
 from typing import Text, List, Dict, Union, Tuple
 from data.pid_tag import pid_tag as data_pid_tag
 
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yml")
 
-with open("config.yml", "r") as f:
-    config = yaml.safe_load(f)
+
+@lru_cache(maxsize=None)
+def get_config() -> dict:
+    """
+    config.yml, loaded when a token is first checked instead of at import
+    """
+    import yaml
+
+    with open(CONFIG_PATH, "r") as f:
+        return yaml.safe_load(f)
 
 @dataclass
 class Token:
@@ -218,7 +228,7 @@ def group_unmapped_tokens(tokens):
 
 def is_pid_link(token: Token) -> bool:
     text = token.text
-    regexes = config["pid_links"]["include_regexes"]
+    regexes = get_config()["pid_links"]["include_regexes"]
     match = False
     for r in regexes:
         result = re.match(r, text)
@@ -232,7 +242,7 @@ def is_pid_link(token: Token) -> bool:
 def is_eligible_as_token(token):
     text = token.text
 
-    tag_config = config["tags"]["raw"]
+    tag_config = get_config()["tags"]["raw"]
 
     # Check length of text
     if len(text) < tag_config["min_length"] or len(text) > tag_config["max_length"]:
@@ -278,7 +288,7 @@ def token_type(t: Text) -> Text:
 
 def same_line(a: Token, b: Token) -> Tuple[bool, Dict]:
     # vertical proximity allowing for font/rounding differences
-    tolerance = config["tags"]["cleaned"]["same_line"]["base_tolerance"] * a.page_height
+    tolerance = get_config()["tags"]["cleaned"]["same_line"]["base_tolerance"] * a.page_height
     tol = max(min(a.h, b.h), tolerance)
     result =  (b.cy - a.cy) > 0 and (b.cy - a.cy) < tol
     result_meta =  {
@@ -291,7 +301,7 @@ def same_line(a: Token, b: Token) -> Tuple[bool, Dict]:
 
 def near_right(a: Token, b: Token)-> Tuple[bool, Dict]:
 
-    tolerance = config["tags"]["cleaned"]["near_right"]["base_tolerance"] * a.page_width
+    tolerance = get_config()["tags"]["cleaned"]["near_right"]["base_tolerance"] * a.page_width
     # b is to the right of a (or slightly left, accounting for small misalignments)
     result = (b.cx - a.cx) >= -tolerance and (b.cx - a.cx) <= tolerance
     result_meta =  {
@@ -397,7 +407,7 @@ def split_matches_and_leftovers(tokens, regex):
 
 def extract_tags_from_leftovers(tokens):
     # Type 1: 2 or more CHARS + 2 or more Digits, ...
-    regexes = config["tags"]["cleaned"]["mark_as_tag_regexes"]
+    regexes = get_config()["tags"]["cleaned"]["mark_as_tag_regexes"]
     patterns = [re.compile(r) for r in regexes]
 
     leftovers = []
@@ -1,4 +1,10 @@
 from typing import Dict
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+import threading
+import time
 
 from boto3 import client
 import fitz
@@ -6,14 +12,18 @@ import os
 import json
 import itertools
 
-from sqlalchemy import text
+from sqlalchemy import text, select, insert, update, delete, func
 
 from core.database.db import Session as db
+from core.data.cache import read_cache_stats
 from helpers import (
     cleanup_tokens,
     extract_tags_from_leftovers, get_tokens, mark_pid_links, mark_tokens_in_equipment_list,
     get_tokens_matching_part_of_equipment_list_item, group_mapped_tokens, group_unmapped_tokens,
 )
+from s3_cache import download_to_cache
+from core.queue import get_job_queue
+from utils.sqs import push_event
 
 from data.job import job as data_job
 from data.pid_file import pid_file as data_pid_file
@@ -22,19 +32,50 @@ from data.pid_file_page import pid_file_page as data_pid_file_page
 from data.pid_file_link import pid_file_link as data_pid_file_link
 from data.equipment_list import equipment_list as data_equipment_list
 from data.equipment_list_item import equipment_list_item as data_equipment_list_item
+from models import job as ORMjob
+from models import pid_file as ORMpid_file
+from models import pid_file_page as ORMpid_file_page
+from models import pid_file_link as ORMpid_file_link
 
 
 BUCKET_NAME = os.getenv("BUCKET_NAME","643553455790-eu-west-1-files")
 
 s3 = client("s3")
+sqs = client("sqs")
 
+# Records of one SQS batch are processed concurrently, bounded by this pool size
+MAX_CONCURRENT_RECORDS = int(os.getenv("MAX_CONCURRENT_RECORDS", 2))
 
+# PyMuPDF is not thread safe, so only the S3 download and the database work of the
+# records overlap. Opening and processing the PDFs is serialized.
+fitz_lock = threading.Lock()
 
+# Documents with at least this many pages are split into page range jobs that are
+# processed in parallel by other workers
+FAN_OUT_MIN_PAGES = int(os.getenv("FAN_OUT_MIN_PAGES", 8))
+PAGES_PER_WORK_ITEM = int(os.getenv("PAGES_PER_WORK_ITEM", 4))
 
-def process_document(doc, equipment_list_tags):
+
+@contextmanager
+def timed(metrics, name):
+    """
+    Adds the duration of the block to metrics[name], in seconds
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics[name] = metrics.get(name, 0) + time.perf_counter() - start
+
+
+
+
+def process_document(doc, equipment_list_tags, page_numbers=None):
 
     pages = []
-    for page_number in range(len(doc)):
+    if page_numbers is None:
+        page_numbers = range(len(doc))
+    for page_number in page_numbers:
         validated_tags = []
         page = doc[page_number]
 
@@ -99,10 +140,17 @@ def process_document(doc, equipment_list_tags):
 
 
 
-def get_file_from_s3(key):
-    response = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-    file_bytes = response["Body"].read()
-    return file_bytes
+def count_tokens(pages):
+    return sum(len(page.get("raw_tokens", [])) for page in pages)
+
+@contextmanager
+def get_file_path_from_s3(key, metrics):
+    # Served from the /tmp cache when a warm container already fetched this version. The
+    # file stays in the cache until the block exits, other records can evict it after.
+    with ExitStack() as stack:
+        with timed(metrics, "s3_fetch_seconds"):
+            file_path = stack.enter_context(download_to_cache(s3, BUCKET_NAME, key))
+        yield file_path
 
 def persist_page_info(page, file_id):
 
@@ -145,17 +193,22 @@ def persist_tags(tags, tag_type, page_id, session):
         pid_tags.append(pid_tag)
     data_pid_tag.bulk_upsert(pid_tags, session)
 
-def persist_pid_links(links, page_id, file_id):
+def select_document_identifier(links):
+    return max(links, key=lambda l: l.get("x0") * l.get("y0"))
+
+def persist_pid_links(links, page_id, file_id, set_technical_name=True):
     if len(links) == 0:
         return
-    document_identifier = max(links, key=lambda l: l.get("x0") * l.get("y0"))
-    pid_file = data_pid_file.from_id(file_id)
-    pid_file.technical_name = document_identifier.get("text")
-    pid_file.save()
+    document_identifier = None
+    if set_technical_name:
+        document_identifier = select_document_identifier(links)
+        pid_file = data_pid_file.from_id(file_id)
+        pid_file.technical_name = document_identifier.get("text")
+        pid_file.save()
 
 
     for l in links:
-        if l.get("id") == document_identifier.get("id"):
+        if document_identifier and l.get("id") == document_identifier.get("id"):
             continue
 
         pid_file_link = data_pid_file_link(
@@ -174,7 +227,7 @@ def persist_pid_links(links, page_id, file_id):
 
     return
 
-def persist_results(results, file_id):
+def persist_results(results, file_id, set_technical_name=True):
     with db() as session:
         for page in results:
             page_id = persist_page_info(page, file_id)
@@ -201,7 +254,7 @@ def persist_results(results, file_id):
 
             print("Persist pid links")
             pid_links = page.get("pid_links",[])
-            persist_pid_links(pid_links,page_id,file_id)
+            persist_pid_links(pid_links,page_id,file_id, set_technical_name)
 
         session.commit()
 
@@ -214,59 +267,347 @@ def get_tags_from_equipment_list(equipment_list_items):
             tags.append(str(item.value).upper())
     return tags
 
+def get_equipment_list_tags(project_id):
+    equipment_list = data_equipment_list.get(project_id=project_id)
+    if equipment_list:
+        equip_items = data_equipment_list_item.get_all(equipment_list_id= equipment_list.id)
+    else:
+        equip_items = []
+    equipment_list_tags = get_tags_from_equipment_list(equip_items)
+    print("EQUIPMENT_LIST_TAGS: ",equipment_list_tags)
+    return equipment_list_tags
+
+def fan_out(job, pid_file, page_count, disable_persist=None):
+    """
+    Creates a page job for every PAGES_PER_WORK_ITEM pages of the file and queues them.
+    The parent job completes when the last page job finished (see finish_page_job).
+
+    A redelivered coordinator reuses the page jobs it created before (their page range
+    is kept in the payload). Only missing page ranges are created, and only page jobs
+    that are queued or failed are queued again; running and completed ones are left alone.
+    """
+    page_ranges = [
+        (page_start, min(page_start + PAGES_PER_WORK_ITEM, page_count))
+        for page_start in range(0, page_count, PAGES_PER_WORK_ITEM)
+    ]
+    created_at = datetime.now()
+    with db() as session:
+        # Concurrent deliveries of the coordinator fan out one after the other
+        session.execute(select(ORMjob.id).where(ORMjob.id == job.id).with_for_update())
+        existing = {}
+        for page_job_id, status, payload in session.execute(
+            select(ORMjob.id, ORMjob.status, ORMjob.payload).where(ORMjob.parent_job_id == job.id)
+        ).all():
+            page_range = (payload or {}).get("page_start"), (payload or {}).get("page_end")
+            existing[page_range] = (page_job_id, status)
+
+        stale = [
+            page_job_id for page_range, (page_job_id, status) in existing.items()
+            if page_range not in page_ranges and status != "PROCESSING"
+        ]
+        if stale:
+            # Page ranges of an older version of the file
+            session.execute(delete(ORMjob).where(ORMjob.id.in_(stale)))
+
+        missing = [page_range for page_range in page_ranges if page_range not in existing]
+        if missing:
+            page_job_ids = session.scalars(
+                insert(ORMjob).returning(ORMjob.id, sort_by_parameter_order=True),
+                [
+                    dict(
+                        name="process_pid_pages",
+                        type="PROCESS_PID_PAGES",
+                        status="QUEUED",
+                        project_id=job.project_id,
+                        file_id=pid_file.id,
+                        created_at=created_at,
+                        batch_id=job.batch_id,
+                        parent_job_id=job.id,
+                        page_count=page_end - page_start,
+                        payload={"page_start": page_start, "page_end": page_end},
+                    )
+                    for page_start, page_end in missing
+                ]
+            ).all()
+            existing.update(zip(missing, ((page_job_id, "QUEUED") for page_job_id in page_job_ids)))
+        session.commit()
+
+    to_queue = [
+        (existing[page_range][0], page_range)
+        for page_range in page_ranges
+        if existing[page_range][1] in ("QUEUED", "FAILED")
+    ]
+    messages = [
+        {
+            "action": "process_pid_pages",
+            "details": f"Process pages {page_start + 1}-{page_end} of PID file",
+            "s3_key": pid_file.s3_key,
+            "job_id": page_job_id,
+            "parent_job_id": job.id,
+            "file_id": pid_file.id,
+            "page_start": page_start,
+            "page_end": page_end,
+            "disable_persist": disable_persist,
+        }
+        for page_job_id, (page_start, page_end) in to_queue
+    ]
+    failed = get_job_queue().send_messages(messages) if messages else []
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(messages)} page jobs could not be queued")
+    print(f"Fanned out job {job.id} ({page_count} pages) into {len(page_ranges)} page jobs, queued {len(messages)}")
+    if not messages:
+        # Redelivered after its page jobs finished, none of them is left to complete the job
+        complete_parent_job(job.id, {"disable_persist": disable_persist})
+
+def open_document(file_path, metrics):
+    # Callers hold fitz_lock
+    with timed(metrics, "pdf_open_seconds"):
+        return fitz.open(file_path, filetype="pdf")
+
+def process_file(job, data, metrics):
+    """
+    Processes the whole file, or fans it out into page jobs when it is large.
+    Returns True when the file was fanned out.
+    """
+    disable_persist = data.get("disable_persist", None)
+    file_id = data.get("file_id")
+    pid_file = data_pid_file.from_id(file_id)
+    print(f"Processing file ID: {file_id},{pid_file.to_dict()}")
+
+    with get_file_path_from_s3(pid_file.s3_key, metrics) as file_path:
+        with fitz_lock:
+            with open_document(file_path, metrics) as doc:
+                page_count = len(doc)
+
+        job.page_count = page_count
+        if pid_file.page_count != page_count:
+            # Known page count lets the scheduler favour small documents on reprocessing
+            with db() as session:
+                session.execute(
+                    update(ORMpid_file).where(ORMpid_file.id == pid_file.id).values(page_count=page_count)
+                )
+                session.commit()
+
+        if data.get("fan_out", True) and page_count >= FAN_OUT_MIN_PAGES:
+            fan_out(job, pid_file, page_count, disable_persist)
+            return True
+
+        equipment_list_tags = get_equipment_list_tags(pid_file.project_id)
+        with fitz_lock:
+            with open_document(file_path, metrics) as doc, timed(metrics, "processing_seconds"):
+                processed_document = process_document(doc, equipment_list_tags)
+    metrics["token_count"] = count_tokens(processed_document)
+
+    if not disable_persist:
+        with timed(metrics, "persist_seconds"):
+            persist_results(processed_document,file_id)
+    return False
+
+def process_pages(job, data, metrics):
+    file_id = data.get("file_id")
+    page_numbers = range(data.get("page_start"), data.get("page_end"))
+    pid_file = data_pid_file.from_id(file_id)
+    print(f"Processing pages {page_numbers.start + 1}-{page_numbers.stop} of file ID: {file_id}")
+
+    equipment_list_tags = get_equipment_list_tags(pid_file.project_id)
+    with get_file_path_from_s3(pid_file.s3_key, metrics) as file_path, fitz_lock:
+        with open_document(file_path, metrics) as doc, timed(metrics, "processing_seconds"):
+            processed_pages = process_document(doc, equipment_list_tags, page_numbers)
+    metrics["token_count"] = count_tokens(processed_pages)
+
+    if not data.get("disable_persist", None):
+        # The document identifier is selected over all pages by aggregate_document
+        with timed(metrics, "persist_seconds"):
+            persist_results(processed_pages, file_id, set_technical_name=False)
+
+def aggregate_document(file_id, session):
+    """
+    Document level work of a fanned out file: selects the document identifier among the
+    pid links of every page, like persist_pid_links does for a whole file, and sets the
+    technical name of the file.
+    """
+    rows = session.execute(
+        select(ORMpid_file_link, ORMpid_file_page.page_number)
+        .join(ORMpid_file_page, ORMpid_file_link.pid_file_page_id == ORMpid_file_page.id)
+        .where(ORMpid_file_link.pid_file_id == file_id, ORMpid_file_link.type == "RAW")
+    ).all()
+
+    links_per_page = defaultdict(list)
+    for link, page_number in rows:
+        links_per_page[page_number].append(
+            {"id": link.id, "text": link.name, "x0": link.x0, "y0": link.y0, "orm": link}
+        )
+
+    technical_name = None
+    for page_number in sorted(links_per_page):
+        document_identifier = select_document_identifier(links_per_page[page_number])
+        technical_name = document_identifier.get("text")
+        session.delete(document_identifier.get("orm"))
+
+    if technical_name is not None:
+        session.get(ORMpid_file, file_id).technical_name = technical_name
+
+def finish_page_job(job, data):
+    """
+    The last page job to finish runs the document level work and completes the parent
+    job. The lock on the parent row makes sure only one page job does this.
+    """
+    complete_parent_job(job.parent_job_id, data)
+
+def complete_parent_job(parent_job_id, data):
+    """
+    Completes the parent job when all its page jobs completed, or marks it failed when
+    one failed. Called by the page jobs and by a coordinator that had nothing to queue.
+    """
+    with db() as session:
+        parent = session.execute(
+            select(ORMjob).where(ORMjob.id == parent_job_id).with_for_update()
+        ).scalar_one_or_none()
+        if parent is None or parent.status == "COMPLETED":
+            return
+        old_status = parent.status
+
+        status_counts = dict(
+            session.execute(
+                select(ORMjob.status, func.count())
+                .where(ORMjob.parent_job_id == parent.id)
+                .group_by(ORMjob.status)
+            ).all()
+        )
+        if sum(status_counts.values()) == status_counts.get("COMPLETED", 0):
+            if not data.get("disable_persist", None):
+                aggregate_document(parent.file_id, session)
+            parent.status = "COMPLETED"
+            parent.error_message = None
+            parent.completed_at = datetime.now(timezone.utc)
+            parent.token_count = session.scalar(
+                select(func.sum(ORMjob.token_count)).where(ORMjob.parent_job_id == parent.id)
+            )
+            print(f"All page jobs of job {parent.id} completed")
+        elif status_counts.get("FAILED"):
+            # A page job that is retried successfully completes the parent after all
+            parent.status = "FAILED"
+            parent.error_message = f"{status_counts['FAILED']} page jobs failed"
+        session.commit()
+
+    if parent.status != old_status:
+        push_job_status_event(
+            {c.key: getattr(parent, c.key) for c in ORMjob.__table__.columns},
+            old_status,
+        )
+
+def push_job_status_event(job_data, old_status):
+    # Same event as the update callback of the job router, sent when SQS_EVENT_QUEUE_URL is set
+    push_event(sqs, {
+        "type": "update-record",
+        "model": "job",
+        "data": job_data,
+        "old_data": {"status": old_status},
+    })
+
+def record_metrics(job, metrics):
+    for name, value in metrics.items():
+        setattr(job, name, value)
+    print(f"Job {job.id} timings: {metrics}")
+
+def save_job_metrics(job, metrics):
+    """
+    Writes only the timings and the page count of the job. A fanned out job can already be
+    completed by its last page job, saving the whole job would set it back to PROCESSING.
+    """
+    with db() as session:
+        session.execute(
+            update(ORMjob).where(ORMjob.id == job.id).values(page_count=job.page_count, **metrics)
+        )
+        session.commit()
+
 def process_record(record):
     print("Processing record:", record)
     body = record.get("body")
     data = json.loads(body)
 
     job_id = data.get("job_id")
-    disable_persist = data.get("disable_persist", None)
     job = data_job.from_id(job_id)
+    if job is None:
+        # Page jobs of an older version of the file are removed when their coordinator is redelivered
+        print(f"Job {job_id} not found, skipping record")
+        return None
+    if job.parent_job_id and job.status == "COMPLETED":
+        # Queued again by a redelivered coordinator after it completed
+        print(f"Page job {job_id} already completed, skipping record")
+        return job.to_dict()
+    old_status = job.status
     job.status = "PROCESSING"
+    job.started_at = datetime.now(timezone.utc)
+    job.completed_at = None
+    if job.created_at is not None:
+        job.queue_wait_seconds = (job.started_at - job.created_at).total_seconds()
     job.save()
+    if old_status != job.status:
+        push_job_status_event(job.to_dict(), old_status)
     print(f"Processing job ID: {job_id},{job.to_dict()}")
 
-    file_id = data.get("file_id")
-    pid_file = data_pid_file.from_id(file_id)
-    print(f"Processing file ID: {file_id},{pid_file.to_dict()}")
-
-    equipment_list = data_equipment_list.get(project_id=pid_file.project_id)
-    if equipment_list:
-        equip_items = data_equipment_list_item.get_all(equipment_list_id= equipment_list.id)
-    else:
-        equip_items = []
-    equipment_list_tags = get_tags_from_equipment_list(equip_items)
-    print("EQUIPMENT_LIST_TAGS: ",equipment_list_tags)
-
-    key = pid_file.s3_key
-    file_bytes = get_file_from_s3(key)
-    doc = fitz.open(stream=file_bytes, filetype="pdf")
-    processed_document = process_document(doc, equipment_list_tags)
+    fanned_out = False
+    metrics = {}
     try:
-
-        pass
-
+        if data.get("action") == "process_pid_pages":
+            process_pages(job, data, metrics)
+        else:
+            fanned_out = process_file(job, data, metrics)
     except Exception as e:
         job.status = "FAILED"
         job.error_message = str(e)
+        record_metrics(job, metrics)
         job.save()
+        push_job_status_event(job.to_dict(), "PROCESSING")
         print(f"Error processing PDF: {e}")
-        return
+        if job.parent_job_id:
+            finish_page_job(job, data)
+        raise
+
+    record_metrics(job, metrics)
+    if fanned_out:
+        # Completed by the last page job
+        save_job_metrics(job, metrics)
+        return job.to_dict()
 
-    if not disable_persist:
-        persist_results(processed_document,file_id)
     job.status = "COMPLETED"
+    job.completed_at = datetime.now(timezone.utc)
     job.save()
+    push_job_status_event(job.to_dict(), "PROCESSING")
+    if job.parent_job_id:
+        finish_page_job(job, data)
 
     return job.to_dict()
 
 def handler(event, context):
-    for record in event.get("Records", []):
-        process_record(record)
+    """
+    Processes the records of the batch concurrently. Only the records that failed are
+    reported back (ReportBatchItemFailures), so SQS does not redeliver the others.
+    """
+    records = event.get("Records", [])
+    batch_item_failures = []
+    if len(records) == 0:
+        return {"batchItemFailures": batch_item_failures}
+
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_RECORDS, len(records))) as executor:
+        futures = {executor.submit(process_record, record): record for record in records}
+        for future in as_completed(futures):
+            record = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Record {record.get('messageId')} failed: {e}")
+                batch_item_failures.append({"itemIdentifier": record.get("messageId")})
+
+    # The worker is the reader of the cached data classes, the counters are per container
+    print(f"Read caches: {json.dumps(read_cache_stats())}")
+    return {"batchItemFailures": batch_item_failures}
 
 event = {
     "Records" : [
         {
+            "messageId": "local-1",
             "body" : json.dumps(
                 {
                     "job_id":1,
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+from boto3.s3.transfer import TransferConfig
+
+CACHE_DIR = os.getenv("S3_CACHE_DIR", "/tmp/s3_cache")
+
+# Fraction of the ephemeral storage the cache is allowed to use. The rest is kept
+# free for fitz, temporary files of the processing itself, ...
+CACHE_MAX_FRACTION = float(os.getenv("S3_CACHE_MAX_FRACTION", 0.8))
+
+MB = 1024 ** 2
+
+# Objects above the threshold are fetched with parallel ranged GETs
+transfer_config = TransferConfig(
+    multipart_threshold=int(os.getenv("S3_DOWNLOAD_MULTIPART_THRESHOLD_MB", 16)) * MB,
+    multipart_chunksize=int(os.getenv("S3_DOWNLOAD_CHUNKSIZE_MB", 8)) * MB,
+    max_concurrency=int(os.getenv("S3_DOWNLOAD_MAX_CONCURRENCY", 10)),
+    use_threads=True,
+)
+
+_lock = threading.Lock()
+# Records of this process using a cache entry, pinned entries are never evicted
+_pins = Counter()
+# Size of the downloads of this process in progress, by .part path
+_downloads = {}
+
+
+def cache_path(key, etag):
+    key_hash = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    etag = etag.strip('"')
+    return os.path.join(CACHE_DIR, f"{key_hash}-{etag}")
+
+
+def cache_entries():
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(".part"):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+
+def downloading_bytes():
+    """
+    Bytes taken by the downloads in progress. Downloads of this process count with the
+    size of the object, the .part files of other processes with their current size.
+    """
+    used = sum(_downloads.values())
+    if not os.path.isdir(CACHE_DIR):
+        return used
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        if not name.endswith(".part") or path in _downloads:
+            continue
+        try:
+            used += os.stat(path).st_size
+        except FileNotFoundError:
+            continue
+    return used
+
+
+def max_cache_size():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return int(shutil.disk_usage(CACHE_DIR).total * CACHE_MAX_FRACTION)
+
+
+def evict(required_bytes):
+    """
+    Remove least recently used entries until `required_bytes` fits in the cache
+    budget and on the ephemeral storage.
+    """
+    entries = sorted(cache_entries())
+    used = sum(size for _, size, _ in entries) + downloading_bytes()
+    budget = max_cache_size()
+
+    for _, size, path in entries:
+        free = shutil.disk_usage(CACHE_DIR).free
+        if used + required_bytes <= budget and required_bytes < free:
+            break
+        if _pins[path]:
+            # Open by another record
+            continue
+        try:
+            os.remove(path)
+            used -= size
+            print(f"Evicted {path} ({size} bytes) from s3 cache")
+        except FileNotFoundError:
+            pass
+
+    return used + required_bytes <= budget
+
+
+@contextmanager
+def download_to_cache(s3, bucket, key):
+    """
+    Yields a local path to the object `key`. The object is downloaded only when it
+    is not in the cache yet (keyed on S3 key and ETag), using parallel ranged GETs
+    for large objects. The entry is not evicted before the block exits.
+    """
+    head = s3.head_object(Bucket=bucket, Key=key)
+    etag = head["ETag"]
+    size = head["ContentLength"]
+    path = cache_path(key, etag)
+
+    part_path = None
+    with _lock:
+        _pins[path] += 1
+        if os.path.exists(path):
+            os.utime(path)  # mark as most recently used
+            print(f"S3 cache hit for {key} ({size} bytes)")
+        else:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            fits = evict(size)
+            part_path = f"{path}.{uuid.uuid4().hex}.part"
+            _downloads[part_path] = size
+
+    try:
+        if part_path is not None:
+            download(s3, bucket, key, head, path, part_path)
+            print(f"S3 cache miss for {key}, downloaded {size} bytes")
+            if not fits:
+                # Object is larger than the cache budget, keep it only for this invocation
+                print(f"{key} does not fit in the s3 cache budget, it will be evicted first")
+        yield path
+    finally:
+        with _lock:
+            _pins[path] -= 1
+            if not _pins[path]:
+                del _pins[path]
+
+
+def download(s3, bucket, key, head, path, part_path):
+    # download_file does not accept IfMatch (it only uses it between its own ranged
+    # GETs), the version of the head pins the object the entry is keyed on instead
+    extra_args = {"VersionId": head["VersionId"]} if head.get("VersionId") else None
+    try:
+        s3.download_file(
+            Bucket=bucket,
+            Key=key,
+            Filename=part_path,
+            ExtraArgs=extra_args,
+            Config=transfer_config,
+        )
+        os.replace(part_path, path)
+    except Exception:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    finally:
+        with _lock:
+            del _downloads[part_path]
@@ -0,0 +1,99 @@
+"""
+Long running worker that processes the jobs of the postgres job queue, as an
+alternative to the SQS triggered Lambda for local load tests and self-hosted
+deployments.
+
+    JOB_QUEUE_BACKEND=postgres python worker.py --processes 8
+
+helpers.py loads config.yml from its own directory, so it can run from any directory.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import time
+
+# Every worker process processes one job at a time, concurrency comes from the
+# number of processes. PyMuPDF is not thread safe.
+os.environ.setdefault("MAX_CONCURRENT_RECORDS", "1")
+
+
+def run_worker(worker_id, max_messages, idle_sleep, stop_event):
+    # The parent process handles Ctrl+C and asks the workers to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Imported in the worker process, so every process creates its own engine
+    from core.queue import get_job_queue
+    from index import process_record
+
+    job_queue = get_job_queue()
+    print(f"Worker {worker_id} started (pid {os.getpid()})")
+
+    sleep = idle_sleep
+    while not stop_event.is_set():
+        messages = job_queue.receive_messages(max_messages)
+        if not messages:
+            # Back off while the queue is empty
+            stop_event.wait(sleep)
+            sleep = min(sleep * 2, 10 * idle_sleep)
+            continue
+        sleep = idle_sleep
+
+        # The jobs waiting for their turn are kept hidden as well
+        pending = list(messages)
+        with job_queue.heartbeat(pending):
+            for message in messages:
+                try:
+                    process_record(message.to_record())
+                except Exception as e:
+                    print(f"Worker {worker_id}: job {message.id} failed (attempt {message.attempts}): {e}")
+                    job_queue.fail(message, str(e))
+                else:
+                    job_queue.complete(message)
+                pending.remove(message)
+
+    print(f"Worker {worker_id} stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process PID jobs from the job queue")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--max-messages", type=int, default=1, help="jobs claimed at once by a process")
+    parser.add_argument("--idle-sleep", type=float, default=1.0, help="seconds to wait when the queue is empty")
+    args = parser.parse_args()
+
+    # spawn instead of fork: database connections and boto3 clients are not fork safe
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+
+    def stop(signum, frame):
+        print("Stopping workers, finishing current jobs..")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    processes = [
+        context.Process(
+            target=run_worker,
+            args=(worker_id, args.max_messages, args.idle_sleep, stop_event),
+        )
+        for worker_id in range(args.processes)
+    ]
+    for p in processes:
+        p.start()
+
+    while any(p.is_alive() for p in processes):
+        time.sleep(1)
+        # Restart crashed workers, their jobs become visible again after the timeout
+        for worker_id, p in enumerate(processes):
+            if not p.is_alive() and p.exitcode != 0 and not stop_event.is_set():
+                print(f"Worker {worker_id} exited with {p.exitcode}, restarting")
+                processes[worker_id] = context.Process(
+                    target=run_worker,
+                    args=(worker_id, args.max_messages, args.idle_sleep, stop_event),
+                )
+                processes[worker_id].start()
+
+
+if __name__ == "__main__":
+    main()
@@ -75,11 +75,21 @@ class APIConstruct(Construct):
             endpoint_configuration=aws_apigateway.EndpointConfiguration(
                 types=[aws_apigateway.EndpointType.REGIONAL]
             ),
+            # Mangum base64 encodes binary and compressed (gzip, br) responses, API Gateway
+            # decodes them for these types. Other types pass through as text.
             binary_media_types=[
+                # Uploads
                 "application/pdf",
                 "multipart/form-data",
-                "application/octet-stream"
-            ],  # Allow all binary media types
+                "application/octet-stream",
+                # Binary list responses and tag exports
+                "application/msgpack",
+                "application/x-msgpack",
+                "application/vnd.apache.arrow.stream",
+                # Compressed json and ndjson responses
+                "application/json",
+                "application/x-ndjson",
+            ],
 
         )
 
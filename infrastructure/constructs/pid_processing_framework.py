@@ -2,6 +2,7 @@ import os
 from aws_cdk import (
     aws_lambda,
     Duration,
+    Size,
     aws_sqs,
     aws_lambda_event_sources, aws_iam,
 )
@@ -28,8 +29,14 @@ class PidProcessingFrameworkConstruct(Construct):
             ),
             memory_size=512,
             timeout=Duration.minutes(2),
+            # /tmp holds the LRU cache of downloaded PDFs (see s3_cache.py)
+            ephemeral_storage_size=Size.mebibytes(2048),
             environment={
                 "S3_BUCKET": self.bucket.bucket_name,
+                "S3_CACHE_DIR": "/tmp/s3_cache",
+                "MAX_CONCURRENT_RECORDS": "2",
+                # One connection per concurrently processed record (see utils/db_args.py)
+                "DB_POOL_SIZE": "4",
             }
         )
         self.bucket.grant_read_write(process_pid_pdf_lambda)
@@ -42,11 +49,33 @@ class PidProcessingFrameworkConstruct(Construct):
         )
 
 
+        # Records failing repeatedly end up here instead of being retried forever
+        self.pid_file_processing_dlq = aws_sqs.Queue(
+            self, "MyQueueDLQ",
+            retention_period=Duration.days(14),
+        )
+
         self.pid_file_processing_queue = aws_sqs.Queue(
             self, "MyQueue",
             visibility_timeout=Duration.seconds(121),  # how long a msg is hidden after being picked up
+            dead_letter_queue=aws_sqs.DeadLetterQueue(
+                max_receive_count=3,
+                queue=self.pid_file_processing_dlq,
+            ),
         )
 
+        # Large files are fanned out into page jobs on the same queue
+        process_pid_pdf_lambda.add_environment(
+            "PID_PROCESSING_QUEUE_URL", self.pid_file_processing_queue.queue_url
+        )
+        self.pid_file_processing_queue.grant_send_messages(process_pid_pdf_lambda)
+
         process_pid_pdf_lambda.add_event_source(
-            aws_lambda_event_sources.SqsEventSource(self.pid_file_processing_queue, batch_size=2)
+            aws_lambda_event_sources.SqsEventSource(
+                self.pid_file_processing_queue,
+                # fitz is serialized by a lock, a larger batch only overlaps the I/O of the
+                # records and has to fit in the 2 minutes and 512 MB of the function
+                batch_size=2,
+                report_batch_item_failures=True,
+            )
         )
\ No newline at end of file
@@ -18,6 +18,11 @@ class DeploymentStack(Stack):
     def __init__(self, scope: Construct, stack_name: str, **kwargs) -> None:
         super().__init__(scope, stack_name, **kwargs)
 
+        frontend_origins = self.node.try_get_context("frontend_origins") or []
+        if isinstance(frontend_origins, str):
+            # -c frontend_origins=https://a,https://b
+            frontend_origins = frontend_origins.split(",")
+
         bucket = aws_s3.Bucket(
             self,
             "DataBucket",
@@ -26,7 +31,19 @@ class DeploymentStack(Stack):
             encryption=aws_s3.BucketEncryption.S3_MANAGED,
             enforce_ssl=True,
             versioned=True,
-            removal_policy=RemovalPolicy.RETAIN
+            removal_policy=RemovalPolicy.RETAIN,
+            # Tag exports are only downloaded once, through a presigned url
+            lifecycle_rules=[aws_s3.LifecycleRule(prefix="exports/", expiration=Duration.days(1))],
+            # Browsers of the front end upload directly to the bucket with presigned POSTs handed out by
+            # the API, the origins are set with the frontend_origins context (cdk.json or -c)
+            cors=[
+                aws_s3.CorsRule(
+                    allowed_methods=[aws_s3.HttpMethods.POST, aws_s3.HttpMethods.PUT],
+                    allowed_origins=frontend_origins,
+                    allowed_headers=["*"],
+                    exposed_headers=["ETag"],
+                )
+            ],
         )
 
         vpc = aws_ec2.Vpc.from_lookup(self, "DefaultVPC", is_default=True)
@@ -0,0 +1,18 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+
+# The Lambdas run with assets/commons and their src directory on the path
+for path in ("assets/commons", "assets/lambda/process_pid_pdf/src", "assets/lambda/api/src"):
+    sys.path.insert(0, os.path.abspath(os.path.join(ROOT, path)))
+
+# Clients and settings are created without AWS, nothing is fetched by the unit tests
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-1")
+for name, value in {
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_SERVER": "localhost",
+    "API_URL": "http://localhost",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,53 @@
+import functools
+import importlib.util
+import os
+
+import pytest
+
+BENCHMARK = os.path.join(
+    os.path.dirname(__file__), "..", "..", "assets", "lambda", "api", "benchmarks", "import_time.py"
+)
+
+# Import time of the handler modules, in ms. Measured at about 1.6 s (api) and 1.2 s (worker)
+# on a laptop, the budgets leave room for slower machines.
+BUDGETS_MS = {
+    "api": int(os.getenv("COLD_START_BUDGET_API_MS", 2500)),
+    "worker": int(os.getenv("COLD_START_BUDGET_WORKER_MS", 2000)),
+}
+
+# Only imported by the routes that need them
+DEFERRED_MODULES = {"pandas", "numpy", "openpyxl", "s3fs", "matplotlib"}
+
+
+def load_benchmark():
+    spec = importlib.util.spec_from_file_location("import_time", BENCHMARK)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@functools.lru_cache(maxsize=None)
+def profile(target):
+    import_time = load_benchmark()
+    try:
+        # Best of three, the first import also warms the file system cache
+        return min((import_time.profile_import(target) for _ in range(3)), key=lambda p: p.total_us)
+    except RuntimeError as e:
+        if "ModuleNotFoundError" in str(e):
+            pytest.skip(f"dependencies of the {target} Lambda are not installed")
+        raise
+
+
+@pytest.mark.parametrize("target", ["api", "worker"])
+def test_import_time_within_budget(target):
+    result = profile(target)
+    assert result.total_us / 1000 <= BUDGETS_MS[target], (
+        f"importing the {target} handler took {result.total_us / 1000:.0f} ms, "
+        f"budget is {BUDGETS_MS[target]} ms"
+    )
+
+
+@pytest.mark.parametrize("target", ["api", "worker"])
+def test_heavy_modules_deferred(target):
+    result = profile(target)
+    assert not DEFERRED_MODULES & result.imported
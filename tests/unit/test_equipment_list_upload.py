@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.database.db import get_db
+import endpoints.Router_equipment_list as router_equipment_list
+from models.equipment_list import equipment_list as Modelequipment_list
+
+
+@pytest.fixture
+def db():
+    return mock.MagicMock()
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(router_equipment_list.model_router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+@pytest.fixture
+def s3_client():
+    with mock.patch.object(router_equipment_list._utils, "get_s3_client") as get_s3_client:
+        get_s3_client.return_value.get_object.return_value = {"Body": mock.Mock(read=lambda: b"xlsx")}
+        yield get_s3_client.return_value
+
+
+@pytest.fixture
+def import_items():
+    with mock.patch.object(router_equipment_list, "import_equipment_list_items") as import_items:
+        yield import_items
+
+
+def equipment_list(**kwargs):
+    return Modelequipment_list(id=4, project_id=1, file_name="list.xlsx", type="xlsx", s3_key="list.xlsx", **kwargs)
+
+
+def test_complete_imports_the_items(client, db, s3_client, import_items):
+    db.get.return_value = equipment_list()
+
+    response = client.post("/equipment/4/complete")
+
+    assert response.status_code == 200
+    assert response.json()["uploaded_at"] is not None
+    import_items.assert_called_once_with(db, 4, b"xlsx")
+
+
+def test_repeated_complete_does_not_import_the_items_again(client, db, s3_client, import_items):
+    db.get.return_value = equipment_list(uploaded_at=datetime(2026, 1, 1, tzinfo=timezone.utc))
+
+    response = client.post("/equipment/4/complete")
+
+    assert response.status_code == 200
+    import_items.assert_not_called()
+    s3_client.get_object.assert_not_called()
@@ -0,0 +1,102 @@
+from datetime import datetime, timezone
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.api import _utils
+from utils.async_db import get_async_read_db
+import endpoints.Router_pid_tag as router_pid_tag
+
+MODIFIED_ON = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def test_etag_is_weak_and_changes_with_its_parts():
+    etag = _utils.make_etag("pid_tag", 1, MODIFIED_ON)
+
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert etag == _utils.make_etag("pid_tag", 1, MODIFIED_ON)
+    assert etag != _utils.make_etag("pid_tag", 1, datetime(2026, 1, 2, tzinfo=timezone.utc))
+
+
+@pytest.mark.parametrize("if_none_match, matches", [
+    (None, False),
+    ("", False),
+    ('W/"abc"', True),
+    ('"abc"', True),
+    ('"other", W/"abc"', True),
+    ("*", True),
+    ('W/"other"', False),
+])
+def test_etag_matches(if_none_match, matches):
+    assert _utils.etag_matches(if_none_match, 'W/"abc"') is matches
+
+
+@pytest.fixture
+def db():
+    db = mock.MagicMock()
+    db.execute = mock.AsyncMock(return_value=mock.MagicMock())
+    return db
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(router_pid_tag.model_router)
+    app.dependency_overrides[get_async_read_db] = lambda: db
+    return TestClient(app)
+
+
+def tag_row():
+    row = mock.Mock(modified_on=MODIFIED_ON)
+    row._asdict.return_value = dict(
+        id=1, pid_file_page_id=2, name="V-1", tag_value="V-1", type="valve",
+        modified_on=MODIFIED_ON,
+    )
+    return row
+
+
+def test_get_one_returns_its_etag(client, db):
+    db.execute.return_value.first.return_value = tag_row()
+
+    response = client.get("/pid_tag/1")
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] == router_pid_tag.model_router._one_etag(1, MODIFIED_ON)
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+
+def test_get_one_not_modified(client, db):
+    db.execute.return_value.first.return_value = tag_row()
+    etag = router_pid_tag.model_router._one_etag(1, MODIFIED_ON)
+
+    response = client.get("/pid_tag/1", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_list_not_modified_skips_the_rows(client, db):
+    db.execute.return_value.one.return_value = (3, MODIFIED_ON, 1.0)
+    etag = client.get("/pid_tag", params={"name": "V-1"}).headers["ETag"]
+    db.execute.reset_mock()
+
+    response = client.get("/pid_tag", params={"name": "V-1"}, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    # Only the version query ran
+    assert db.execute.await_count == 1
+
+
+def test_list_etag_depends_on_the_query_and_the_rows(client, db):
+    db.execute.return_value.one.return_value = (3, MODIFIED_ON, 1.0)
+    etag = client.get("/pid_tag", params={"name": "V-1"}).headers["ETag"]
+
+    assert client.get("/pid_tag", params={"name": "V-2"}).headers["ETag"] != etag
+
+    db.execute.return_value.one.return_value = (4, MODIFIED_ON, 1.0)
+    assert client.get("/pid_tag", params={"name": "V-1"}).headers["ETag"] != etag
@@ -0,0 +1,71 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+from sqlalchemy.dialects import postgresql
+
+from models.pid_tag import pid_tag as ORMpid_tag
+from utils.filters import FilterBuilder
+
+
+def compile(expressions):
+    return [str(e.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})) for e in expressions]
+
+
+def test_equality_and_column_mapping():
+    filters = FilterBuilder(ORMpid_tag, {"page": {"condition": "==", "column": "pid_file_page_id"}})
+
+    assert compile(filters({"page": 3})) == ["pid_tag.pid_file_page_id = 3"]
+
+
+def test_unset_params_are_skipped():
+    filters = FilterBuilder(ORMpid_tag, {"name": {"condition": "=="}})
+
+    assert filters({"name": None}) == []
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("0.5,0.9", ["pid_tag.confidence >= '0.5'", "pid_tag.confidence <= '0.9'"]),
+    (",0.9", ["pid_tag.confidence <= '0.9'"]),
+    ("0.5", ["pid_tag.confidence >= '0.5'"]),
+    ([0.5, 0.9], ["pid_tag.confidence >= 0.5", "pid_tag.confidence <= 0.9"]),
+])
+def test_range(value, expected):
+    filters = FilterBuilder(ORMpid_tag, {"confidence": {"condition": "range"}})
+
+    assert compile(filters({"confidence": value})) == expected
+
+
+def test_prefix_escapes_like_wildcards():
+    filters = FilterBuilder(ORMpid_tag, {"name": {"condition": "prefix"}})
+
+    [expression] = filters({"name": "P_1%"})
+    compiled = expression.compile(dialect=postgresql.dialect())
+
+    assert "LIKE" in str(compiled) and "ESCAPE '/'" in str(compiled)
+    assert list(compiled.params.values()) == ["P/_1/%"]
+
+
+def test_in():
+    filters = FilterBuilder(ORMpid_tag, {"type": {"condition": "in"}})
+
+    assert compile(filters({"type": "valve,pump"})) == ["pid_tag.type IN ('valve', 'pump')"]
+
+
+def test_params_without_meta_filter_on_equality_of_their_column():
+    filters = FilterBuilder(ORMpid_tag)
+
+    assert compile(filters({"tag_value": "V-1"})) == ["pid_tag.tag_value = 'V-1'"]
+    # Compiled once
+    assert "tag_value" in filters._builders
+
+
+def test_unknown_column_raises():
+    filters = FilterBuilder(ORMpid_tag)
+
+    with pytest.raises(AttributeError):
+        filters({"missing": 1})
+
+
+def test_unsupported_condition_raises():
+    with pytest.raises(ValueError):
+        FilterBuilder(ORMpid_tag, {"name": {"condition": "like"}})
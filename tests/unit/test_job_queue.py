@@ -0,0 +1,120 @@
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+from sqlalchemy.dialects import postgresql
+
+from core.queue.job_queue import JobQueue, PostgresJobQueue, QueueMessage, SqsJobQueue
+
+
+@pytest.fixture
+def sqs_queue():
+    with mock.patch("boto3.client") as client:
+        yield SqsJobQueue(queue_url="https://sqs/queue", visibility_timeout=120, retry_delay=10)
+
+
+def test_sqs_fail_makes_the_message_visible_after_the_retry_delay(sqs_queue):
+    sqs_queue.fail(QueueMessage(id="1", body={}, attempts=3, receipt_handle="r"), "error")
+
+    sqs_queue._sqs_client.change_message_visibility.assert_called_once_with(
+        QueueUrl="https://sqs/queue", ReceiptHandle="r", VisibilityTimeout=30
+    )
+
+
+def test_sqs_extend_visibility(sqs_queue):
+    sqs_queue.extend_visibility(QueueMessage(id="1", body={}, receipt_handle="r"))
+
+    sqs_queue._sqs_client.change_message_visibility.assert_called_once_with(
+        QueueUrl="https://sqs/queue", ReceiptHandle="r", VisibilityTimeout=120
+    )
+
+
+class RecordingQueue(JobQueue):
+    visibility_timeout = 0.03
+
+    def __init__(self):
+        self.extended = []
+        self.beat = threading.Event()
+
+    def send_messages(self, messages):
+        return []
+
+    def receive_messages(self, max_messages=1):
+        return []
+
+    def complete(self, message):
+        pass
+
+    def fail(self, message, error=None):
+        pass
+
+    def extend_visibility(self, message):
+        self.extended.append(message.id)
+        self.beat.set()
+
+
+def test_heartbeat_extends_the_pending_messages():
+    queue = RecordingQueue()
+    first, second = QueueMessage(id="1", body={}), QueueMessage(id="2", body={})
+    messages = [first, second]
+
+    with queue.heartbeat(messages):
+        assert queue.beat.wait(1)
+        messages.remove(first)
+        queue.beat.clear()
+        # Wait for a beat after the removal
+        assert queue.beat.wait(1)
+        queue.beat.clear()
+        assert queue.beat.wait(1)
+
+    extended = list(queue.extended)
+    assert {"1", "2"} <= set(extended)
+    assert extended[-1] == "2" and extended[-2] == "2"
+    # Stopped with the block
+    time.sleep(0.1)
+    assert queue.extended == extended
+
+
+def test_postgres_extend_visibility_only_extends_processing_jobs():
+    queue = PostgresJobQueue(visibility_timeout=300)
+    session = mock.MagicMock()
+    queue._session = mock.Mock(return_value=session)
+
+    queue.extend_visibility(QueueMessage(id="5", body={}))
+
+    stmt = session.__enter__.return_value.execute.call_args.args[0]
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert "visible_at=(now() +" in sql
+    assert "job.status = %(status_1)s" in sql
+
+
+def test_postgres_claims_only_from_locked_projects():
+    queue = PostgresJobQueue()
+    session = mock.MagicMock()
+    queue._session = mock.Mock(return_value=session)
+    db = session.__enter__.return_value
+    db.scalars.return_value.all.return_value = [4]
+    db.execute.return_value.all.return_value = [(7, {"job_id": 7}, 1)]
+
+    messages = queue.receive_messages(2)
+
+    lock = str(db.scalars.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "pg_try_advisory_xact_lock" in lock
+    claim = db.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+    assert [4] in claim.params.values()
+    assert [m.id for m in messages] == ["7"]
+
+
+def test_postgres_claims_nothing_when_all_projects_are_locked():
+    queue = PostgresJobQueue()
+    session = mock.MagicMock()
+    queue._session = mock.Mock(return_value=session)
+    db = session.__enter__.return_value
+    db.scalars.return_value.all.return_value = []
+
+    assert queue.receive_messages(2) == []
+    # Only the dead-lettering update ran
+    assert db.execute.call_count == 1
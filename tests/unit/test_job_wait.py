@@ -0,0 +1,67 @@
+from contextlib import asynccontextmanager
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils.async_db import get_async_db
+import endpoints.Router_job as router_job
+from models.job import job as Modeljob
+
+
+def job(status):
+    return Modeljob(id=1, name="process_pid_file", type="PROCESS_PID_FILE", status=status, project_id=1)
+
+
+@pytest.fixture
+def db():
+    return mock.AsyncMock()
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(router_job.model_router)
+    app.dependency_overrides[get_async_db] = lambda: db
+    return TestClient(app)
+
+
+def fake_listen(*events):
+    """
+    listen of the route, the waits return events one by one
+    """
+    events = list(events)
+
+    @asynccontextmanager
+    async def listen(channel):
+        async def wait(timeout):
+            return [events.pop(0)] if events else []
+
+        yield wait
+
+    return listen
+
+
+def test_wait_returns_the_changed_status(client, db):
+    db.get.side_effect = [job("QUEUED"), job("QUEUED"), job("PROCESSING")]
+
+    with mock.patch.object(router_job, "listen", fake_listen({"id": 2}, {"id": 1})):
+        response = client.get("/job/1/wait")
+
+    assert response.status_code == 200
+    assert response.json()["changed"] is True
+    assert response.json()["job"]["status"] == "PROCESSING"
+    # Every read ends its transaction, the session holds no connection while waiting
+    assert db.commit.await_count == 2
+
+
+def test_wait_is_not_available_through_pgbouncer(client, db, monkeypatch):
+    monkeypatch.setenv("DB_POOL_PROFILE", "pgbouncer")
+
+    response = client.get("/job/1/wait")
+
+    assert response.status_code == 501
+    db.get.assert_not_called()
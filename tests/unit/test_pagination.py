@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import HTTPException, Response
+from sqlalchemy.dialects import postgresql
+
+from core.api import _utils
+from core.api.sento_router import NEXT_CURSOR_HEADER
+import endpoints.Router_pid_tag as router_pid_tag
+
+router = router_pid_tag.model_router
+
+
+def test_cursor_round_trip():
+    assert _utils.decode_cursor(_utils.encode_cursor([3, "V-1"])) == [3, "V-1"]
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", _utils.encode_cursor({"id": 3})[:-2], "eyJpZCI6IDN9"])
+def test_invalid_cursor_is_a_validation_error(cursor):
+    with pytest.raises(HTTPException) as error:
+        _utils.decode_cursor(cursor)
+
+    assert error.value.status_code == 422
+    assert error.value.detail["detail"][0]["loc"] == ["query", "after"]
+
+
+def compile(stmt):
+    return stmt.compile(dialect=postgresql.dialect())
+
+
+def test_select_all_continues_after_the_cursor():
+    stmt = compile(router._select_all({}, {"skip": 0, "limit": 10}, _utils.encode_cursor([42]), None))
+
+    assert "WHERE (pid_tag.id) > (%(param_1)s::INTEGER) ORDER BY pid_tag.id" in str(stmt)
+    assert 42 in stmt.params.values()
+
+
+def test_select_all_orders_on_the_cursor_key_without_cursor():
+    stmt = str(compile(router._select_all({}, {"skip": 0, "limit": 10}, None, None)))
+
+    assert "ORDER BY pid_tag.id" in stmt
+    assert "pid_tag.id >" not in stmt
+
+
+def test_cursor_can_not_be_combined_with_skip():
+    with pytest.raises(HTTPException) as error:
+        router._select_all({}, {"skip": 10, "limit": 10}, _utils.encode_cursor([42]), None)
+
+    assert error.value.detail["detail"][0]["loc"] == ["query", "skip"]
+
+
+def test_cursor_of_another_key_is_rejected():
+    with pytest.raises(HTTPException):
+        router._select_all({}, {"skip": 0, "limit": 10}, _utils.encode_cursor([1, 2]), None)
+
+
+def test_full_page_returns_the_cursor_of_its_last_row():
+    response = Response()
+    rows = [SimpleNamespace(id=1), SimpleNamespace(id=2)]
+
+    router._list_response(rows, None, "json", {"limit": 2}, response)
+
+    assert _utils.decode_cursor(response.headers[NEXT_CURSOR_HEADER]) == [2]
+
+
+def test_last_page_has_no_cursor():
+    response = Response()
+
+    router._list_response([SimpleNamespace(id=1)], None, "json", {"limit": 2}, response)
+
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_projection_always_selects_the_cursor_key():
+    assert [column.name for column in router._projection("name")] == ["id", "name"]
@@ -0,0 +1,157 @@
+import io
+import sys
+import types
+import zipfile
+from datetime import datetime, timezone
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("fastapi")
+from botocore.exceptions import ClientError
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from core.database.db import get_db
+import endpoints.Router_pid_file as router_pid_file
+from models.job import job as Modeljob
+from models.pid_file import pid_file as Modelpid_file
+
+
+@pytest.fixture
+def db():
+    return mock.MagicMock()
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(router_pid_file.model_router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+@pytest.fixture
+def s3fs():
+    """
+    s3fs module of the import routes, opens raise FileNotFoundError
+    """
+    module = types.ModuleType("s3fs")
+    module.S3FileSystem = mock.Mock()
+    module.S3FileSystem.return_value.open.side_effect = FileNotFoundError
+    with mock.patch.dict(sys.modules, {"s3fs": module}):
+        yield module
+
+
+@pytest.mark.parametrize("s3_key", [
+    "uploads/project_id=2/archives/a/b.zip",
+    "uploads/project_id=1/pid_files/a/b.pdf",
+    "uploads/project_id=1/archives/../../project_id=2/archives/a/b.zip",
+    "uploads/project_id=10/archives/a/b.zip",
+])
+def test_import_zip_rejects_keys_outside_the_project_archives(client, s3fs, s3_key):
+    response = client.post("/pid_file/import_zip", params={"project_id": 1, "s3_key": s3_key})
+    assert response.status_code == 403
+    s3fs.S3FileSystem.return_value.open.assert_not_called()
+
+
+def test_import_zip_missing_archive(client, s3fs):
+    response = client.post(
+        "/pid_file/import_zip", params={"project_id": 1, "s3_key": "uploads/project_id=1/archives/a/b.zip"}
+    )
+    assert response.status_code == 404
+
+
+@pytest.fixture
+def s3_client():
+    with mock.patch.object(router_pid_file._utils, "get_s3_client") as get_s3_client:
+        yield get_s3_client.return_value
+
+
+def test_complete_marks_the_file_uploaded_and_queues_it(client, db, s3_client):
+    file = Modelpid_file(id=3, project_id=1, s3_key="a.pdf")
+    db.get.side_effect = lambda model, id, **kwargs: file if model is Modelpid_file else Modeljob(
+        id=id, name="process_pid_file", type="PROCESS_PID_FILE", status="QUEUED", project_id=1
+    )
+    db.scalars.return_value.first.return_value = None
+
+    with mock.patch.object(router_pid_file, "create_pid_processing_jobs", return_value=[9]) as create_jobs:
+        response = client.post("/pid_file/3/complete", params={"process": True})
+
+    assert response.status_code == 200
+    assert response.json()["job"]["id"] == 9
+    assert file.uploaded_at is not None
+    create_jobs.assert_called_once_with(db, [file])
+    # The file row is locked against concurrent retries
+    assert db.get.call_args_list[0].kwargs == {"with_for_update": True}
+
+
+def test_repeated_complete_returns_the_queued_job(client, db, s3_client):
+    file = Modelpid_file(id=3, project_id=1, s3_key="a.pdf", uploaded_at=datetime(2026, 1, 1, tzinfo=timezone.utc))
+    db.get.return_value = file
+    db.scalars.return_value.first.return_value = Modeljob(
+        id=9, name="process_pid_file", type="PROCESS_PID_FILE", status="PROCESSING", project_id=1
+    )
+
+    with mock.patch.object(router_pid_file, "create_pid_processing_jobs") as create_jobs:
+        response = client.post("/pid_file/3/complete", params={"process": True})
+
+    assert response.status_code == 200
+    assert response.json()["job"]["id"] == 9
+    create_jobs.assert_not_called()
+    s3_client.head_object.assert_not_called()
+    db.commit.assert_called_once()
+
+
+def test_complete_stores_the_page_count_of_the_client(client, db, s3_client):
+    file = Modelpid_file(id=3, project_id=1, s3_key="a.pdf")
+    db.get.return_value = file
+    db.scalars.return_value.first.return_value = None
+
+    response = client.post("/pid_file/3/complete", params={"page_count": 12})
+
+    assert response.status_code == 200
+    assert file.page_count == 12
+
+
+def make_zip(**members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def test_import_zip_marks_the_files_uploaded(db, s3_client):
+    with mock.patch.object(router_pid_file.pid_file, "bulk_upsert", return_value=[4, 5]):
+        result = router_pid_file.import_zip(db, 1, make_zip(**{"a.pdf": b"a", "b.pdf": b"b", "c.txt": b"c"}), False)
+
+    assert result.file_ids == [4, 5]
+    assert s3_client.put_object.call_count == 2
+    stmt = db.execute.call_args.args[0]
+    assert "uploaded_at" in stmt.compile().params
+    db.commit.assert_called_once()
+
+
+def test_import_zip_with_a_corrupt_member_is_invalid(db, s3_client):
+    archive = make_zip(**{"a.pdf": b"a" * 1000}).getvalue()
+    # Corrupt the compressed data of the member, its CRC no longer matches
+    offset = archive.index(b"a.pdf") + len("a.pdf")
+    archive = archive[:offset] + bytes(b ^ 0xFF for b in archive[offset:offset + 4]) + archive[offset + 4:]
+
+    with pytest.raises(HTTPException) as error:
+        router_pid_file.import_zip(db, 1, io.BytesIO(archive), False)
+
+    assert error.value.status_code == 422
+    db.commit.assert_not_called()
+
+
+def test_import_zip_upload_error(db, s3_client):
+    s3_client.put_object.side_effect = ClientError({"Error": {"Code": "500"}}, "PutObject")
+
+    with pytest.raises(HTTPException) as error:
+        router_pid_file.import_zip(db, 1, make_zip(**{"a.pdf": b"a"}), False)
+
+    assert error.value.status_code == 500
+    db.commit.assert_not_called()
@@ -0,0 +1,268 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pytest
+
+index = pytest.importorskip("index")
+from data.job import job as data_job
+
+
+def make_job(**kwargs):
+    values = dict(
+        id=1,
+        name="process_pid",
+        type="PROCESS_PID",
+        status="QUEUED",
+        project_id=1,
+        file_id=2,
+        created_at=datetime.now(timezone.utc) - timedelta(seconds=5),
+        completed_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+    )
+    values.update(kwargs)
+    return data_job(**values)
+
+
+def record(**data):
+    return {"messageId": "m-1", "body": json.dumps({"job_id": 1, "file_id": 2, **data})}
+
+
+@pytest.fixture
+def worker():
+    """
+    process_record with the data layer mocked, yields the job it processes and the mocks
+    """
+    job = make_job()
+    saved = []
+    with mock.patch.object(index.data_job, "from_id", return_value=job), \
+            mock.patch.object(index.data_job, "save", autospec=True,
+                              side_effect=lambda self, db=None: saved.append(self.to_dict()) or self), \
+            mock.patch.object(index, "push_job_status_event") as events, \
+            mock.patch.object(index, "process_file", return_value=False) as process_file, \
+            mock.patch.object(index, "process_pages") as process_pages, \
+            mock.patch.object(index, "finish_page_job") as finish_page_job, \
+            mock.patch.object(index, "save_job_metrics") as save_job_metrics:
+        yield mock.Mock(
+            job=job, saved=saved, events=events, process_file=process_file,
+            process_pages=process_pages, finish_page_job=finish_page_job,
+            save_job_metrics=save_job_metrics,
+        )
+
+
+def test_completed_at_accepts_none():
+    job = make_job()
+    job.completed_at = None
+    assert job.completed_at is None
+
+
+def test_process_record_completes_job(worker):
+    result = index.process_record(record())
+
+    assert worker.saved[0]["status"] == "PROCESSING"
+    # A reprocessed job is not completed until it finishes again
+    assert worker.saved[0]["completed_at"] is None
+    assert result["status"] == "COMPLETED"
+    assert result["completed_at"] is not None
+    assert result["queue_wait_seconds"] >= 5
+    worker.finish_page_job.assert_not_called()
+
+
+def test_process_record_marks_failed_job(worker):
+    worker.process_file.side_effect = RuntimeError("broken pdf")
+
+    with pytest.raises(RuntimeError):
+        index.process_record(record())
+
+    assert worker.saved[-1]["status"] == "FAILED"
+    assert worker.saved[-1]["error_message"] == "broken pdf"
+
+
+def test_process_record_skips_unknown_job(worker):
+    with mock.patch.object(index.data_job, "from_id", return_value=None):
+        assert index.process_record(record()) is None
+    worker.process_file.assert_not_called()
+
+
+def test_fanned_out_job_only_saves_its_metrics(worker):
+    def fan_out(job, data, metrics):
+        metrics["s3_fetch_seconds"] = 0.5
+        job.page_count = 20
+        return True
+
+    worker.process_file.side_effect = fan_out
+
+    index.process_record(record())
+
+    # Saved once as PROCESSING, the parent is completed by its last page job
+    assert [saved["status"] for saved in worker.saved] == ["PROCESSING"]
+    worker.save_job_metrics.assert_called_once_with(worker.job, {"s3_fetch_seconds": 0.5})
+
+
+def test_save_job_metrics_does_not_write_the_status():
+    job = make_job(page_count=20)
+    session = mock.MagicMock()
+    with mock.patch.object(index, "db", return_value=session):
+        index.save_job_metrics(job, {"s3_fetch_seconds": 0.5, "pdf_open_seconds": 0.25})
+
+    stmt = session.__enter__.return_value.execute.call_args.args[0]
+    # Not the status or completed_at, the last page job may have completed the job
+    assert set(stmt.compile().params) == {"page_count", "s3_fetch_seconds", "pdf_open_seconds", "id_1"}
+
+
+class FakeSession:
+    """
+    Session of fan_out, returns children as the existing page jobs of the parent
+    """
+
+    def __init__(self, children):
+        self.children = children
+        self.statements = []
+        self.inserted = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, stmt, *args):
+        self.statements.append(stmt)
+        return mock.Mock(all=lambda: self.children)
+
+    def scalars(self, stmt, rows):
+        self.inserted.extend(rows)
+        return mock.Mock(all=lambda: list(range(100, 100 + len(rows))))
+
+    def commit(self):
+        pass
+
+
+def fan_out(children, page_count=10, complete_parent_job=None):
+    session = FakeSession(children)
+    queue = mock.Mock()
+    queue.send_messages.return_value = []
+    pid_file = mock.Mock(id=2, s3_key="a.pdf")
+    with mock.patch.object(index, "db", return_value=session), \
+            mock.patch.object(index, "get_job_queue", return_value=queue), \
+            mock.patch.object(index, "complete_parent_job", complete_parent_job or mock.Mock()), \
+            mock.patch.object(index, "PAGES_PER_WORK_ITEM", 4):
+        index.fan_out(make_job(), pid_file, page_count)
+    sent = queue.send_messages.call_args.args[0] if queue.send_messages.called else []
+    return session, sent
+
+
+def test_fan_out_creates_page_jobs():
+    session, sent = fan_out([])
+
+    assert [row["payload"] for row in session.inserted] == [
+        {"page_start": 0, "page_end": 4}, {"page_start": 4, "page_end": 8}, {"page_start": 8, "page_end": 10},
+    ]
+    assert [(m["job_id"], m["page_start"], m["page_end"]) for m in sent] == [(100, 0, 4), (101, 4, 8), (102, 8, 10)]
+
+
+def test_redelivered_fan_out_reuses_page_jobs():
+    session, sent = fan_out([
+        (10, "COMPLETED", {"page_start": 0, "page_end": 4}),
+        (11, "PROCESSING", {"page_start": 4, "page_end": 8}),
+    ])
+
+    # Nothing is deleted, only the missing page range is created and queued
+    assert not any(stmt.is_delete for stmt in session.statements)
+    assert [row["payload"] for row in session.inserted] == [{"page_start": 8, "page_end": 10}]
+    assert [m["job_id"] for m in sent] == [100]
+
+
+def test_redelivered_fan_out_queues_failed_page_jobs_again():
+    session, sent = fan_out([
+        (10, "FAILED", {"page_start": 0, "page_end": 4}),
+        (11, "COMPLETED", {"page_start": 4, "page_end": 8}),
+        (12, "QUEUED", {"page_start": 8, "page_end": 10}),
+    ])
+
+    assert session.inserted == []
+    assert [m["job_id"] for m in sent] == [10, 12]
+
+
+def test_fan_out_with_queued_page_jobs_leaves_the_parent_to_them():
+    complete_parent_job = mock.Mock()
+
+    fan_out([(10, "COMPLETED", {"page_start": 0, "page_end": 4})], complete_parent_job=complete_parent_job)
+
+    complete_parent_job.assert_not_called()
+
+
+def test_coordinator_redelivered_after_all_pages_completed(worker):
+    children = [
+        (10, "COMPLETED", {"page_start": 0, "page_end": 4}),
+        (11, "COMPLETED", {"page_start": 4, "page_end": 8}),
+        (12, "COMPLETED", {"page_start": 8, "page_end": 10}),
+    ]
+    worker.job.status = "COMPLETED"
+    complete_parent_job = mock.Mock()
+
+    def process_file(job, data, metrics):
+        _, sent = fan_out(children, complete_parent_job=complete_parent_job)
+        assert sent == []
+        return True
+
+    worker.process_file.side_effect = process_file
+
+    index.process_record(record())
+
+    # No page job is left to run, the coordinator completes the job itself
+    complete_parent_job.assert_called_once_with(1, {"disable_persist": None})
+
+
+def test_complete_parent_job_completes_when_all_page_jobs_completed():
+    parent = mock.Mock(id=1, status="PROCESSING", file_id=2)
+    session = mock.MagicMock()
+    db = session.__enter__.return_value
+    db.execute.side_effect = [
+        mock.Mock(scalar_one_or_none=mock.Mock(return_value=parent)),
+        mock.Mock(all=mock.Mock(return_value=[("COMPLETED", 3)])),
+    ]
+    db.scalar.return_value = 120
+    with mock.patch.object(index, "db", return_value=session), \
+            mock.patch.object(index, "aggregate_document") as aggregate_document, \
+            mock.patch.object(index, "push_job_status_event") as events:
+        index.complete_parent_job(1, {})
+
+    assert parent.status == "COMPLETED"
+    assert parent.token_count == 120
+    aggregate_document.assert_called_once_with(2, db)
+    events.assert_called_once()
+
+
+def test_completed_page_job_is_not_processed_again(worker):
+    worker.job.parent_job_id = 7
+    worker.job.status = "COMPLETED"
+
+    index.process_record(record(action="process_pid_pages", page_start=0, page_end=4))
+
+    worker.process_pages.assert_not_called()
+    assert worker.saved == []
+
+
+def test_handler_reports_only_the_failed_records():
+    def process(record):
+        if record["messageId"] == "m-2":
+            raise RuntimeError("broken pdf")
+
+    records = [{"messageId": f"m-{i}", "body": "{}"} for i in range(1, 4)]
+    with mock.patch.object(index, "process_record", side_effect=process) as process_record:
+        result = index.handler({"Records": records}, None)
+
+    assert result == {"batchItemFailures": [{"itemIdentifier": "m-2"}]}
+    assert process_record.call_count == 3
+
+
+def test_handler_processes_the_records_concurrently():
+    barrier = threading.Barrier(2, timeout=1)
+    records = [{"messageId": f"m-{i}", "body": "{}"} for i in range(1, 3)]
+    # Both records wait for each other, a serial handler would time out on the barrier
+    with mock.patch.object(index, "process_record", side_effect=lambda record: barrier.wait()), \
+            mock.patch.object(index, "MAX_CONCURRENT_RECORDS", 2):
+        result = index.handler({"Records": records}, None)
+
+    assert result == {"batchItemFailures": []}
@@ -0,0 +1,58 @@
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.database.db import get_db
+import endpoints.Router_project as router_project
+from models.pid_file import pid_file as Modelpid_file
+
+
+@pytest.fixture
+def db():
+    return mock.MagicMock()
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(router_project.model_router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+@pytest.fixture
+def create_jobs():
+    with mock.patch.object(router_project, "create_pid_processing_jobs", return_value=[7, 8]) as create_jobs:
+        yield create_jobs
+
+
+def test_process_selected_files(client, db, create_jobs):
+    files = [Modelpid_file(id=1, project_id=3), Modelpid_file(id=2, project_id=3)]
+    db.scalars.return_value.all.return_value = files
+
+    response = client.post("/project/3/process", params=[("file_ids", 1), ("file_ids", 2)])
+
+    assert response.status_code == 200
+    assert response.json()["job_ids"] == [7, 8]
+    assert create_jobs.call_args.args[1] == files
+
+
+@pytest.mark.parametrize("file_ids", ["a", "1,2", ""])
+def test_malformed_file_ids(client, db, create_jobs, file_ids):
+    response = client.post("/project/3/process", params={"file_ids": file_ids})
+
+    assert response.status_code == 422
+    create_jobs.assert_not_called()
+
+
+def test_empty_selection(client, db, create_jobs):
+    db.scalars.return_value.all.return_value = []
+
+    response = client.post("/project/3/process", params={"file_ids": 5})
+
+    assert response.status_code == 400
+    create_jobs.assert_not_called()
@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+from sqlalchemy import Column, DateTime, Integer
+from sqlalchemy.orm import declarative_base
+
+from core.data import cache as cache_module
+from core.data.cache import ReadCache
+from utils.filters import FilterBuilder
+
+Base = declarative_base()
+
+
+class item(Base):
+    __tablename__ = "read_cache_test_item"
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer)
+    modified_on = Column(DateTime(timezone=True))
+
+
+class Value:
+    def __init__(self, id):
+        self.id = id
+
+
+@pytest.fixture
+def cache():
+    return ReadCache(item, ttl=60, filters=FilterBuilder(item, {"project_id": {"condition": "==", "column": "project_id"}}))
+
+
+def version(count, minute=0):
+    return count, datetime(2026, 1, 1, 0, minute, tzinfo=timezone.utc)
+
+
+def test_write_of_the_row_invalidates_its_entries(cache):
+    cache.put(("id", 1), Value(1))
+    cache.put(cache.query_key({"project_id": 5}), Value(1))
+    cache.put(("id", 2), Value(2))
+
+    cache._row_written(None, None, Value(1))
+
+    assert cache.get(("id", 1)) is None
+    assert cache.get(cache.query_key({"project_id": 5})) is None
+    assert cache.get(("id", 2)).id == 2
+
+
+def test_get_returns_a_copy(cache):
+    cache.put(("id", 1), Value(1))
+    cache.get(("id", 1)).id = 3
+    assert cache.get(("id", 1)).id == 1
+
+
+def test_entries_expire(cache):
+    cache.put(("id", 1), Value(1))
+    with mock.patch.object(cache_module.time, "monotonic", return_value=cache_module.time.monotonic() + 61):
+        assert cache.get(("id", 1)) is None
+
+
+def test_lookups_with_a_session_or_limit_are_not_cached(cache):
+    assert cache.query_key({"project_id": 5, "db": object()}) is None
+    assert cache.query_key({"project_id": 5, "limit": 1}) is None
+
+
+def lookup(cache, key, current):
+    session = mock.MagicMock()
+    session.__enter__.return_value.execute.return_value.one.return_value = current
+    with mock.patch("core.database.db.Session", return_value=session):
+        return cache.lookup(key)
+
+
+def test_get_lookup_is_checked_against_the_rows(cache):
+    key = cache.query_key({"project_id": 5})
+    cached, seen = lookup(cache, key, version(1))
+    assert cached is None
+    cache.put(key, Value(1), seen)
+
+    cached, _ = lookup(cache, key, version(1))
+    assert cached.id == 1
+    # A list added by another process
+    cached, _ = lookup(cache, key, version(2, minute=1))
+    assert cached is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_version_statement_uses_the_filters(cache):
+    stmt = cache.version_statement(cache.query_key({"project_id": 5}))
+    sql = str(stmt.compile())
+    assert "count(*)" in sql and "max(read_cache_test_item.modified_on)" in sql
+    assert "read_cache_test_item.project_id = :project_id_1" in sql
+    # Only get(**filters) entries are versioned
+    assert cache.version_statement(("id", 1)) is None
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+from core.requests.request_manager import SentoRequest
+
+CHUNKS = [[{"id": i}] for i in range(8)]
+
+
+class InFlight:
+    """
+    Counts the concurrent calls, later chunks finish first
+    """
+
+    def __init__(self):
+        self.current = self.max = 0
+        self.lock = threading.Lock()
+
+    def enter(self):
+        with self.lock:
+            self.current += 1
+            self.max = max(self.max, self.current)
+
+    def exit(self):
+        with self.lock:
+            self.current -= 1
+
+    @staticmethod
+    def delay(chunk):
+        return 0.01 * (8 - chunk[0]["id"])
+
+
+@pytest.fixture
+def client():
+    return SentoRequest(url="http://api")
+
+
+def test_post_chunks_bounds_the_requests_in_flight(client):
+    in_flight = InFlight()
+
+    def post(path, data):
+        in_flight.enter()
+        time.sleep(in_flight.delay(data))
+        in_flight.exit()
+        return [dict(item, path=path) for item in data]
+
+    client.post = post
+    results = client.post_chunks("pid_tag/all", CHUNKS, max_in_flight=3)
+
+    assert in_flight.max == 3
+    # In the order of the chunks, not of the responses
+    assert [item["id"] for item in results] == list(range(8))
+    assert results[0]["path"] == "pid_tag/all"
+
+
+def test_post_chunks_raises_the_error_of_a_chunk(client):
+    def post(path, data):
+        if data[0]["id"] == 5:
+            raise RuntimeError("500")
+        return data
+
+    client.post = post
+    with pytest.raises(RuntimeError, match="500"):
+        client.post_chunks("pid_tag/all", CHUNKS, max_in_flight=3)
+
+
+def test_async_post_chunks_bounds_the_requests_in_flight(client):
+    in_flight = InFlight()
+
+    async def async_post(path, data):
+        in_flight.enter()
+        await asyncio.sleep(in_flight.delay(data))
+        in_flight.exit()
+        return data
+
+    client.async_post = async_post
+    results = asyncio.run(client.async_post_chunks("pid_tag/all", CHUNKS, max_in_flight=3))
+
+    assert in_flight.max == 3
+    assert [item["id"] for item in results] == list(range(8))
+
+
+def test_async_post_chunks_raises_the_error_of_a_chunk(client):
+    async def async_post(path, data):
+        if data[0]["id"] == 5:
+            raise RuntimeError("500")
+        return data
+
+    client.async_post = async_post
+    with pytest.raises(RuntimeError, match="500"):
+        asyncio.run(client.async_post_chunks("pid_tag/all", CHUNKS, max_in_flight=3))
@@ -0,0 +1,84 @@
+import os
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("boto3")
+import s3_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(s3_cache, "CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def s3():
+    client = mock.Mock()
+    client.head_object.return_value = {"ETag": '"e1"', "ContentLength": 3, "VersionId": "v1"}
+    client.download_file.side_effect = lambda **kwargs: open(kwargs["Filename"], "wb").write(b"pdf")
+    return client
+
+
+def download(s3, key="a.pdf"):
+    with s3_cache.download_to_cache(s3, "bucket", key) as path:
+        return path
+
+
+def test_download_pins_the_version_of_the_head(s3):
+    with s3_cache.download_to_cache(s3, "bucket", "a.pdf") as path:
+        assert open(path, "rb").read() == b"pdf"
+    assert path == s3_cache.cache_path("a.pdf", '"e1"')
+    assert s3.download_file.call_args.kwargs["ExtraArgs"] == {"VersionId": "v1"}
+
+
+def test_cached_version_is_not_downloaded_again(s3):
+    download(s3)
+    download(s3)
+
+    s3.download_file.assert_called_once()
+
+
+def test_new_version_is_downloaded(s3):
+    download(s3)
+    s3.head_object.return_value = {"ETag": '"e2"', "ContentLength": 3, "VersionId": "v2"}
+
+    path = download(s3)
+
+    assert path == s3_cache.cache_path("a.pdf", '"e2"')
+    assert s3.download_file.call_args.kwargs["ExtraArgs"] == {"VersionId": "v2"}
+
+
+def test_entries_in_use_are_not_evicted(s3, monkeypatch):
+    monkeypatch.setattr(s3_cache, "max_cache_size", lambda: 4)
+
+    with s3_cache.download_to_cache(s3, "bucket", "a.pdf") as path:
+        # b.pdf does not fit next to a.pdf, but a.pdf is open by this record
+        download(s3, "b.pdf")
+        assert open(path, "rb").read() == b"pdf"
+
+    assert s3_cache._pins == {}
+    # Released, it is evicted by the next download
+    download(s3, "c.pdf")
+    assert not os.path.exists(path)
+
+
+def test_downloads_in_progress_count_toward_the_cache_size(s3, cache_dir):
+    (cache_dir / "other.abc.part").write_bytes(b"12345")
+    s3_cache._downloads["mine.part"] = 100
+
+    try:
+        assert s3_cache.downloading_bytes() == 105
+    finally:
+        del s3_cache._downloads["mine.part"]
+
+
+def test_failed_download_releases_its_pin_and_reservation(s3):
+    s3.download_file.side_effect = RuntimeError("403")
+
+    with pytest.raises(RuntimeError):
+        download(s3)
+
+    assert s3_cache._pins == {} and s3_cache._downloads == {}
+    assert os.listdir(s3_cache.CACHE_DIR) == []
@@ -0,0 +1,48 @@
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+from core.api import streaming
+
+
+@pytest.fixture
+def s3_client():
+    client = mock.Mock()
+    client.create_multipart_upload.return_value = {"UploadId": "u"}
+    client.upload_part.side_effect = lambda **kwargs: {"ETag": f"e{kwargs['PartNumber']}"}
+    return client
+
+
+def test_upload_stream_uploads_parts_of_part_size(s3_client):
+    with mock.patch.object(streaming, "S3_PART_SIZE", 4):
+        streaming.upload_stream(s3_client, "bucket", "key", [b"ab", b"cd", b"ef", b"g"], "application/x-ndjson")
+
+    assert [c.kwargs["Body"] for c in s3_client.upload_part.call_args_list] == [b"abcd", b"efg"]
+    s3_client.complete_multipart_upload.assert_called_once_with(
+        Bucket="bucket", Key="key", UploadId="u",
+        MultipartUpload={"Parts": [{"ETag": "e1", "PartNumber": 1}, {"ETag": "e2", "PartNumber": 2}]},
+    )
+
+
+def test_upload_stream_of_an_empty_export(s3_client):
+    streaming.upload_stream(s3_client, "bucket", "key", [], "application/x-ndjson")
+
+    assert [c.kwargs["Body"] for c in s3_client.upload_part.call_args_list] == [b""]
+
+
+def test_upload_stream_aborts_on_errors(s3_client):
+    def chunks():
+        yield b"a"
+        raise RuntimeError("database gone")
+
+    with pytest.raises(RuntimeError):
+        streaming.upload_stream(s3_client, "bucket", "key", chunks(), "application/x-ndjson")
+
+    s3_client.abort_multipart_upload.assert_called_once_with(Bucket="bucket", Key="key", UploadId="u")
+    s3_client.complete_multipart_upload.assert_not_called()
+
+
+def test_ndjson_stream_yields_a_chunk_per_partition():
+    chunks = list(streaming.ndjson_stream([[{"id": 1}, {"id": 2}], [{"id": 3}]]))
+    assert chunks == [b'{"id":1}\n{"id":2}\n', b'{"id":3}\n']
@@ -0,0 +1,122 @@
+import time
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("jose")
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from core.api.authentication import tokens
+from core.api.authentication.tokens import InvalidTokenError, TokenVerifier
+
+ISSUER = "https://keycloak/realms/pid"
+
+
+def rsa_key(kid):
+    pem = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    public = jwk.construct(pem, "RS256").public_key().to_dict()
+    return pem, {**public, "kid": kid, "use": "sig"}
+
+
+def sign(pem, kid, **claims):
+    claims = {"sub": "user", "iss": ISSUER, "exp": int(time.time()) + 300, **claims}
+    return jwt.encode(claims, pem, algorithm="RS256", headers={"kid": kid})
+
+
+class Realm:
+    """
+    keycloak_openid of the verifier, serves the current keys as JWKS
+    """
+
+    def __init__(self, *keys):
+        self.keys = list(keys)
+        self.fetches = 0
+
+    def __call__(self):
+        return self
+
+    def certs(self):
+        self.fetches += 1
+        return {"keys": self.keys}
+
+
+@pytest.fixture(scope="module")
+def keys():
+    return rsa_key("k1"), rsa_key("k2")
+
+
+def test_verify_caches_the_claims(keys):
+    (pem, public), _ = keys
+    realm = Realm(public)
+    verifier = TokenVerifier(realm, issuer=ISSUER)
+    token = sign(pem, "k1")
+
+    with mock.patch.object(verifier, "decode", wraps=verifier.decode) as decode:
+        assert verifier.verify(token)["sub"] == "user"
+        assert verifier.verify(token)["sub"] == "user"
+    assert decode.call_count == 1
+
+
+def test_expired_cache_entry_is_verified_again(keys):
+    (pem, public), _ = keys
+    verifier = TokenVerifier(Realm(public), issuer=ISSUER)
+    token = sign(pem, "k1")
+    verifier.verify(token)
+
+    with mock.patch.object(tokens.time, "time", return_value=time.time() + tokens.CLAIMS_CACHE_TTL + 1), \
+            mock.patch.object(verifier, "decode", return_value={"active": True, "sub": "user"}) as decode:
+        verifier.verify(token)
+    decode.assert_called_once()
+
+
+def test_rotated_key_is_fetched(keys):
+    (pem1, public1), (pem2, public2) = keys
+    realm = Realm(public1)
+    verifier = TokenVerifier(realm, issuer=ISSUER)
+    verifier.verify(sign(pem1, "k1"))
+
+    realm.keys = [public2]
+    with mock.patch.object(tokens, "JWKS_REFRESH_INTERVAL", 0):
+        assert verifier.verify(sign(pem2, "k2"))["sub"] == "user"
+    assert realm.fetches == 2
+
+
+def test_unknown_keys_are_not_fetched_on_every_request(keys):
+    (pem1, public1), (pem2, _) = keys
+    realm = Realm(public1)
+    verifier = TokenVerifier(realm, issuer=ISSUER)
+    verifier.verify(sign(pem1, "k1"))
+
+    for _ in range(3):
+        with pytest.raises(InvalidTokenError):
+            verifier.verify(sign(pem2, "k2"))
+    assert realm.fetches == 1
+
+
+def test_token_of_another_issuer_is_rejected(keys):
+    (pem, public), _ = keys
+    verifier = TokenVerifier(Realm(public), issuer=ISSUER)
+
+    with pytest.raises(InvalidTokenError):
+        verifier.verify(sign(pem, "k1", iss="https://keycloak/realms/other"))
+
+
+def test_algorithm_of_the_header_is_not_trusted(keys):
+    (_, public), _ = keys
+    verifier = TokenVerifier(Realm(public), issuer=ISSUER)
+    token = jwt.encode({"sub": "user", "iss": ISSUER}, "secret", algorithm="HS256", headers={"kid": "k1"})
+
+    with pytest.raises(InvalidTokenError):
+        verifier.verify(token)
+
+
+def test_keys_of_other_algorithms_are_ignored(keys):
+    (pem, public), _ = keys
+    verifier = TokenVerifier(Realm({**public, "alg": "RS512"}), issuer=ISSUER)
+
+    with pytest.raises(InvalidTokenError, match="unknown key"):
+        verifier.verify(sign(pem, "k1"))
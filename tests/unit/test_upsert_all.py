@@ -0,0 +1,95 @@
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+from sqlalchemy.dialects import postgresql
+
+from core.api import _utils
+from models.project import project as Modelproject
+from models.pid_tag import pid_tag as Modelpid_tag
+
+
+class FakeSession:
+    """
+    Session of upsert_all, hands out ids and returns the inserted rows in a shuffled order
+    """
+
+    def __init__(self, ids=(), rows=()):
+        self.ids = list(ids)
+        self.rows = list(rows)
+        self.statements = []
+
+    def scalars(self, stmt):
+        self.statements.append(stmt)
+        return mock.Mock(all=lambda: self.ids)
+
+    def execute(self, stmt):
+        self.statements.append(stmt)
+        return mock.Mock(mappings=lambda: iter(self.rows))
+
+
+def params(stmt):
+    return stmt.compile(dialect=postgresql.dialect()).params
+
+
+def test_new_records_map_back_by_their_id():
+    session = FakeSession(ids=[11, 12, 13], rows=[
+        {"id": 13, "name": "c"}, {"id": 11, "name": "a"}, {"id": 12, "name": "b"},
+    ])
+
+    results = _utils.upsert_all(
+        session, Modelproject, [{"name": "a"}, {"name": "b"}, {"name": "c"}], [False, False, False]
+    )
+
+    assert [row["name"] for row in results] == ["a", "b", "c"]
+    sequence, insert = session.statements
+    assert "nextval(pg_get_serial_sequence" in str(sequence.compile(dialect=postgresql.dialect()))
+    # The ids of the sequence are inserted with the records
+    assert params(insert)["id_values"] == [11, 12, 13]
+    assert params(insert)["name_values"] == ["a", "b", "c"]
+
+
+def test_new_and_existing_records_keep_their_positions():
+    session = FakeSession(ids=[20], rows=[{"id": 20, "name": "new"}])
+    session.execute = mock.Mock(side_effect=[
+        mock.Mock(mappings=lambda: iter([{"id": 20, "name": "new"}])),
+        mock.Mock(mappings=lambda: iter([{"id": 5, "name": "old"}])),
+    ])
+
+    results = _utils.upsert_all(session, Modelproject, [{"id": 5, "name": "old"}, {"name": "new"}], [True, False])
+
+    assert [row["id"] for row in results] == [5, 20]
+
+
+def tag(name, tag_value, type="instrument"):
+    return dict(
+        pid_file_page_id=1, name=name, tag_value=tag_value, type=type, sub_type="",
+        x0=0, y0=0, x1=1, y1=1, confidence=1.0,
+    )
+
+
+def test_duplicate_keys_are_upserted_once_and_the_last_record_wins():
+    unique_fields = ["pid_file_page_id", "name", "type"]
+    session = FakeSession(rows=[{**tag("FT-1", "second"), "id": 7}, {**tag("FT-2", "other"), "id": 8}])
+
+    results = _utils.upsert_all(
+        session, Modelpid_tag, [tag("FT-1", "first"), tag("FT-2", "other"), tag("FT-1", "second")],
+        [False, False, False], unique_fields=unique_fields,
+    )
+
+    (stmt,) = session.statements
+    assert params(stmt)["tag_value_values"] == ["second", "other"]
+    assert [row["id"] for row in results] == [7, 8, 7]
+
+
+def test_changed_type_is_another_tag():
+    unique_fields = ["pid_file_page_id", "name", "type"]
+    session = FakeSession(rows=[{**tag("FT-1", "a"), "id": 7}, {**tag("FT-1", "a", type="line"), "id": 9}])
+
+    results = _utils.upsert_all(
+        session, Modelpid_tag, [tag("FT-1", "a"), tag("FT-1", "a", type="line")],
+        [False, False], unique_fields=unique_fields,
+    )
+
+    assert [row["id"] for row in results] == [7, 9]